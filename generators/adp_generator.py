@@ -1,50 +1,379 @@
-import pandas as pd  # type: ignore
 import argparse
-import yaml  # type: ignore
+import cProfile
+import json
+import os
+import sys
 from templates import models
 from templates import source_yamls
-from src.adapters.filesystems import LocalFilesystem, BaseFilesystem
-from src.logger import log
-import io
-from configuration.invalid_table_names import invalid_table_names  # type: ignore
-from typing import Dict, Any
+from src.adapters.filesystems import LocalFilesystem, BaseFilesystem, InMemoryFilesystem
+from src.artefacts import Artefact, write_artefacts, write_ndjson
+from src.logger import (
+    LOG_FILE_ENV_VAR,
+    LOG_LEVEL_ENV_VAR,
+    LOG_LEVELS,
+    configure_logging,
+    log,
+)
+from typing import TYPE_CHECKING, Dict, Any, Iterator, Optional, Sequence, Union
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from itertools import repeat
+from src.dry_run import compare_output
 from src.ddl_generators import RawDDLGenerator, TempRawDDLGenerator, CuratedDDLGenerator
+from src.input_data_values import INPUT_FORMATS, infer_input_format
+from src.manifest import GenerationManifest, template_fingerprint
+from src.metadata_rows import RowIndex, TableSpec, read_small_csv
+from src.model_yaml import ModelYamlWriter, RenderedEntryCache, ShardedModelYamlWriter
+from src import profiling, tracing
+from src.profiling import GenerationProfile, StageTimer
+from src.service import default_socket_path, forward_master, serve, stop_service
+from src.watch import InputWatcher, watch
+from src.templating import compile_template
 
+# pandas is only imported once an input needs it, see _index_frame
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    import pandas as pd  # type: ignore
+    from src.metadata_index import MetadataIndex
 
-class MyDumper(yaml.Dumper):
-    def increase_indent(self, flow=False, indentless=False):
-        yaml.Dumper.ignore_aliases = lambda *args: True
-        return super(MyDumper, self).increase_indent(flow, False)
 
-
-def column_lists_dict(
-    columns: list, template: str = "{column}", join_with: str = ","
+def column_lists(
+    columns: Sequence[str], template: str = "{column}", join_with: str = ","
 ) -> str:
-    new_columns = (template.format(**column) for column in columns)
-    return "{}".format(join_with).join(new_columns)
+    return compile_template(template).render_columns(join_with, column=columns)
 
 
-def column_lists(
-    columns: list[Dict[str, Any]], template: str = "{column}", join_with: str = ","
-) -> str:
-    new_columns = (template.format(column=column) for column in columns)
-    return "{}".format(join_with).join(new_columns)
+def _raw_model_columns() -> list[dict[str, Any]]:
+    # The columns of the raw model YAML, which are those of the source YAML template for every table
+    column_list = []
+    for row in source_yamls.SOURCE_YAML_TABLE["columns"]:
+        column_tests_source = row["tests"]
+
+        column_desc = {
+            "name": row["name"],
+            "description": row["description"],
+        }
+        if column_tests_source:
+            column_desc |= {
+                "tests": column_tests_source.split(","),
+            }
+        column_list.append(column_desc)
+    return column_list
 
 
-def check_for_invalid_table_names(
-    table_names: list[str], invalid_names: list[str] = invalid_table_names
-) -> None:
-    log.debug("Checking for invalid table names")
-    collisions = [
-        invalid_name for invalid_name in table_names if invalid_name in invalid_names
+# Built once and shared by the raw model of every table, so must never be changed
+RAW_MODEL_COLUMNS = _raw_model_columns()
+
+
+@dataclass(frozen=True)
+class GenerationContext:
+    # Everything, other than the table metadata itself, needed to render the artefacts of a single table
+    raw_database: str
+    raw_schema: str
+    curated_database: str
+    curated_schema: str
+    schema: str
+    source_short_name: str
+    output_folder: str
+
+
+@dataclass
+class RenderedTable:
+    # Output of rendering a single table: the files to write plus the table's raw and curated YAML fragments
+    files: dict[str, str]
+    raw_model: dict[str, Any]
+    cur_model: dict[str, Any]
+    # Time spent in each renderer, when profiling
+    timer: StageTimer
+    # Spans recorded while rendering the table in a worker process, when tracing
+    trace_events: list[dict[str, Any]] = field(default_factory=list)
+
+
+def _render_table(
+    table: TableSpec, context: GenerationContext, timed: bool = False
+) -> RenderedTable:
+    timer = StageTimer(enabled=timed)
+    raw_database = context.raw_database
+    raw_schema = context.raw_schema
+    curated_database = context.curated_database
+    curated_schema = context.curated_schema
+    schema = context.schema
+    source_short_name = context.source_short_name
+    output_folder = context.output_folder
+    files = {}
+
+    # ToDo: handle duplicate table descriptions and curated_dbt_type, because thats now allowed.
+    table_description = table.description
+    curated_dbt_type = table.curated_dbt_type
+    # the index has already worked out, and validated, which columns make up the unique key and updated date
+    unique_key_list = table.unique_keys
+    updated_date_list = table.updated_dates
+    table_name = table.table_name.upper()
+    raw_model_name = (
+        "raw_"
+        + source_short_name.lower()
+        + "_"
+        + schema.lower()
+        + "_"
+        + table_name.lower()
+    )
+    cur_model_name = (
+        "cur_"
+        + source_short_name.lower()
+        + "_"
+        + schema.lower()
+        + "_"
+        + table_name.lower()
+    )
+
+    # output raw temp DDL
+    raw_temp_ddl = TempRawDDLGenerator.run(
+        raw_database=raw_database, raw_schema=raw_schema, table_name=table_name
+    )
+    files[f"{output_folder}/output_ddl/raw/temp_{table_name.lower()}.sql"] = (
+        raw_temp_ddl + "\n"
+    )
+    timer.lap("temp_raw_ddl")
+
+    # output raw DDL
+    raw_ddl = RawDDLGenerator.run(
+        raw_database=raw_database, raw_schema=raw_schema, table_name=table_name
+    )
+    files[f"{output_folder}/output_ddl/raw/{table_name.lower()}.sql"] = raw_ddl + "\n"
+    timer.lap("raw_ddl")
+
+    RAW_MODEL_output = compile_template(models.RAW_MODEL).render(
+        raw_database=raw_database,
+        raw_schema=raw_schema,
+        table_name=table_name.lower(),
+    )
+    files[f"{output_folder}/output_dbt/raw_models/{raw_model_name}.sql"] = (
+        RAW_MODEL_output + "\n"
+    )
+    timer.lap("raw_model")
+
+    # output dbt curated
+    if curated_dbt_type == "scd2":  # drop in meta for this
+        unique_key = ""
+        updated_date = ""
+
+        # scd2 .sql files
+        log.debug("Curated columns of '%s': %s", table_name, table.columns)
+        # rendered for the whole catalog up front by the index
+        model_scd2_column_string = table.model_columns_block
+
+        # ok now we have looped through all the columns, we can work out if we need to create a
+        # concatinated unique_key
+        if table.validation.is_multi_key:
+            create_unique_key = (
+                column_lists(
+                    columns=unique_key_list,
+                    template="FILECONTENTS:{column}",
+                    join_with=" || '_' || ",
+                )
+                + " as unique_key"
+            )
+            model_scd2_column_string = (
+                "    " + create_unique_key + ",\n" + model_scd2_column_string
+            )
+            unique_key = "unique_key"
+        else:
+            unique_key = unique_key_list[0]
+
+        if table.validation.is_multi_date:
+            create_updated_date = "GREATEST(" + (
+                column_lists(
+                    columns=updated_date_list,
+                    template="IFNULL(TO_TIMESTAMP_NTZ(FILECONTENTS:{column}),'1900-01-01')",
+                    join_with=",  ",
+                )
+                + ") as updated_date"
+            )
+            model_scd2_column_string = (
+                "    " + create_updated_date + ",\n" + model_scd2_column_string
+            )
+            updated_date = "updated_date"
+        else:
+            updated_date = updated_date_list[0]
+
+        CURATED_MODEL_output = compile_template(models.CURATED_MODEL).render(
+            curated_database=curated_database,
+            curated_schema=curated_schema,
+            table_name=table_name,
+            columns=model_scd2_column_string,
+            unique_key=unique_key,
+            updated_date=updated_date,
+            raw_model_name=raw_model_name,
+        )
+        files[f"{output_folder}/output_dbt/cur_models/{cur_model_name}.sql"] = (
+            CURATED_MODEL_output + "\n"
+        )
+        timer.lap("curated_model")
+
+    # output curated DDL
+    curated_ddl = CuratedDDLGenerator.run(
+        curated_database=curated_database,
+        curated_schema=curated_schema,
+        table_name=table_name,
+        table_metadata=table,
+    )
+    files[f"{output_folder}/output_ddl/curated/{table_name.lower()}.sql"] = (
+        curated_ddl + "\n"
+    )
+    timer.lap("curated_ddl")
+
+    # raw yaml
+    raw_model = {
+        "name": raw_model_name,
+        "description": table_description,
+        "columns": RAW_MODEL_COLUMNS,
+    }
+
+    # scd2 yaml
+    column_list = []
+
+    # csv file parser only accepts "unique,footest,bartest" as format
+    # tried a few combinations but it kept complaining
+    # so type is string (if not nan) then i convert to list
+
+    for column in table.columns:
+        column_tests_scd2 = column.tests
+
+        column_desc = {
+            "name": column.name,
+            "description": column.description,
+        }
+        if column_tests_scd2 == column_tests_scd2:
+            column_tests_scd2_list = column_tests_scd2.split(",")
+            column_desc |= {
+                "tests": column_tests_scd2_list,
+            }
+        column_list.append(column_desc)
+
+    if table.validation.is_multi_key:
+        column_desc = {
+            "name": "unique_key",
+            "description": "generated column for curated scd2",
+        }
+        column_list.insert(0, column_desc)
+
+    if table.validation.is_multi_date:
+        column_desc = {
+            "name": "updated_date",
+            "description": "generated column for curated scd2",
+        }
+        column_list.insert(0, column_desc)
+
+    # add in the default scd2 columns
+    # "ROW_START_AT","ROW_END_AT","ROW_IS_CURRENT","TRACKING_HASH"
+    scd2_default_columns = [
+        "TRACKING_HASH",
+        "ROW_START_AT",
+        "ROW_END_AT",
+        "ROW_IS_CURRENT",
     ]
-    if collisions:
-        log.warning("Identified invalid table names in provided list.")
-        raise ValueError(f"Input table list contains invalid table names: {collisions}")
-    return
+    for col in scd2_default_columns:
+        column_desc = {"name": col, "description": "SCD2 standard column"}
+        column_list.append(column_desc)
 
+    cur_model = {
+        "name": cur_model_name,
+        "description": table_description,
+        "columns": column_list,
+    }
 
-def master(
+    timer.lap("yaml_entries")
+
+    return RenderedTable(
+        files=files, raw_model=raw_model, cur_model=cur_model, timer=timer
+    )
+
+
+def _trace_render_table(
+    table: TableSpec, context: GenerationContext, timed: bool = False
+) -> RenderedTable:
+    # A worker process sends the spans of each table back with it, to be added to the main process's trace
+    with tracing.span("render_table", category="render", table_name=table.table_name):
+        rendered = _render_table(table=table, context=context, timed=timed)
+    rendered.trace_events = tracing.take_worker_events()
+    return rendered
+
+
+def _render_tables(
+    tables: list[TableSpec],
+    context: GenerationContext,
+    executor: Optional["ProcessPoolExecutor"],
+    workers: int = 1,
+    timed: bool = False,
+) -> Iterator[RenderedTable]:
+    # Render each table, in the order given. Tables are independent of each other, so when there is a process pool
+    # they are spread over it; executor.map still hands the results back in input order.
+    if executor is None or len(tables) <= 1:
+        for table in tables:
+            yield _trace_render_table(table=table, context=context, timed=timed)
+        return
+
+    log.info("Rendering %s tables in the worker pool", len(tables))
+    # A few chunks per worker keeps the pickling overhead down while still balancing uneven table widths
+    chunksize = max(1, len(tables) // (max(1, workers) * 4))
+    yield from executor.map(
+        _trace_render_table,
+        tables,
+        repeat(context),
+        repeat(timed),
+        chunksize=chunksize,
+    )
+
+
+def _index_frame(df: "pd.DataFrame") -> "MetadataIndex":
+    # Only imported here, so that runs indexed without pandas by a RowIndex never import it
+    from src.metadata_index import MetadataIndex
+
+    # group the rows by table once, rather than filtering the whole frame for every table
+    with profiling.stage("index"):
+        return MetadataIndex(df)
+
+
+def _open_model_yaml(
+    filesystem: BaseFilesystem,
+    output_folder: str,
+    yaml_folder: str,
+    model_folder: str,
+    yaml_name: str,
+    yaml_shard_size: Optional[int],
+    entry_cache: Optional[RenderedEntryCache] = None,
+    write_to: Optional[BaseFilesystem] = None,
+) -> Union[ModelYamlWriter, ShardedModelYamlWriter]:
+    # A single YAML file for every model of the schema, or with yaml_shard_size, shards of models next to their .sql.
+    # The YAML is written straight to write_to when given, otherwise it is handed out by the writer's take_files.
+    yaml_filepath = f"{output_folder}/output_dbt/{yaml_folder}/{yaml_name}.yml"
+    if not yaml_shard_size:
+        return ModelYamlWriter(
+            filesystem=write_to, filepath=yaml_filepath, entry_cache=entry_cache
+        )
+    if filesystem.path_exists(yaml_filepath):
+        log.warning(
+            "'%s' from an unsharded run is still in the output folder. Delete it, or dbt will find its models twice.",
+            yaml_filepath,
+        )
+    return ShardedModelYamlWriter(
+        filesystem=write_to,
+        folderpath=f"{output_folder}/output_dbt/{model_folder}",
+        filename_prefix=yaml_name,
+        shard_size=yaml_shard_size,
+        entry_cache=entry_cache,
+    )
+
+
+def _take_files(
+    *writers: Union[ModelYamlWriter, ShardedModelYamlWriter]
+) -> Iterator[Artefact]:
+    for writer in writers:
+        for path, content in writer.take_files():
+            yield Artefact(path=path, content=content)
+
+
+def generate_artefacts(
     action: str,
     database: str,
     schema: str,
@@ -52,10 +381,32 @@ def master(
     output_folder: str,
     source_short_name: str,
     local_filesystem: BaseFilesystem = LocalFilesystem(),
-) -> None:
-    # https://stackoverflow.com/questions/51272814/python-yaml-dumping-pointer-references
-    yaml.Dumper.ignore_aliases = lambda *args: True
-
+    incremental: bool = False,
+    workers: int = 1,
+    chunksize: Optional[int] = None,
+    presorted: bool = True,
+    input_format: Optional[str] = None,
+    yaml_shard_size: Optional[int] = None,
+    profile: Optional[GenerationProfile] = None,
+    manifest: Optional[GenerationManifest] = None,
+    executor: Optional["ProcessPoolExecutor"] = None,
+    parse_cache: bool = True,
+    model_yaml_filesystem: Optional[BaseFilesystem] = None,
+) -> Iterator[Artefact]:
+    """
+    Generate the artefacts of every table, yielding each one as soon as its table is rendered, so that a consumer can
+    process them in a pipeline without the whole output ever being held in memory. Nothing is written; see master for
+    the consumer that writes them to a filesystem. The dbt model YAML is yielded once complete, i.e. after the last
+    table, or shard by shard with yaml_shard_size, and the manifest of an incremental run comes last.
+    :param local_filesystem: BaseFilesystem; where the input file, and for an incremental run the manifest and the
+    previous output, are read from.
+    :param parse_cache: bool; read a large CSV input from the cache of it parsed by an earlier run, when the input
+    has not changed since, and update the cache when it has. See src.metadata_cache.
+    :param model_yaml_filesystem: BaseFilesystem; when given, the dbt model YAML is streamed straight to it as each
+    table is rendered, rather than yielded.
+    Every other parameter is as for master.
+    :return: Iterator[Artefact]; the path and content of each generated file, table by table in input order.
+    """
     raw_schema = schema.upper()
     # ToDo: _LAKE needs to be dynamic and passed in
     # Morning Andy, so for the RAW we suffix it with the location of where the data came from. _LAKE for the data lake
@@ -63,289 +414,331 @@ def master(
     raw_database = "RAW_" + database.upper() + "_LAKE"
     curated_schema = schema.upper()
     curated_database = "CUR_" + database.upper()
+    context = GenerationContext(
+        raw_database=raw_database,
+        raw_schema=raw_schema,
+        curated_database=curated_database,
+        curated_schema=curated_schema,
+        schema=schema,
+        source_short_name=source_short_name,
+        output_folder=output_folder,
+    )
+    raw_source_yaml_name = "raw_" + source_short_name.lower() + "_" + schema.lower()
+    cur_source_yaml_name = "cur_" + source_short_name.lower() + "_" + schema.lower()
 
-    # load meta data
-    input_csv_content = local_filesystem.read_file(filepath=input_file)
-    df = pd.read_csv(io.StringIO(input_csv_content), sep=",")
-
-    # create Column for DDL ToDo: add function to translate source_data_type to snowflake data type
-    df["ddl_column_def"] = df["column_name"] + " " + df["source_data_type"]
-
-    model_scd2_table_list = []
-    raw_model_table_list = []
-    source_table_list = []
     # ToDo: What is DEMO_DEPUPLICATION_CUR_C_UDKEY_2 and what do we use for X_DEAL_CALC_RESULT or should it be a scd2
     # X_DEAL_CALC_MSG looks like a type 2
 
-    table_names = df["table_name"].unique()
-    check_for_invalid_table_names(table_names=table_names)
-
-    # loop each table
-    for table_name in table_names:
-        # if table_name != 'C_CONTACT_UDF_LOOKUP':
-        #     continue
-        df_filtered = df[df["table_name"] == table_name]  # handy filtered df
-        # ToDo: handle duplicate table descriptions and curated_dbt_type, because thats now allowed.
-        table_description = df_filtered["table_description"].unique()[0]
-        curated_dbt_type = df_filtered["curated_dbt_type"].unique()[0]
-        table_name = table_name.upper()
-        raw_model_name = (
-            "raw_"
-            + source_short_name.lower()
-            + "_"
-            + schema.lower()
-            + "_"
-            + table_name.lower()
-        )
-        cur_model_name = (
-            "cur_"
-            + source_short_name.lower()
-            + "_"
-            + schema.lower()
-            + "_"
-            + table_name.lower()
-        )
-        raw_source_yaml_filename = (
-            "raw_" + source_short_name.lower() + "_" + schema.lower() + ".yml"
-        )
-        cur_source_yaml_filename = (
-            "cur_" + source_short_name.lower() + "_" + schema.lower() + ".yml"
-        )
-
-        # output raw temp DDL
-        raw_temp_ddl = TempRawDDLGenerator.run(
-            raw_database=raw_database, raw_schema=raw_schema, table_name=table_name
-        )
-        local_filesystem.write_file(
-            filepath=f"{output_folder}/output_ddl/raw/temp_{table_name.lower()}.sql",
-            content=raw_temp_ddl + "\n",
-        )
-
-        # output raw DDL
-        raw_ddl = RawDDLGenerator.run(
-            raw_database=raw_database, raw_schema=raw_schema, table_name=table_name
-        )
-        local_filesystem.write_file(
-            filepath=f"{output_folder}/output_ddl/raw/{table_name.lower()}.sql",
-            content=raw_ddl + "\n",
+    # In incremental mode, tables whose metadata rows and templates are unchanged since the last run are skipped and
+    # their YAML fragments are taken from the manifest. A manifest passed in, e.g. kept in memory by --watch, is used
+    # instead of loading it.
+    if manifest is None and incremental:
+        manifest = GenerationManifest.load(
+            filesystem=local_filesystem, output_folder=output_folder
         )
+    # Only --watch keeps the rendered YAML of unchanged tables between runs
+    entry_cache = manifest.entry_cache if manifest is not None else None
+    template_hash = template_fingerprint()
+    skipped_tables = 0
+    table_count = 0
 
-        RAW_MODEL_output = models.RAW_MODEL.format(
-            raw_database=raw_database,
-            raw_schema=raw_schema,
-            table_name=table_name.lower(),
+    # csv, parquet or arrow, inferred from the file extension unless given
+    input_format = input_format or infer_input_format(input_file)
+    with ExitStack() as stack:
+        if profile is not None:
+            # time every stage of the run, overall and per table
+            stack.enter_context(profile.activate())
+        # Each table's models are written to the dbt YAML as soon as it is rendered, rather than all dumped at the end
+        # ToDo: handle when there are no scd2!!
+        raw_model_yaml = _open_model_yaml(
+            filesystem=local_filesystem,
+            output_folder=output_folder,
+            yaml_folder="raw_model_yaml",
+            model_folder="raw_models",
+            yaml_name=raw_source_yaml_name,
+            yaml_shard_size=yaml_shard_size,
+            entry_cache=entry_cache,
+            write_to=model_yaml_filesystem,
         )
-        local_filesystem.write_file(
-            filepath=f"{output_folder}/output_dbt/raw_models/{raw_model_name}.sql",
-            content=RAW_MODEL_output + "\n",
+        stack.enter_context(raw_model_yaml)
+        cur_model_yaml = _open_model_yaml(
+            filesystem=local_filesystem,
+            output_folder=output_folder,
+            yaml_folder="cur_model_yaml",
+            model_folder="cur_models",
+            yaml_name=cur_source_yaml_name,
+            yaml_shard_size=yaml_shard_size,
+            entry_cache=entry_cache,
+            write_to=model_yaml_filesystem,
         )
+        stack.enter_context(cur_model_yaml)
+        indexes: Iterator[Union["MetadataIndex", RowIndex]]
+        if chunksize:
+            from src.metadata_input import add_ddl_column_def
+            from src.metadata_stream import iter_table_batches
 
-        # output dbt curated
-        if curated_dbt_type == "scd2":  # drop in meta for this
-            unique_key = ""
-            updated_date = ""
-            # scd2 yaml
-            model_scd2_column_list = []
-            unique_key_list = []
-            updated_date_list = []
-
-            for row in df_filtered.itertuples():
-                column_desc = {
-                    "name": row.column_name,
-                    "description": row.column_description,
-                    "tests": [row.column_tests],
-                }
-                model_scd2_column_list.append(column_desc)
-
-                if row.column_type == "unique_key":
-                    unique_key_list.append(row.column_name)
-                if row.column_type == "updated_date":
-                    updated_date_list.append(row.column_name)
-
-            # scd2 .sql files
-            model_scd2_column_list = df_filtered.to_dict("records")
-            print(model_scd2_column_list)
-            model_scd2_column_string = column_lists_dict(
-                columns=model_scd2_column_list,
-                template="    cast(FILECONTENTS:{column_name} as {source_data_type}) as {column_name}",
-                join_with=",\n",
+            # stream the meta data in chunks, only ever holding complete tables in memory rather than the whole input
+            input_stream = stack.enter_context(
+                local_filesystem.open_file(
+                    filepath=input_file, mode="r" if input_format == "csv" else "rb"
+                )
+            )
+            batches = profiling.timed_iter(
+                iter_table_batches(
+                    input_stream=input_stream,
+                    chunksize=chunksize,
+                    presorted=presorted,
+                    input_format=input_format,
+                ),
+                "read",
             )
+            indexes = (_index_frame(add_ddl_column_def(df)) for df in batches)
+        else:
+            # A small CSV is read and indexed with the csv module, so that the run never imports pandas. Incremental
+            # runs fingerprint the pandas rows, so always read with pandas.
+            small_csv = (
+                read_small_csv(filesystem=local_filesystem, filepath=input_file)
+                if input_format == "csv" and manifest is None
+                else None
+            )
+            if small_csv is not None:
+                with profiling.stage("index"):
+                    indexes = iter([RowIndex(*small_csv)])
+            else:
+                from src.metadata_cache import read_prepared_metadata
 
-            # ok now we have looped through all the columns, we can work out if we need to create a
-            # concatinated unique_key
-            if len(unique_key_list) > 1:
-                create_unique_key = (
-                    column_lists(
-                        columns=unique_key_list,
-                        template="FILECONTENTS:{column}",
-                        join_with=" || '_' || ",
-                    )
-                    + " as unique_key"
-                )
-                model_scd2_column_string = (
-                    "    " + create_unique_key + ",\n" + model_scd2_column_string
+                # load meta data, from the parse cache next to a large input when it is up to date
+                indexes = iter(
+                    [
+                        _index_frame(
+                            read_prepared_metadata(
+                                filesystem=local_filesystem,
+                                filepath=input_file,
+                                input_format=input_format,
+                                use_cache=parse_cache,
+                            )
+                        )
+                    ]
                 )
-                unique_key = "unique_key"
-            else:
-                unique_key = unique_key_list[0]
-
-            if len(updated_date_list) > 1:
-                create_updated_date = "GREATEST(" + (
-                    column_lists(
-                        columns=updated_date_list,
-                        template="IFNULL(TO_TIMESTAMP_NTZ(FILECONTENTS:{column}),'1900-01-01')",
-                        join_with=",  ",
+        # A worker pool passed in, e.g. kept by the generator service, is used instead of starting one for the run
+        if executor is None and workers > 1:
+            # Imported here, as the multiprocessing machinery is only needed with --workers
+            from concurrent.futures import ProcessPoolExecutor
+
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+
+        for index in indexes:
+            # every validation rule has already been run over the whole batch by the index
+            index.validation.raise_for_errors()
+            table_count += len(index)
+
+            # Decide which tables need rendering up front, so that rendering can be fanned out to a process pool and
+            # the rendered and skipped tables merged back together in input order
+            plan: list[tuple[str, bool]] = []
+            tables_to_render = []
+            fingerprints: dict[str, str] = {}
+            if manifest is not None:
+                if isinstance(index, RowIndex):
+                    # Fingerprints hash the rows as pandas reads them, so incremental runs are never read without it
+                    raise TypeError(
+                        "An incremental run needs a MetadataIndex to fingerprint its tables"
                     )
-                    + ") as updated_date"
-                )
-                model_scd2_column_string = (
-                    "    " + create_updated_date + ",\n" + model_scd2_column_string
+                fingerprints = index.fingerprints(
+                    context=repr(context), template_hash=template_hash
                 )
-                updated_date = "updated_date"
-            else:
-                updated_date = updated_date_list[0]
-
-            CURATED_MODEL_output = models.CURATED_MODEL.format(
-                curated_database=curated_database,
-                curated_schema=curated_schema,
-                table_name=table_name,
-                columns=model_scd2_column_string,
-                unique_key=unique_key,
-                updated_date=updated_date,
-                raw_model_name=raw_model_name,
-            )
-            local_filesystem.write_file(
-                filepath=f"{output_folder}/output_dbt/cur_models/{cur_model_name}.sql",
-                content=CURATED_MODEL_output + "\n",
-            )
-
-        # output curated DDL
-        curated_ddl = CuratedDDLGenerator.run(
-            curated_database=curated_database,
-            curated_schema=curated_schema,
-            table_name=table_name,
-            column_df=df_filtered,
-        )
-        local_filesystem.write_file(
-            filepath=f"{output_folder}/output_ddl/curated/{table_name.lower()}.sql",
-            content=curated_ddl + "\n",
-        )
+            for table in index.tables():
+                table_name = table.table_name
 
-        # source yaml
-        source_yaml = source_yamls.SOURCE_YAML_TABLE
-        source_yaml["name"] = table_name
-        source_yaml["description"] = table_description
-        source_table_list.append(source_yaml.copy())
+                if manifest is not None:
+                    if manifest.is_unchanged(
+                        table_name=table_name,
+                        fingerprint=fingerprints[table_name],
+                        filesystem=local_filesystem,
+                    ):
+                        log.debug("Skipping unchanged table '%s'", table_name)
+                        plan.append((table_name, True))
+                        skipped_tables += 1
+                        continue
 
-        # raw yaml
-        column_list = []
+                plan.append((table_name, False))
+                tables_to_render.append(table)
 
-        for row in source_yaml["columns"]:
-            column_tests_source = row["tests"]
-            column_tests_source_list = []
+            rendered_tables = _render_tables(
+                tables=tables_to_render,
+                context=context,
+                executor=executor,
+                workers=workers,
+                timed=profile is not None,
+            )
 
-            column_desc = {
-                "name": row["name"],
-                "description": row["description"],
-            }
-            if column_tests_source:
-                column_tests_source_list = column_tests_source.split(",")
-                column_desc |= {
-                    "tests": column_tests_source_list,
-                }
-            column_list.append(column_desc)
-
-        table_desc = {
-            "name": raw_model_name,
-            "description": table_description,
-            "columns": column_list,
-        }
+            # loop each table
+            for table_name, is_unchanged in plan:
+                with tracing.span("table", table_name=table_name):
+                    # Only an incremental run has unchanged tables
+                    if is_unchanged and manifest is not None:
+                        entry = manifest.carry_forward(table_name=table_name)
+                        timer = StageTimer(enabled=profile is not None)
+                        with timer.stage("yaml"):
+                            raw_model_yaml.write(entry["raw_model"])
+                            cur_model_yaml.write(entry["cur_model"])
+                        if profile is not None:
+                            profile.add_table(table_name=table_name, timer=timer)
+                        yield from _take_files(raw_model_yaml, cur_model_yaml)
+                        continue
 
-        # join all of the table dicts to my table list
-        raw_model_table_list.append(table_desc)
+                    # With --workers, the wait for the table to come back from the pool
+                    with tracing.span("wait_for_render", table_name=table_name):
+                        rendered = next(rendered_tables)
+                    tracing.add_events(rendered.trace_events)
+                    timer = rendered.timer
+                    # The consumer takes the table's files, e.g. writes them, while the generator waits here
+                    with timer.stage("write_files"):
+                        for path, content in rendered.files.items():
+                            yield Artefact(path=path, content=content)
 
-        # scd2 yaml
-        column_list = []
+                    if manifest is not None:
+                        manifest.record(
+                            table_name=table_name,
+                            fingerprint=fingerprints[table_name],
+                            files=list(rendered.files),
+                            raw_model=rendered.raw_model,
+                            cur_model=rendered.cur_model,
+                        )
 
-        # csv file parser only accepts "unique,footest,bartest" as format
-        # tried a few combinations but it kept complaining
-        # so type is string (if not nan) then i convert to list
+                    with timer.stage("yaml"):
+                        raw_model_yaml.write(rendered.raw_model)
+                        cur_model_yaml.write(rendered.cur_model)
+                    if profile is not None:
+                        profile.add_table(table_name=table_name, timer=timer)
+                    yield from _take_files(raw_model_yaml, cur_model_yaml)
 
-        for row in df_filtered.itertuples():
-            column_tests_scd2 = row.column_tests
-            column_tests_scd2_list = []
+    # The unsharded YAML, and the last shard, are complete once the writers are closed
+    yield from _take_files(raw_model_yaml, cur_model_yaml)
 
-            column_desc = {
-                "name": row.column_name,
-                "description": row.column_description,
-            }
-            if column_tests_scd2 == column_tests_scd2:
-                column_tests_scd2_list = column_tests_scd2.split(",")
-                column_desc |= {
-                    "tests": column_tests_scd2_list,
-                }
-            column_list.append(column_desc)
-
-        if len(unique_key_list) > 1:
-            column_desc = {
-                "name": "unique_key",
-                "description": "generated column for curated scd2",
-            }
-            column_list.insert(0, column_desc)
+    if manifest is not None:
+        log.info(
+            "Incremental run: skipped %s unchanged of %s tables",
+            skipped_tables,
+            table_count,
+        )
+        yield Artefact(
+            path=GenerationManifest.path(output_folder), content=manifest.content()
+        )
 
-        if len(updated_date_list) > 1:
-            column_desc = {
-                "name": "updated_date",
-                "description": "generated column for curated scd2",
-            }
-            column_list.insert(0, column_desc)
-
-        # add in the default scd2 columns
-        # "ROW_START_AT","ROW_END_AT","ROW_IS_CURRENT","TRACKING_HASH"
-        scd2_default_columns = [
-            "TRACKING_HASH",
-            "ROW_START_AT",
-            "ROW_END_AT",
-            "ROW_IS_CURRENT",
-        ]
-        for col in scd2_default_columns:
-            column_desc = {"name": col, "description": "SCD2 standard column"}
-            column_list.append(column_desc)
-
-        table_desc = {
-            "name": cur_model_name,
-            "description": table_description,
-            "columns": column_list,
-        }
 
-        # join all of the table dicts to my table list
-        model_scd2_table_list.append(table_desc)
-
-    # output dbt raw yaml
-    raw_model_yml = {"version": 2, "models": raw_model_table_list}
-    # ToDo: handle when there are no scd2!!
-    local_filesystem.write_file(
-        filepath=f"{output_folder}/output_dbt/raw_model_yaml/{raw_source_yaml_filename}",
-        content=yaml.dump(
-            raw_model_yml,
-            Dumper=MyDumper,
-            sort_keys=False,
-            default_flow_style=False,
+def master(
+    action: str,
+    database: str,
+    schema: str,
+    input_file: str,
+    output_folder: str,
+    source_short_name: str,
+    local_filesystem: BaseFilesystem = LocalFilesystem(),
+    incremental: bool = False,
+    workers: int = 1,
+    chunksize: Optional[int] = None,
+    presorted: bool = True,
+    input_format: Optional[str] = None,
+    yaml_shard_size: Optional[int] = None,
+    profile: Optional[GenerationProfile] = None,
+    manifest: Optional[GenerationManifest] = None,
+    executor: Optional["ProcessPoolExecutor"] = None,
+    parse_cache: bool = True,
+) -> None:
+    skipped_writes_before = local_filesystem.skipped_writes
+    # Writes the artefacts to the filesystem as they are generated. The model YAML is streamed straight to it, so that
+    # the YAML of a whole catalog is never held in memory.
+    write_artefacts(
+        generate_artefacts(
+            action=action,
+            database=database,
+            schema=schema,
+            input_file=input_file,
+            output_folder=output_folder,
+            source_short_name=source_short_name,
+            local_filesystem=local_filesystem,
+            incremental=incremental,
+            workers=workers,
+            chunksize=chunksize,
+            presorted=presorted,
+            input_format=input_format,
+            yaml_shard_size=yaml_shard_size,
+            profile=profile,
+            manifest=manifest,
+            executor=executor,
+            parse_cache=parse_cache,
+            model_yaml_filesystem=local_filesystem,
         ),
+        filesystem=local_filesystem,
     )
 
-    # output dbt scd2 yaml
-    model_scd2_yml = {"version": 2, "models": model_scd2_table_list}
-    # ToDo: handle when there are no scd2!!
-    local_filesystem.write_file(
-        filepath=f"{output_folder}/output_dbt/cur_model_yaml/{cur_source_yaml_filename}",
-        content=yaml.dump(
-            model_scd2_yml,
-            Dumper=MyDumper,
-            sort_keys=False,
-            default_flow_style=False,
-        ),
+    if local_filesystem.only_write_changed:
+        skipped_writes = local_filesystem.skipped_writes - skipped_writes_before
+        log.info(
+            "Skipped %s writes of files whose content had not changed", skipped_writes
+        )
+
+
+def watch_master(
+    input_file: str,
+    output_folder: str,
+    local_filesystem: BaseFilesystem = LocalFilesystem(),
+    interval: float = 0.2,
+    max_runs: Optional[int] = None,
+    **master_kwargs: Any,
+) -> int:
+    """
+    Generate, then generate again every time the input file changes, until interrupted. The process, and with it the
+    imported modules and compiled templates, stays up between runs, and so does the manifest, so each run only renders
+    the tables whose metadata rows have changed since the run before. A run that fails, e.g. on an invalid save, leaves
+    the output of the run before as it was. Like any incremental run, every run reads the input with pandas, as that
+    is what the fingerprints hash, so the small CSV fast path of read_small_csv is never taken. With more than one of
+    the --workers, their pool is started once and used for every run.
+    :param input_file: str; the input file, which is watched.
+    :param output_folder: str; as for master.
+    :param local_filesystem: BaseFilesystem; as for master. The input file is watched on the local disk.
+    :param interval: float; seconds between polls of the input file.
+    :param max_runs: int; stop after this many runs. Runs until interrupted by default.
+    :param master_kwargs: Any; every other argument of master.
+    :return: int; the number of runs.
+    """
+    manifest = GenerationManifest.load(
+        filesystem=local_filesystem, output_folder=output_folder
     )
+    manifest.entry_cache = RenderedEntryCache()
+
+    def run() -> None:
+        nonlocal manifest
+        try:
+            master(
+                input_file=input_file,
+                output_folder=output_folder,
+                local_filesystem=local_filesystem,
+                manifest=manifest,
+                **master_kwargs,
+            )
+        except Exception:
+            manifest = manifest.next_run(completed=False)
+            raise
+        manifest = manifest.next_run()
+
+    with ExitStack() as stack:
+        if (
+            master_kwargs.get("executor") is None
+            and master_kwargs.get("workers", 1) > 1
+        ):
+            # Imported here, as the multiprocessing machinery is only needed with --workers
+            from concurrent.futures import ProcessPoolExecutor
+
+            master_kwargs["executor"] = stack.enter_context(
+                ProcessPoolExecutor(max_workers=master_kwargs["workers"])
+            )
+        runs = watch(
+            run=run,
+            watcher=InputWatcher(filepaths=[input_file], interval=interval),
+            max_runs=max_runs,
+        )
+    return runs
 
 
 if __name__ == "__main__":
@@ -380,9 +773,13 @@ if __name__ == "__main__":
     parser.add_argument(
         "-i",
         "--input_filepath",
+        # spelt out so that it isn't ambiguous with --input-format
+        "--input",
+        dest="input_filepath",
         type=str,
         help="""
-            Path to the input CSV, which contains the metadata to drive the generator. Expected CSV header is:
+            Path to the input CSV, parquet or Arrow file, which contains the metadata to drive the generator. Expected
+            CSV header is:
             table_name,table_description,curated_dbt_type,column_name,column_description,source_data_type,column_type,
             column_tests
             """,
@@ -404,13 +801,366 @@ if __name__ == "__main__":
             Short name of the source, e.g. Alliant
             """,
     )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="""
+            Only regenerate tables whose metadata rows (or the templates) have changed since the last run. Requires
+            the manifest written to the output folder by a previous incremental run, otherwise all tables are
+            generated.
+            """,
+    )
+
+    parser.add_argument(
+        "--workers",
+        default=1,
+        type=int,
+        help="""
+            Optional. Number of worker processes used to render tables in parallel. Defaults to 1, which renders every
+            table in this process.
+            """,
+    )
+
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        help="""
+            Optional. Stream the input in chunks of this many rows rather than loading it all at once, so that memory
+            use is bounded by the largest table rather than the size of the input. All input columns are then read
+            as text.
+            """,
+    )
+
+    parser.add_argument(
+        "--unsorted-input",
+        action="store_true",
+        help="""
+            Optional. Use with --chunksize when the rows of a table are not contiguous in the input. The rows are
+            grouped by table via a temporary file on disk before being generated.
+            """,
+    )
+
+    parser.add_argument(
+        "--no-parse-cache",
+        action="store_true",
+        help="""
+            Optional. Always parse the input, rather than reading a large CSV input from the cache of it parsed by an
+            earlier run, which is kept next to the input file.
+            """,
+    )
+
+    parser.add_argument(
+        "--only-write-changed",
+        action="store_true",
+        help="""
+            Optional. Leave generated files untouched when their content has not changed, so that their modification
+            times are preserved for dbt partial parsing and file sync tooling.
+            """,
+    )
+
+    parser.add_argument(
+        "--archive",
+        type=str,
+        default=None,
+        help="""
+            Optional. Generate into memory and write the output folder as a single archive at this path instead of
+            as individual files.
+            """,
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="""
+            Optional. Generate into memory and compare the output with the existing output folder, printing each file
+            that would be created, changed or left unchanged, without writing anything. Exits with status 1 when
+            anything would be created or changed, e.g. for a pre-commit check.
+            """,
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="""
+            Optional. Write every generated file to stdout as it is generated, one line of JSON per file with its
+            "path" and "content", instead of to the output folder, e.g. to pipe into another tool. The log goes to
+            stderr.
+            """,
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="""
+            Optional. Keep running, and generate again every time the input file is saved. Only the tables whose
+            metadata rows changed are rendered again. Stop with Ctrl+C.
+            """,
+    )
+
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=0.2,
+        help="""
+            Optional. Seconds between checks of the input file for --watch. Defaults to 0.2.
+            """,
+    )
+
+    parser.add_argument(
+        "--archive-format",
+        type=str,
+        default="tar",
+        choices=InMemoryFilesystem.archive_formats,
+        help="""
+            Optional. Format of the --archive. A bundle is every file concatenated into one text file.
+            """,
+    )
+
+    parser.add_argument(
+        "--input-format",
+        type=str,
+        default=None,
+        choices=list(INPUT_FORMATS),
+        help="""
+            Optional. Format of the input file: csv, parquet or arrow (Arrow IPC / Feather). Inferred from the file
+            extension by default.
+            """,
+    )
+
+    parser.add_argument(
+        "--yaml-shard-size",
+        type=int,
+        default=None,
+        help="""
+            Optional. Write the dbt model YAML as one file per this many models, next to the generated .sql models,
+            rather than a single file per schema. 1 writes one YAML file per model, named after it. A change to a
+            table then only rewrites, and has dbt re-parse, the YAML file its model is in.
+            """,
+    )
+
+    parser.add_argument(
+        "--log-level",
+        type=str.upper,
+        default=None,
+        choices=LOG_LEVELS,
+        help="""
+            Optional. Only log messages of this level and above. Defaults to the ADP_LOG_LEVEL environment variable,
+            else DEBUG.
+            """,
+    )
+
+    parser.add_argument(
+        "--log-file",
+        type=str,
+        default=None,
+        help="""
+            Optional. Also write the log to this file. Defaults to the ADP_LOG_FILE environment variable.
+            """,
+    )
+
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="""
+            Optional. Only log warnings and errors, skipping all debug logging.
+            """,
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="""
+            Optional. Write a JSON report of the wall and CPU time spent in each stage of the run (reading, parsing,
+            validation, each renderer, the YAML and the file writes) to this path, overall and for the slowest tables.
+            """,
+    )
+
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="""
+            Optional. Number of the slowest tables listed in the --profile report. Defaults to 10.
+            """,
+    )
+
+    parser.add_argument(
+        "--profile-cprofile",
+        type=str,
+        default=None,
+        help="""
+            Optional. Also run the generator under cProfile and write its stats to this path, to be read with pstats
+            or e.g. snakeviz. Only covers the main process, not --workers.
+            """,
+    )
+
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="""
+            Optional. Write a Chrome trace event JSON of the run to this path, with a span for each table, renderer and
+            filesystem call, including those of the --workers. Open it in chrome://tracing or https://ui.perfetto.dev.
+            """,
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="""
+            Optional. Run as a resident generator service on --service-socket, keeping the modules, templates and
+            --workers pool loaded, until stopped with Ctrl+C or --stop-service. Every other run then forwards to it.
+            """,
+    )
+
+    parser.add_argument(
+        "--service-socket",
+        type=str,
+        default=None,
+        help="""
+            Optional. Unix socket of the generator service. Defaults to the ADP_GENERATOR_SOCKET environment variable,
+            else a socket per user in the temp folder.
+            """,
+    )
+
+    parser.add_argument(
+        "--no-service",
+        action="store_true",
+        help="""
+            Optional. Generate in this process even when a generator service is running.
+            """,
+    )
+
+    parser.add_argument(
+        "--stop-service",
+        action="store_true",
+        help="""
+            Optional. Stop the generator service running on --service-socket.
+            """,
+    )
     args = parser.parse_args()
+    if args.watch and (args.archive or args.dry_run):
+        parser.error(
+            "--watch writes to the output folder, so cannot be used with --archive or --dry-run"
+        )
+    if args.stream and (args.archive or args.dry_run or args.watch):
+        parser.error(
+            "--stream writes to stdout, so cannot be used with --archive, --dry-run or --watch"
+        )
+    if args.serve and (args.archive or args.dry_run or args.watch or args.stream):
+        parser.error(
+            "--serve takes its runs from other invocations, so cannot be used with --archive, --dry-run, --watch or "
+            "--stream"
+        )
+    configure_logging(level=args.log_level, log_file=args.log_file, quiet=args.quiet)
+
+    socket_path = args.service_socket or default_socket_path()
+    if args.serve:
+        serve(master=master, socket_path=socket_path, workers=args.workers)
+        sys.exit(0)
+    if args.stop_service:
+        if not stop_service(socket_path=socket_path):
+            log.warning("No generator service is running on '%s'", socket_path)
+        sys.exit(0)
 
-    master(
+    arguments: Dict[str, Any] = dict(
         action=args.action,
         database=args.database,
         schema=args.schema,
         input_file=args.input_filepath,
         output_folder=args.output_folder,
         source_short_name=args.source_short_name,
+        incremental=args.incremental,
+        workers=args.workers,
+        chunksize=args.chunksize,
+        presorted=not args.unsorted_input,
+        input_format=args.input_format,
+        yaml_shard_size=args.yaml_shard_size,
+        parse_cache=not args.no_parse_cache,
     )
+    # Runs that write anywhere but the output folder, or need this process, are never forwarded to the service
+    runs_here = any(
+        [
+            args.no_service,
+            args.archive,
+            args.dry_run,
+            args.watch,
+            args.stream,
+            args.profile,
+            args.profile_cprofile,
+            args.trace,
+        ]
+    )
+    if not runs_here and forward_master(
+        arguments={
+            **arguments,
+            "only_write_changed": args.only_write_changed,
+            # The service logs the run as this process would have
+            "log_level": args.log_level or os.environ.get(LOG_LEVEL_ENV_VAR),
+            "log_file": args.log_file or os.environ.get(LOG_FILE_ENV_VAR),
+            "quiet": args.quiet,
+        },
+        socket_path=socket_path,
+    ):
+        sys.exit(0)
+
+    filesystem: BaseFilesystem = LocalFilesystem(
+        only_write_changed=args.only_write_changed
+    )
+    if args.archive or args.dry_run:
+        in_memory_filesystem = InMemoryFilesystem()
+        # The input still comes from disk
+        with filesystem.open_file(
+            filepath=args.input_filepath, mode="rb"
+        ) as input_stream, in_memory_filesystem.open_file(
+            filepath=args.input_filepath, mode="wb"
+        ) as in_memory_input_stream:
+            in_memory_input_stream.write(input_stream.read())
+        filesystem = in_memory_filesystem
+
+    profile = GenerationProfile() if args.profile else None
+    tracer = tracing.start_tracing() if args.trace else None
+    profiler = cProfile.Profile() if args.profile_cprofile else None
+    if profiler is not None:
+        profiler.enable()
+    master_kwargs: Dict[str, Any] = dict(
+        arguments, local_filesystem=filesystem, profile=profile
+    )
+    if args.watch:
+        watch_master(interval=args.watch_interval, **master_kwargs)
+    elif args.stream:
+        write_ndjson(generate_artefacts(**master_kwargs), stream=sys.stdout)
+    else:
+        master(**master_kwargs)
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile_cprofile)
+        log.info("Wrote cProfile stats to '%s'", args.profile_cprofile)
+    if profile is not None:
+        # The report always goes to disk, even when generating into memory for an --archive
+        LocalFilesystem().write_file(
+            filepath=args.profile,
+            content=json.dumps(profile.report(top_n=args.profile_top), indent=2),
+        )
+        log.info("Wrote the profile report to '%s'", args.profile)
+    if tracer is not None:
+        tracing.stop_tracing()
+        LocalFilesystem().write_file(filepath=args.trace, content=tracer.export())
+        log.info("Wrote %s trace events to '%s'", len(tracer.events), args.trace)
+    if args.archive:
+        in_memory_filesystem.export_archive(
+            target_filepath=args.archive,
+            folderpath=args.output_folder,
+            archive_format=args.archive_format,
+        )
+    if args.dry_run:
+        report = compare_output(
+            rendered=in_memory_filesystem,
+            target=LocalFilesystem(),
+            output_folder=args.output_folder,
+        )
+        for line in report.lines():
+            print(line)
+        sys.exit(1 if report.has_changes else 0)
@@ -0,0 +1,323 @@
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+import pandas as pd  # type: ignore
+
+import adp_generator
+from src.adapters.filesystems import InMemoryFilesystem
+from src.ddl_generators import (
+    CuratedDDLGenerator,
+    RawDDLGenerator,
+    TempRawDDLGenerator,
+)
+from src.logger import log
+from src.metadata_index import MetadataIndex
+from src.metadata_input import add_ddl_column_def
+from src.synthetic_catalog import build_catalog
+
+# (tables, columns per table) for each suite. The full suite spans 10 to 100,000 tables and 5 to 2,000 columns.
+SUITES = {
+    "quick": [(10, 5), (100, 50), (1_000, 20)],
+    "full": [
+        (10, 5),
+        (100, 50),
+        (1_000, 20),
+        (10_000, 10),
+        (100_000, 5),
+        (100, 2_000),
+        (1_000, 500),
+    ],
+}
+
+DATABASE = "BENCHMARK"
+SCHEMA = "DBO"
+INPUT_FILE = "input/metadata.csv"
+OUTPUT_FOLDER = "output"
+
+# Modules a small run should never import, see src/metadata_rows.py
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow"]
+# Run in a fresh interpreter: import the generator, then generate the catalog given on stdin into memory
+START_UP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import adp_generator
+from src.adapters.filesystems import InMemoryFilesystem
+imported = time.perf_counter()
+filesystem = InMemoryFilesystem()
+filesystem.write_file(filepath={input_file!r}, content=sys.stdin.read())
+adp_generator.master(
+    action="generate_all_objects",
+    database={database!r},
+    schema={schema!r},
+    input_file={input_file!r},
+    output_folder={output_folder!r},
+    source_short_name="bmk",
+    local_filesystem=filesystem,
+)
+done = time.perf_counter()
+print(json.dumps({{
+    "import_seconds": imported - start,
+    "run_seconds": done - imported,
+    "heavy_modules": [name for name in {heavy_modules!r} if name in sys.modules],
+}}))
+""".format(
+    input_file=INPUT_FILE,
+    database=DATABASE,
+    schema=SCHEMA,
+    output_folder=OUTPUT_FOLDER,
+    heavy_modules=HEAVY_MODULES,
+)
+
+
+def _measure(
+    stage: Callable[[], Any], repeat: int, trace_memory: bool
+) -> dict[str, Any]:
+    # Best wall time of the repeats, plus the peak traced allocation of one further traced run. Memory is traced
+    # separately because tracemalloc itself slows allocation heavy code down considerably.
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        timings.append(time.perf_counter() - start)
+    result: dict[str, Any] = {"seconds": round(min(timings), 6)}
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            stage()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["peak_memory_bytes"] = peak
+    return result
+
+
+def measure_start_up(
+    table_count: int = 10, columns_per_table: int = 5, repeat: int = 1
+) -> dict[str, Any]:
+    """
+    Benchmark a cold start of the generator for a small catalog, as a CI job calling adp_generator.py would see it:
+    a fresh interpreter importing the generator and its dependencies, then generating.
+    :param table_count: int; number of tables in the catalog.
+    :param columns_per_table: int; number of columns in every table.
+    :param repeat: int; number of fresh interpreters started, the fastest is reported.
+    :return: dict; the import, generation and whole process wall times, and any of HEAVY_MODULES that were imported.
+    """
+    csv_content = build_catalog(
+        table_count=table_count, columns_per_table=columns_per_table
+    ).to_csv(index=False)
+    environment = {**os.environ, "ADP_LOG_LEVEL": "WARNING"}
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-c", START_UP_SCRIPT],
+            input=csv_content,
+            capture_output=True,
+            text=True,
+            check=True,
+            # The generators folder, from which adp_generator and src are imported
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=environment,
+        )
+        run = json.loads(completed.stdout.splitlines()[-1])
+        run["process_seconds"] = time.perf_counter() - start
+        runs.append(run)
+    return {
+        "tables": table_count,
+        "columns_per_table": columns_per_table,
+        **{
+            key: round(min(run[key] for run in runs), 6)
+            for key in ("import_seconds", "run_seconds", "process_seconds")
+        },
+        "heavy_modules": sorted(
+            {name for run in runs for name in run["heavy_modules"]}
+        ),
+    }
+
+
+def run_scenario(
+    table_count: int,
+    columns_per_table: int,
+    repeat: int = 1,
+    trace_memory: bool = True,
+    master_kwargs: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """
+    Benchmark each stage of the generator against a synthetic catalog, generating into memory so that disk speed
+    does not affect the results.
+    :param table_count: int; number of tables in the catalog.
+    :param columns_per_table: int; number of columns in every table.
+    :param repeat: int; number of timed runs of each stage, the fastest is reported.
+    :param trace_memory: bool; also report the peak memory allocated by each stage.
+    :param master_kwargs: dict; extra keyword arguments for adp_generator.master, e.g. workers.
+    :return: dict; the scenario size, per stage results and total wall time.
+    """
+    scenario_start = time.perf_counter()
+    csv_content = build_catalog(
+        table_count=table_count, columns_per_table=columns_per_table
+    ).to_csv(index=False)
+    df = add_ddl_column_def(pd.read_csv(io.StringIO(csv_content), sep=","))
+    index = MetadataIndex(df)
+    curated_database = f"CUR_{DATABASE}"
+
+    def run_master() -> None:
+        filesystem = InMemoryFilesystem()
+        filesystem.write_file(filepath=INPUT_FILE, content=csv_content)
+        adp_generator.master(
+            action="generate_all_objects",
+            database=DATABASE,
+            schema=SCHEMA,
+            input_file=INPUT_FILE,
+            output_folder=OUTPUT_FOLDER,
+            source_short_name="bmk",
+            local_filesystem=filesystem,
+            **(master_kwargs or {}),
+        )
+
+    stages: dict[str, Callable[[], Any]] = {
+        "read_csv": lambda: pd.read_csv(io.StringIO(csv_content), sep=","),
+        "metadata_index": lambda: MetadataIndex(df),
+        "temp_raw_ddl": lambda: [
+            TempRawDDLGenerator.run(
+                raw_database=DATABASE, raw_schema=SCHEMA, table_name=table_name
+            )
+            for table_name in index.table_names
+        ],
+        "raw_ddl": lambda: [
+            RawDDLGenerator.run(
+                raw_database=DATABASE, raw_schema=SCHEMA, table_name=table_name
+            )
+            for table_name in index.table_names
+        ],
+        "curated_ddl": lambda: [
+            CuratedDDLGenerator.run(
+                curated_database=curated_database,
+                curated_schema=SCHEMA,
+                table_name=table.table_name,
+                table_metadata=table,
+            )
+            for table in index.tables()
+        ],
+        "master": run_master,
+    }
+    results = {}
+    for name, stage in stages.items():
+        log.warning(
+            "Benchmarking '%s' for %sx%s.", name, table_count, columns_per_table
+        )
+        results[name] = _measure(stage=stage, repeat=repeat, trace_memory=trace_memory)
+    return {
+        "tables": table_count,
+        "columns_per_table": columns_per_table,
+        "rows": len(df),
+        "stages": results,
+        "wall_seconds": round(time.perf_counter() - scenario_start, 6),
+    }
+
+
+def run_benchmarks(
+    sizes: list[tuple[int, int]],
+    repeat: int = 1,
+    trace_memory: bool = True,
+    master_kwargs: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    # Generator logging is silenced below WARNING, so it isn't part of the timings
+    level = log.level
+    log.setLevel(logging.WARNING)
+    try:
+        scenarios = [
+            run_scenario(
+                table_count=table_count,
+                columns_per_table=columns_per_table,
+                repeat=repeat,
+                trace_memory=trace_memory,
+                master_kwargs=master_kwargs,
+            )
+            for table_count, columns_per_table in sizes
+        ]
+    finally:
+        log.setLevel(level)
+    start_up = measure_start_up(repeat=repeat)
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "start_up": start_up,
+        "scenarios": scenarios,
+    }
+
+
+def _parse_size(size: str) -> tuple[int, int]:
+    table_count, columns_per_table = size.lower().split("x")
+    return int(table_count), int(columns_per_table)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the ADP generator against synthetic metadata catalogs."
+    )
+    parser.add_argument(
+        "--suite",
+        type=str,
+        default="quick",
+        choices=list(SUITES),
+        help="Optional. The catalog sizes to run.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=_parse_size,
+        nargs="+",
+        default=None,
+        help="""
+            Optional. Catalog sizes as TABLESxCOLUMNS, e.g. '1000x50 100x2000'. Overrides --suite.
+            """,
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Optional. Timed runs per stage, the fastest is reported.",
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Optional. Skip the traced run used to measure peak memory.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Optional. Passed on to adp_generator.master for the 'master' stage.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="Optional. Write the JSON results to this file instead of stdout.",
+    )
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        sizes=args.sizes or SUITES[args.suite],
+        repeat=args.repeat,
+        trace_memory=not args.no_memory,
+        master_kwargs={"workers": args.workers},
+    )
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report_json + "\n")
+    else:
+        print(report_json)
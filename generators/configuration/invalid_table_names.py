@@ -5,10 +5,6 @@
 # what tables are processed by the generator.
 
 invalid_table_names: list[str] = [
-    "APPLICABLE_ROLES",
-    "COLUMNS",
-    "DATABASES",
-    "ENABLED_ROLES",
     "APPLICABLE_ROLES",
     "COLUMNS",
     "DATABASES",
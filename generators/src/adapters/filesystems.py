@@ -1,10 +1,54 @@
 import abc
-from pathlib import Path
+import hashlib
+import io
+import locale
+import posixpath
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Callable, Iterator, Optional, Union, cast
+from src import tracing
 from src.logger import log
 import os
 
 
 class BaseFilesystem(metaclass=abc.ABCMeta):
+    # The methods that touch storage, which are traced as 'filesystem' spans in every implementation
+    traced_methods = (
+        "path_exists",
+        "read_file",
+        "open_file",
+        "list_files",
+        "list_folders",
+        "list_contents",
+        "write_file",
+        "write_files",
+        "file_matches",
+        "delete_file",
+        "move_file",
+        "export_archive",
+    )
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        for name in cls.traced_methods:
+            method = cls.__dict__.get(name)
+            if isinstance(method, types.FunctionType) and not getattr(
+                method, "__isabstractmethod__", False
+            ):
+                setattr(cls, name, tracing.traced("filesystem")(method))
+
+    def __init__(self, only_write_changed: bool = False):
+        """
+        :param only_write_changed: bool; when True, write_file leaves a file untouched if it already holds exactly the
+        given content, so that its modification time is preserved. The number of writes avoided this way is counted
+        in skipped_writes.
+        """
+        self.only_write_changed = only_write_changed
+        self.skipped_writes = 0
+
     @abc.abstractmethod
     def posix_path(self, path: str) -> str:
         """
@@ -79,6 +123,17 @@ class BaseFilesystem(metaclass=abc.ABCMeta):
         """
         pass
 
+    @abc.abstractmethod
+    def open_file(self, filepath: str, mode: str = "r") -> IO:
+        """
+        Open a file for streaming, rather than handling its whole content as a single string.
+        :param filepath: str; a filepath. When reading, raises a KeyError if the file does not exist and a TypeError if
+        a folderpath is passed. When writing, any directories needed are created.
+        :param mode: str; the mode to open the file in, as for the builtin open() e.g. "r", "rb" or "w".
+        :return: IO; the open file object, which the caller is responsible for closing.
+        """
+        pass
+
     @abc.abstractmethod
     def is_directory(self, path: str) -> bool:
         """
@@ -125,7 +180,8 @@ class BaseFilesystem(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def write_file(self, filepath: str, content: str) -> None:
         """
-        Write file content to a given filepath. Will overwrite any current file content.
+        Write file content to a given filepath. Will overwrite any current file content, unless only_write_changed is
+        set and the file already holds the same content.
         :param filepath: str; Path to the relevant file. Passing a folderpath with throw a TypeError. Will not throw an
         error if the file exists - it will be overwritten
         :param content: str; The content to be written to the file as a string. Will throw a TypeError if it is not a
@@ -134,6 +190,29 @@ class BaseFilesystem(metaclass=abc.ABCMeta):
         """
         pass
 
+    def write_files(self, files: dict[str, str]) -> None:
+        """
+        Write a batch of files in one call. Implementations may write the files concurrently. The default simply calls
+        write_file for each file in turn.
+        :param files: dict[str, str]; mapping of filepath to the content to be written to it. The same rules as
+        write_file apply to every entry.
+        :return: None
+        """
+        for filepath, content in files.items():
+            self.write_file(filepath=filepath, content=content)
+
+    def file_matches(self, filepath: str, content: str) -> bool:
+        """
+        Check whether a file already holds exactly the given content, i.e. whether write_file would leave it as it is.
+        The default reads the file back, implementations may compare more cheaply.
+        :param filepath: str; Path to the relevant file.
+        :param content: str; The content to compare with.
+        :return: bool; True when the file exists and holds the content, False otherwise.
+        """
+        return self.path_exists(path=filepath) and (
+            self.read_file(filepath=filepath) == content
+        )
+
     @abc.abstractmethod
     def delete_file(self, filepath: str) -> None:
         """
@@ -144,10 +223,33 @@ class BaseFilesystem(metaclass=abc.ABCMeta):
         """
         pass
 
+    def move_file(self, source_filepath: str, target_filepath: str) -> None:
+        """
+        Move a file to another filepath, replacing any file already there, e.g. to put a file streamed out alongside
+        in place only once it is complete. The default copies the content and deletes the source, implementations may
+        move the file in one step.
+        :param source_filepath: str; Path to the file to move.
+        :param target_filepath: str; Path to move it to.
+        :return: None
+        """
+        self.write_file(
+            filepath=target_filepath, content=self.read_file(filepath=source_filepath)
+        )
+        self.delete_file(filepath=source_filepath)
+
 
 class LocalFilesystem(BaseFilesystem):
     # TODO: filelib wants to read files before finding suffixes etc. This means it can't operate on theoretical
     #  files. Should replace this with logic that can.
+    def __init__(self, only_write_changed: bool = False, max_write_threads: int = 8):
+        super().__init__(only_write_changed=only_write_changed)
+        # write_files hands the individual writes to a bounded thread pool, created on first use
+        self.max_write_threads = max_write_threads
+        self._write_pool: Optional[ThreadPoolExecutor] = None
+        # Directories already created by this instance, so each one is only made once
+        self._created_directories: set[str] = set()
+        self._lock = threading.Lock()
+
     @staticmethod
     def _get_path(path: str) -> Path:
         # Convert an incoming string into a Path object
@@ -187,30 +289,49 @@ class LocalFilesystem(BaseFilesystem):
         # True if it is a file, false otherwise
         return path[-1] != "/" and path[-1] != "\\"
 
+    @staticmethod
+    def _content_matches(path: Path, content: str) -> bool:
+        # Cheap size check first, then only hash the file when the sizes match
+        try:
+            size_on_disk = os.stat(path).st_size
+        except FileNotFoundError:
+            return False
+        # Match what open(mode="w") would write, including newline translation
+        if os.linesep != "\n":
+            content = content.replace("\n", os.linesep)
+        encoded = content.encode(locale.getpreferredencoding(False))
+        if size_on_disk != len(encoded):
+            return False
+        digest = hashlib.sha256()
+        with open(path, mode="rb") as existing_file:
+            for block in iter(lambda: existing_file.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.digest() == hashlib.sha256(encoded).digest()
+
     @staticmethod
     def _create_directories_as_needed(path: str) -> None:
         # Create any directories needed to fill out the path
-        log.debug(f"Creating directories needed for path '{path}'.")
+        log.debug("Creating directories needed for path '%s'.", path)
         os.makedirs(name=path, exist_ok=True)
 
     def posix_path(self, path: str) -> str:
-        log.debug(f"Converting path {path} to posix form.")
+        log.debug("Converting path %s to posix form.", path)
         posix_path = Path(path).as_posix()
         return posix_path
 
     def list_files(self, folderpath: str) -> list[str]:
-        log.debug(f"Listing files in path '{folderpath}'.")
+        log.debug("Listing files in path '%s'.", folderpath)
         converted_path = self._get_path(folderpath)
         self._throw_error_if_non_existent(converted_path)
         self._throw_error_if_not_directory(converted_path)
         files = [
             str(item.name) for item in converted_path.iterdir() if not item.is_dir()
         ]
-        log.debug(f"Found files: '{files}'.")
+        log.debug("Found files: '%s'.", files)
         return files
 
     def list_folders(self, folderpath: str) -> list[str]:
-        log.debug(f"Listing folders in path '{folderpath}'.")
+        log.debug("Listing folders in path '%s'.", folderpath)
         converted_path = self._get_path(folderpath)
         self._throw_error_if_non_existent(converted_path)
         self._throw_error_if_not_directory(converted_path)
@@ -220,60 +341,77 @@ class LocalFilesystem(BaseFilesystem):
             if item.is_dir()
         ]
         folders = list(filter(lambda a: a is not None, folders))
-        log.debug(f"Found folders: '{folders}'.")
+        log.debug("Found folders: '%s'.", folders)
         return folders
 
     def list_contents(self, folderpath: str) -> list[str]:
-        log.debug(f"Listing contents in path '{folderpath}'.")
+        log.debug("Listing contents in path '%s'.", folderpath)
         folders = self.list_folders(folderpath)
         files = self.list_files(folderpath)
         contents = folders + files
-        log.debug(f"Found contents: '{contents}'.")
+        log.debug("Found contents: '%s'.", contents)
         return contents
 
     def path_exists(self, path: str) -> bool:
-        log.debug(f"Checking if path exists: '{path}'.")
-        converted_path = self._get_path(path)
-        result = converted_path.exists()
-        log.debug(f"Exist check result: '{result}'.")
+        log.debug("Checking if path exists: '%s'.", path)
+        # os.path rather than a Path, as incremental runs check every output of every table
+        result = os.path.exists(path)
+        log.debug("Exist check result: '%s'.", result)
         return result
 
     def read_file(self, filepath: str) -> str:
-        log.info(f"Reading file at path '{filepath}'.")
+        log.info("Reading file at path '%s'.", filepath)
         converted_path = self._get_path(filepath)
         self._throw_error_if_non_existent(converted_path)
         self._throw_error_if_not_file(converted_path)
         with open(converted_path) as file:
             content = file.read()
         file.close()
-        log.debug(f"Size of content read: '{len(content)}'.")
+        log.debug("Size of content read: '%s'.", len(content))
         return content
 
+    def open_file(self, filepath: str, mode: str = "r") -> IO:
+        log.info("Opening file at path '%s' with mode '%s'.", filepath, mode)
+        converted_path = self._get_path(filepath)
+        if "r" in mode:
+            self._throw_error_if_non_existent(converted_path)
+            self._throw_error_if_not_file(converted_path)
+        else:
+            if not self._manual_is_file(path=filepath):
+                exc = TypeError(
+                    f"The given path is not a filepath. Inferred absolute path: '{converted_path.absolute()}'."
+                )
+                log.warning(exc)
+                raise exc
+            parent_path = self.path_parent(path=filepath)
+            self._create_directories_as_needed(path=parent_path)
+        return open(converted_path, mode=mode)
+
     def is_directory(self, path: str) -> bool:
-        log.debug(f"Checking if the item at path '{path}' is a directory.")
+        log.debug("Checking if the item at path '%s' is a directory.", path)
         converted_path = self._get_path(path)
         self._throw_error_if_non_existent(converted_path)
         result = converted_path.is_dir()
-        log.debug(f"Directory check result: '{result}'.")
+        log.debug("Directory check result: '%s'.", result)
         return result
 
     def absolute_path(self, path: str) -> str:
-        log.debug(f"Getting absolute path for path '{path}'.")
+        log.debug("Getting absolute path for path '%s'.", path)
         converted_path = self._get_path(path)
         abs_path = converted_path.absolute().as_posix()
-        log.debug(f"Absolute path is '{abs_path}'.")
+        log.debug("Absolute path is '%s'.", abs_path)
         return abs_path
 
     def path_parent(self, path: str) -> str:
-        log.debug(f"Getting parent for path '{path}'.")
+        log.debug("Getting parent for path '%s'.", path)
         converted_path = self._get_path(path)
         parent_path = converted_path.parent.absolute()
         str_parent_path = parent_path.as_posix()
-        log.debug(f"Parent is '{str_parent_path}'.")
+        log.debug("Parent is '%s'.", str_parent_path)
         return str_parent_path
 
     def filename(self, filepath: str) -> str:
-        log.debug(f"Getting filename for path '{filepath}'.")
+        log.debug("Getting filename for path '%s'.", filepath)
         converted_path = self._get_path(filepath)
         if not self._manual_is_file(filepath):
             exc = TypeError(
@@ -282,11 +420,11 @@ class LocalFilesystem(BaseFilesystem):
             log.warning(exc)
             raise exc
         filename = converted_path.name
-        log.debug(f"Filename is '{filename}'.")
+        log.debug("Filename is '%s'.", filename)
         return filename
 
     def filename_stem(self, filepath: str) -> str:
-        log.debug(f"Getting filename stem for path '{filepath}'.")
+        log.debug("Getting filename stem for path '%s'.", filepath)
         converted_path = self._get_path(filepath)
         if not self._manual_is_file(filepath):
             exc = TypeError(
@@ -300,11 +438,11 @@ class LocalFilesystem(BaseFilesystem):
             suffixes = [str(suffix) for suffix in raw_suffixes]
             for i in range(2, len(suffixes) + 1):
                 stem = stem.removesuffix(suffixes[-i])
-        log.debug(f"Filename stem is '{stem}'.")
+        log.debug("Filename stem is '%s'.", stem)
         return stem
 
     def filename_extension(self, filepath: str) -> str:
-        log.debug(f"Getting filename extension for path '{filepath}'.")
+        log.debug("Getting filename extension for path '%s'.", filepath)
         converted_path = self._get_path(filepath)
         if not self._manual_is_file(filepath):
             exc = TypeError(
@@ -317,11 +455,11 @@ class LocalFilesystem(BaseFilesystem):
             result = ""
         else:
             result = "".join(suffixes)
-        log.debug(f"Filename extension is '{result}'.")
+        log.debug("Filename extension is '%s'.", result)
         return result
 
     def write_file(self, filepath: str, content: str) -> None:
-        log.debug(f"Writing file content to path '{filepath}'.")
+        log.debug("Writing file content to path '%s'.", filepath)
         converted_path = self._get_path(filepath)
         if not self._manual_is_file(path=filepath):
             exc = TypeError(
@@ -329,15 +467,54 @@ class LocalFilesystem(BaseFilesystem):
             )
             log.warning(exc)
             raise exc
-        parent_path = self.path_parent(path=filepath)
-        self._create_directories_as_needed(path=parent_path)
-        with open(file=converted_path, mode="w") as open_file:
+        if self.only_write_changed and self._content_matches(
+            path=converted_path, content=content
+        ):
+            log.debug("Content unchanged, skipping write to path '%s'.", filepath)
+            with self._lock:
+                self.skipped_writes += 1
+            return None
+        parent_path = str(converted_path.parent)
+        if parent_path not in self._created_directories:
+            self._create_directories_as_needed(path=parent_path)
+            self._created_directories.add(parent_path)
+        try:
+            open_file = open(file=converted_path, mode="w")
+        except FileNotFoundError:
+            # The directory has been removed since it was created, so forget about it and create it again
+            self._created_directories.discard(parent_path)
+            self._create_directories_as_needed(path=parent_path)
+            open_file = open(file=converted_path, mode="w")
+        with open_file:
             open_file.write(content)
-        open_file.close()
         return None
 
+    def write_files(self, files: dict[str, str]) -> None:
+        log.debug("Writing %s files.", len(files))
+        if len(files) <= 1 or self.max_write_threads <= 1:
+            super().write_files(files=files)
+            return None
+        if self._write_pool is None:
+            with self._lock:
+                if self._write_pool is None:
+                    self._write_pool = ThreadPoolExecutor(
+                        max_workers=self.max_write_threads,
+                        thread_name_prefix="write_files",
+                    )
+        futures = [
+            self._write_pool.submit(self.write_file, filepath=filepath, content=content)
+            for filepath, content in files.items()
+        ]
+        # Wait for every write, re-raising the first failure
+        for future in futures:
+            future.result()
+        return None
+
+    def file_matches(self, filepath: str, content: str) -> bool:
+        return self._content_matches(path=self._get_path(filepath), content=content)
+
     def delete_file(self, filepath: str) -> None:
-        log.debug(f"Deleting file at path '{filepath}'.")
+        log.debug("Deleting file at path '%s'.", filepath)
         converted_path = self._get_path(filepath)
         if not self._manual_is_file(path=filepath):
             exc = TypeError(
@@ -347,3 +524,311 @@ class LocalFilesystem(BaseFilesystem):
             raise exc
         os.remove(converted_path)
         return
+
+    def move_file(self, source_filepath: str, target_filepath: str) -> None:
+        log.debug("Moving file at path '%s' to '%s'.", source_filepath, target_filepath)
+        # Within the same folder, os.replace swaps the file in atomically, so no reader ever sees it half written
+        os.replace(self._get_path(source_filepath), self._get_path(target_filepath))
+        return
+
+
+class InMemoryWriteBuffer:
+    # File object returned by InMemoryFilesystem.open_file when writing. The content is only handed to on_close, e.g.
+    # to be stored in the filesystem, once the file is closed, as it would be when a real file is flushed.
+    def __init__(
+        self, on_close: Callable[[Union[str, bytes]], None], binary: bool, initial: Any
+    ):
+        self._on_close = on_close
+        self._buffer: Union[io.BytesIO, io.StringIO] = (
+            io.BytesIO(initial) if binary else io.StringIO(initial)
+        )
+        self._buffer.seek(0, io.SEEK_END)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._buffer, name)
+
+    def __enter__(self) -> "InMemoryWriteBuffer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._buffer.closed:
+            return
+        content = self._buffer.getvalue()
+        self._buffer.close()
+        self._on_close(content)
+
+
+class InMemoryFilesystem(BaseFilesystem):
+    """
+    Filesystem held entirely in memory. Paths are treated as posix paths below a virtual root, so relative paths are
+    resolved against '/'. Folders exist implicitly as the parents of any file written. Files written in binary mode
+    via open_file are kept as bytes and decoded as UTF-8 by read_file. The generated tree can be
+    exported in one go with export_archive, e.g. for CI dry runs that should never touch the disk.
+    """
+
+    archive_formats = ["tar", "tar.gz", "zip", "bundle"]
+
+    def __init__(self, only_write_changed: bool = False):
+        super().__init__(only_write_changed=only_write_changed)
+        self._files: dict[str, Union[str, bytes]] = {}
+        self._folders: set[str] = {"/"}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalise(path: str) -> str:
+        return posixpath.normpath(posixpath.join("/", PurePosixPath(path).as_posix()))
+
+    @staticmethod
+    def _manual_is_file(path: str) -> bool:
+        # True if the path looks like a filepath, false if it looks like a folderpath
+        return path[-1] != "/" and path[-1] != "\\"
+
+    def _throw_error_if_non_existent(self, path: str) -> None:
+        if path not in self._files and path not in self._folders:
+            exc = KeyError(
+                f"The given path does not exist. Inferred absolute path: '{path}'."
+            )
+            log.warning(exc)
+            raise exc
+
+    def _throw_error_if_not_filepath(self, filepath: str) -> None:
+        if not self._manual_is_file(filepath):
+            exc = TypeError(
+                f"The given path is not a filepath. Inferred absolute path: '{self._normalise(filepath)}'."
+            )
+            log.warning(exc)
+            raise exc
+
+    def _folder_entries(self, folderpath: str) -> tuple[list[str], list[str]]:
+        # The files and folders directly within a folder
+        path = self._normalise(folderpath)
+        self._throw_error_if_non_existent(path)
+        if path not in self._folders:
+            exc = TypeError(
+                f"The given path is not a directory. Inferred absolute path: '{path}'."
+            )
+            log.warning(exc)
+            raise exc
+        files = sorted(
+            posixpath.basename(filepath)
+            for filepath in self._files
+            if posixpath.dirname(filepath) == path
+        )
+        folders = sorted(
+            f"{posixpath.basename(folder)}/"
+            for folder in self._folders
+            if folder != path and posixpath.dirname(folder) == path
+        )
+        return files, folders
+
+    def _store(self, filepath: str, content: Union[str, bytes]) -> None:
+        path = self._normalise(filepath)
+        with self._lock:
+            if path in self._folders:
+                exc = TypeError(
+                    f"The given path is a directory. Inferred absolute path: '{path}'."
+                )
+                log.warning(exc)
+                raise exc
+            if self.only_write_changed and self._files.get(path) == content:
+                log.debug("Content unchanged, skipping write to path '%s'.", filepath)
+                self.skipped_writes += 1
+                return
+            self._files[path] = content
+            parent = posixpath.dirname(path)
+            while parent not in self._folders:
+                self._folders.add(parent)
+                parent = posixpath.dirname(parent)
+
+    def posix_path(self, path: str) -> str:
+        return PurePosixPath(path).as_posix()
+
+    def absolute_path(self, path: str) -> str:
+        return self._normalise(path)
+
+    def path_parent(self, path: str) -> str:
+        return posixpath.dirname(self._normalise(path))
+
+    def filename(self, filepath: str) -> str:
+        self._throw_error_if_not_filepath(filepath)
+        return PurePosixPath(filepath).name
+
+    def filename_stem(self, filepath: str) -> str:
+        filename = self.filename(filepath)
+        # Everything up to the first '.', ignoring a leading '.' on dotfiles
+        return filename[0] + filename[1:].split(".", 1)[0]
+
+    def filename_extension(self, filepath: str) -> str:
+        self._throw_error_if_not_filepath(filepath)
+        return "".join(PurePosixPath(filepath).suffixes)
+
+    def path_exists(self, path: str) -> bool:
+        path = self._normalise(path)
+        return path in self._files or path in self._folders
+
+    def _read_content(self, filepath: str) -> Union[str, bytes]:
+        path = self._normalise(filepath)
+        self._throw_error_if_non_existent(path)
+        if path not in self._files:
+            exc = TypeError(
+                f"The given path is not a file. Inferred absolute path: '{path}'."
+            )
+            log.warning(exc)
+            raise exc
+        return self._files[path]
+
+    def read_file(self, filepath: str) -> str:
+        log.debug("Reading in-memory file at path '%s'.", filepath)
+        content = self._read_content(filepath=filepath)
+        return content.decode() if isinstance(content, bytes) else content
+
+    def open_file(self, filepath: str, mode: str = "r") -> IO:
+        binary = "b" in mode
+        if "r" in mode:
+            if not binary:
+                return io.StringIO(self.read_file(filepath=filepath))
+            content = self._read_content(filepath=filepath)
+            return io.BytesIO(
+                content if isinstance(content, bytes) else content.encode()
+            )
+        self._throw_error_if_not_filepath(filepath)
+        initial: Union[str, bytes] = b"" if binary else ""
+        path = self._normalise(filepath)
+        if "a" in mode and path in self._files:
+            initial = self._files[path]
+            if binary and isinstance(initial, str):
+                initial = initial.encode()
+            elif not binary and isinstance(initial, bytes):
+                initial = initial.decode()
+        return cast(
+            IO,
+            InMemoryWriteBuffer(
+                on_close=lambda content: self._store(
+                    filepath=filepath, content=content
+                ),
+                binary=binary,
+                initial=initial,
+            ),
+        )
+
+    def is_directory(self, path: str) -> bool:
+        path = self._normalise(path)
+        self._throw_error_if_non_existent(path)
+        return path in self._folders
+
+    def list_files(self, folderpath: str) -> list[str]:
+        files, _ = self._folder_entries(folderpath)
+        return files
+
+    def list_folders(self, folderpath: str) -> list[str]:
+        _, folders = self._folder_entries(folderpath)
+        return folders
+
+    def list_contents(self, folderpath: str) -> list[str]:
+        files, folders = self._folder_entries(folderpath)
+        return folders + files
+
+    def write_file(self, filepath: str, content: str) -> None:
+        log.debug("Writing file content to in-memory path '%s'.", filepath)
+        self._throw_error_if_not_filepath(filepath)
+        if not isinstance(content, str):
+            exc = TypeError(
+                f"File content must be a string, got '{type(content).__name__}'."
+            )
+            log.warning(exc)
+            raise exc
+        self._store(filepath=filepath, content=content)
+
+    def delete_file(self, filepath: str) -> None:
+        log.debug("Deleting in-memory file at path '%s'.", filepath)
+        self._throw_error_if_not_filepath(filepath)
+        with self._lock:
+            self._files.pop(self._normalise(filepath), None)
+
+    def move_file(self, source_filepath: str, target_filepath: str) -> None:
+        log.debug(
+            "Moving in-memory file at path '%s' to '%s'.",
+            source_filepath,
+            target_filepath,
+        )
+        self._throw_error_if_not_filepath(target_filepath)
+        # Stored as is, so a file written in binary mode stays bytes
+        self._store(
+            filepath=target_filepath,
+            content=self._read_content(filepath=source_filepath),
+        )
+        self.delete_file(filepath=source_filepath)
+
+    def walk_files(self, folderpath: str = "/") -> Iterator[tuple[str, str]]:
+        """
+        Yield every file below a folder, recursively, in path order.
+        :param folderpath: str; the folder to walk. Defaults to the root.
+        :return: Iterator[tuple[str, str]]; (path relative to folderpath, content) pairs.
+        """
+        root = self._normalise(folderpath)
+        prefix = root.rstrip("/") + "/"
+        for path in sorted(self._files):
+            if path.startswith(prefix):
+                yield path[len(prefix) :], self.read_file(filepath=path)
+
+    def export_archive(
+        self,
+        target_filepath: str,
+        folderpath: str = "/",
+        archive_format: str = "tar",
+        target_filesystem: Optional[BaseFilesystem] = None,
+    ) -> int:
+        """
+        Export every file below a folder as a single archive, written to the target in one sequential write.
+        :param target_filepath: str; where to write the archive.
+        :param folderpath: str; only files below this folder are exported, with paths relative to it.
+        :param archive_format: str; one of "tar", "tar.gz", "zip" or "bundle". A bundle is every file concatenated
+        into one text file, each preceded by a '--- <relative path> <size in bytes>' header line.
+        :param target_filesystem: BaseFilesystem; where the archive is written. Defaults to the local disk.
+        :return: int; the size of the archive in bytes.
+        """
+        if archive_format not in self.archive_formats:
+            raise ValueError(
+                f"Unknown archive format '{archive_format}', expected one of {self.archive_formats}"
+            )
+        # Only imported when archiving, to keep them out of the start-up of every other run
+        import tarfile
+        import zipfile
+
+        archive = io.BytesIO()
+        files = list(self.walk_files(folderpath=folderpath))
+        if archive_format == "zip":
+            with zipfile.ZipFile(
+                archive, mode="w", compression=zipfile.ZIP_DEFLATED
+            ) as zip_archive:
+                for path, content in files:
+                    zip_archive.writestr(path, content)
+        elif archive_format == "bundle":
+            for path, content in files:
+                encoded = content.encode()
+                archive.write(f"--- {path} {len(encoded)}\n".encode())
+                archive.write(encoded)
+        else:
+            mode = "w:gz" if archive_format == "tar.gz" else "w"
+            modified_time = int(time.time())
+            with tarfile.open(fileobj=archive, mode=mode) as tar_archive:  # type: ignore
+                for path, content in files:
+                    encoded = content.encode()
+                    member = tarfile.TarInfo(name=path)
+                    member.size = len(encoded)
+                    member.mtime = modified_time
+                    tar_archive.addfile(member, io.BytesIO(encoded))
+
+        target_filesystem = target_filesystem or LocalFilesystem()
+        log.info(
+            "Exporting %s files as a %s archive to '%s'.",
+            len(files),
+            archive_format,
+            target_filepath,
+        )
+        with target_filesystem.open_file(filepath=target_filepath, mode="wb") as target:
+            target.write(archive.getbuffer())
+        return archive.getbuffer().nbytes
@@ -0,0 +1,59 @@
+import json
+from typing import IO, Iterable, NamedTuple
+
+from src.adapters.filesystems import BaseFilesystem
+from src.logger import log
+
+# Artefacts handed to BaseFilesystem.write_files at a time by write_artefacts
+WRITE_BATCH_SIZE = 16
+
+
+class Artefact(NamedTuple):
+    # A generated file: where it goes and what it holds
+    path: str
+    content: str
+
+
+def write_artefacts(
+    artefacts: Iterable[Artefact],
+    filesystem: BaseFilesystem,
+    batch_size: int = WRITE_BATCH_SIZE,
+) -> int:
+    """
+    Write a stream of artefacts to a filesystem as they arrive, a batch at a time so that a filesystem can write each
+    batch concurrently. If the stream fails part way, the artefacts already taken from it are still written.
+    :param artefacts: Iterable[Artefact]; e.g. adp_generator.generate_artefacts(...).
+    :param filesystem: BaseFilesystem; where to write them.
+    :param batch_size: int; the number of artefacts in each call to write_files.
+    :return: int; the number of artefacts written.
+    """
+    count = 0
+    batch: dict[str, str] = {}
+    try:
+        for path, content in artefacts:
+            batch[path] = content
+            count += 1
+            if len(batch) >= batch_size:
+                full, batch = batch, {}
+                filesystem.write_files(files=full)
+    finally:
+        if batch:
+            filesystem.write_files(files=batch)
+    return count
+
+
+def write_ndjson(artefacts: Iterable[Artefact], stream: IO) -> int:
+    """
+    Write a stream of artefacts as newline delimited JSON, one {"path": ..., "content": ...} object per line, e.g. to
+    stdout to be piped into another tool.
+    :param artefacts: Iterable[Artefact]; e.g. adp_generator.generate_artefacts(...).
+    :param stream: IO; a text stream to write the lines to.
+    :return: int; the number of artefacts written.
+    """
+    count = 0
+    for artefact in artefacts:
+        stream.write(json.dumps(artefact._asdict()) + "\n")
+        count += 1
+    stream.flush()
+    log.info("Streamed %s artefacts", count)
+    return count
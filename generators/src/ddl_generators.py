@@ -1,18 +1,28 @@
-from templates.ddls import RAW_TEMP_DDL, RAW_DDL, CURATED_DDL
+from templates.ddls import RAW_TEMP_DDL, RAW_DDL, CURATED_DDL, CURATED_DDL_COLUMN
+from src import tracing
 from src.logger import log
-import pandas as pd  # type: ignore
 from enum import Enum
+from typing import TYPE_CHECKING, Any, Optional, Sequence
 from src.input_data_values import ColumnTypes, CuratedDBTType
+from src.metadata_rows import TableSpec
+from src.templating import compile_template
+
+# pandas is only used for type hints here
+if TYPE_CHECKING:
+    import pandas as pd  # type: ignore
 
 
 class TempRawDDLGenerator:
     @staticmethod
+    @tracing.traced("ddl")
     def run(raw_database: str, raw_schema: str, table_name: str):
         log.info(
-            f"Generating Temp Raw DDL for '{raw_database}.{raw_schema}.TEMP_{table_name}'"
+            "Generating Temp Raw DDL for '%s.%s.TEMP_%s'",
+            raw_database,
+            raw_schema,
+            table_name,
         )
-        template = RAW_TEMP_DDL
-        output = template.format(
+        output = compile_template(RAW_TEMP_DDL).render(
             raw_database=raw_database, raw_schema=raw_schema, table_name=table_name
         )
         return output
@@ -20,10 +30,12 @@ class TempRawDDLGenerator:
 
 class RawDDLGenerator:
     @staticmethod
+    @tracing.traced("ddl")
     def run(raw_database: str, raw_schema: str, table_name: str):
-        log.info(f"Generating Raw DDL for '{raw_database}.{raw_schema}.{table_name}'")
-        template = RAW_DDL
-        output = template.format(
+        log.info(
+            "Generating Raw DDL for '%s.%s.%s'", raw_database, raw_schema, table_name
+        )
+        output = compile_template(RAW_DDL).render(
             raw_database=raw_database, raw_schema=raw_schema, table_name=table_name
         )
         return output
@@ -39,7 +51,7 @@ class CuratedDDLRequiredDFColumns(Enum):
 class CuratedDDLGenerator:
     @staticmethod
     def _validate_column_df(
-        df: pd.DataFrame,
+        df: "pd.DataFrame",
         required_columns: list[str] = [
             column.value for column in CuratedDDLRequiredDFColumns
         ],
@@ -52,50 +64,59 @@ class CuratedDDLGenerator:
             raise KeyError(exc)
 
     @staticmethod
-    def _input_has_multiple_tagged_columns(
-        df: pd.DataFrame, column_tag: ColumnTypes, suppress_error: bool = False
+    def _has_multiple_tagged_columns(
+        column_count: int, column_tag: ColumnTypes, suppress_error: bool = False
     ) -> bool:
-        log.debug("Identifying number of columns tagged as '{column_tag.value}'.")
-        column_count = (
-            df[CuratedDDLRequiredDFColumns.column_type.value] == column_tag.value
-        ).sum()
-        log.debug(f"Input data indicates {column_count} {column_tag.value}/s")
+        log.debug("Input data indicates %s %s/s", column_count, column_tag.value)
         if column_count < 1:
             exc = f"There is not at least one column tagged as '{column_tag.value}' in the input data."
             if suppress_error:
                 log.warning(exc)
             else:
                 raise ValueError(exc)
-        # Should be able to do this with 'return column_count > 1' but this doesn't return a proper bool since we're
-        # involving pandas
-        if column_count > 1:
-            return True
-        return False
+        return column_count > 1
 
     @staticmethod
-    def _should_be_scd2(df: pd.DataFrame) -> bool:
-        log.debug("Identifying if this should be generated as an SCD2.")
-        curated_dbt_type_values = df[
-            CuratedDDLRequiredDFColumns.curated_dbt_type.value
-        ].unique()
+    def _input_has_multiple_tagged_columns(
+        df: "pd.DataFrame", column_tag: ColumnTypes, suppress_error: bool = False
+    ) -> bool:
+        log.debug("Identifying number of columns tagged as '%s'.", column_tag.value)
+        column_count = (
+            df[CuratedDDLRequiredDFColumns.column_type.value] == column_tag.value
+        ).sum()
+        # Cast to int since pandas hands back a numpy integer, which doesn't compare to a proper bool
+        return CuratedDDLGenerator._has_multiple_tagged_columns(
+            column_count=int(column_count),
+            column_tag=column_tag,
+            suppress_error=suppress_error,
+        )
+
+    @staticmethod
+    def _is_scd2(curated_dbt_type_values: Sequence[Any]) -> bool:
         if len(curated_dbt_type_values) > 1:
             exc = "Contradicting values for 'curated_dbt_type'"
             log.warning(exc)
             raise ValueError(exc)
-        if curated_dbt_type_values == [CuratedDBTType.scd2.value]:
-            return True
-        return False
+        return list(curated_dbt_type_values) == [CuratedDBTType.scd2.value]
+
+    @staticmethod
+    def _should_be_scd2(df: "pd.DataFrame") -> bool:
+        log.debug("Identifying if this should be generated as an SCD2.")
+        curated_dbt_type_values = df[
+            CuratedDDLRequiredDFColumns.curated_dbt_type.value
+        ].unique()
+        return CuratedDDLGenerator._is_scd2(
+            curated_dbt_type_values=list(curated_dbt_type_values)
+        )
 
     @staticmethod
-    def _create_columns_block(df: pd.DataFrame) -> str:
+    def _create_columns_block(df: "pd.DataFrame") -> str:
         log.debug("Creating 'columns block'.")
-        df["ddl_column_def"] = df["column_name"] + " " + df["source_data_type"]
-        ddl_column_def_list = df["ddl_column_def"].tolist()
-        new_columns = (
-            "    {column}".format(column=column.upper())
-            for column in ddl_column_def_list
+        return compile_template(CURATED_DDL_COLUMN).render_columns(
+            ",\n",
+            column_name=df["column_name"].astype(object).str.upper().tolist(),
+            source_data_type=df["source_data_type"].astype(object).str.upper().tolist(),
         )
-        return "{}".format(",\n").join(new_columns)
 
     @staticmethod
     def _generate_ddl(
@@ -113,8 +134,7 @@ class CuratedDDLGenerator:
             multi_key_row = "\n    UNIQUE_KEY VARCHAR,"
         if is_multi_date:
             multi_date_row = "\n    UPDATED_DATE TIMESTAMP_NTZ,"
-        template = CURATED_DDL
-        return template.format(
+        return compile_template(CURATED_DDL).render(
             curated_database=curated_database,
             curated_schema=curated_schema,
             table_name=table_name,
@@ -124,28 +144,59 @@ class CuratedDDLGenerator:
         )
 
     @staticmethod
+    @tracing.traced("ddl")
     def run(
         curated_database: str,
         curated_schema: str,
         table_name: str,
-        column_df: pd.DataFrame,
+        column_df: Optional["pd.DataFrame"] = None,
+        table_metadata: Optional[TableSpec] = None,
     ):
+        """
+        Generate the curated DDL for a table, from either the table's metadata rows (column_df) or its entry in a
+        MetadataIndex (table_metadata). The latter reuses the columns block, unique key, updated date and
+        curated_dbt_type values that the index has already derived rather than re-scanning the rows.
+        """
         log.info(
-            f"Generating Curated DDL for '{curated_database}.{curated_schema}.{table_name}'"
+            "Generating Curated DDL for '%s.%s.%s'",
+            curated_database,
+            curated_schema,
+            table_name,
         )
-        CuratedDDLGenerator._validate_column_df(df=column_df)
-        if not CuratedDDLGenerator._should_be_scd2(df=column_df):
+        if table_metadata is None:
+            if column_df is None:
+                raise TypeError("One of 'column_df' or 'table_metadata' is required")
+            CuratedDDLGenerator._validate_column_df(df=column_df)
+            should_be_scd2 = CuratedDDLGenerator._should_be_scd2(df=column_df)
+        else:
+            should_be_scd2 = CuratedDDLGenerator._is_scd2(
+                curated_dbt_type_values=table_metadata.curated_dbt_types
+            )
+        if not should_be_scd2:
             raise NotImplementedError(
                 "Want to create a non-scd2 curated DDL. This has not been implemented"
             )
 
-        columns_block = CuratedDDLGenerator._create_columns_block(df=column_df)
-        is_multi_key = CuratedDDLGenerator._input_has_multiple_tagged_columns(
-            df=column_df, column_tag=ColumnTypes.unique_key
-        )
-        is_multi_date = CuratedDDLGenerator._input_has_multiple_tagged_columns(
-            df=column_df, column_tag=ColumnTypes.updated_date, suppress_error=True
-        )
+        if table_metadata is None:
+            columns_block = CuratedDDLGenerator._create_columns_block(df=column_df)
+            is_multi_key = CuratedDDLGenerator._input_has_multiple_tagged_columns(
+                df=column_df, column_tag=ColumnTypes.unique_key
+            )
+            is_multi_date = CuratedDDLGenerator._input_has_multiple_tagged_columns(
+                df=column_df, column_tag=ColumnTypes.updated_date, suppress_error=True
+            )
+        else:
+            # rendered and validated for the whole catalog up front by the index
+            columns_block = table_metadata.ddl_columns_block
+            is_multi_key = CuratedDDLGenerator._has_multiple_tagged_columns(
+                column_count=table_metadata.validation.unique_key_count,
+                column_tag=ColumnTypes.unique_key,
+            )
+            is_multi_date = CuratedDDLGenerator._has_multiple_tagged_columns(
+                column_count=table_metadata.validation.updated_date_count,
+                column_tag=ColumnTypes.updated_date,
+                suppress_error=True,
+            )
         ddl = CuratedDDLGenerator._generate_ddl(
             curated_database=curated_database,
             curated_schema=curated_schema,
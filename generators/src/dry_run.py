@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from src.adapters.filesystems import BaseFilesystem, InMemoryFilesystem
+from src.logger import log
+
+CREATED = "created"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+
+@dataclass
+class DryRunReport:
+    # Paths of the output, by what a real run would do to them
+    created: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.created or self.changed)
+
+    def lines(self) -> Iterator[str]:
+        for status, paths in [
+            (CREATED, self.created),
+            (CHANGED, self.changed),
+            (UNCHANGED, self.unchanged),
+        ]:
+            for path in paths:
+                yield f"{status}: {path}"
+
+
+def _compare_file(target: BaseFilesystem, filepath: str, content: str) -> str:
+    if not target.path_exists(path=filepath):
+        return CREATED
+    if target.file_matches(filepath=filepath, content=content):
+        return UNCHANGED
+    return CHANGED
+
+
+def compare_output(
+    rendered: InMemoryFilesystem,
+    target: BaseFilesystem,
+    output_folder: str,
+    threads: int = 8,
+) -> DryRunReport:
+    """
+    Compare the output of a run rendered into memory with the existing output folder, without writing anything.
+    Files are compared by size, and only hashed when the sizes match, so unchanged output costs a read of each file.
+    :param rendered: InMemoryFilesystem; the filesystem the run was rendered into.
+    :param target: BaseFilesystem; the filesystem holding the existing output, usually the local disk.
+    :param output_folder: str; the output folder of the run, in both filesystems.
+    :param threads: int; number of files compared at once.
+    :return: DryRunReport; every rendered file, in path order, as created, changed or unchanged.
+    """
+    log.info("Comparing the rendered output with '%s'", output_folder)
+    folder = output_folder.rstrip("/")
+    files = {
+        f"{folder}/{relative_path}": content
+        for relative_path, content in rendered.walk_files(folderpath=output_folder)
+    }
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        statuses = executor.map(
+            lambda item: _compare_file(target, *item),
+            files.items(),
+        )
+        report = DryRunReport()
+        for filepath, status in zip(files, statuses):
+            getattr(report, status).append(filepath)
+    log.info(
+        "Dry run: %s created, %s changed and %s unchanged files",
+        len(report.created),
+        len(report.changed),
+        len(report.unchanged),
+    )
+    return report
@@ -1,5 +1,39 @@
 from enum import Enum
 
+# The columns of the input metadata, as described in the README
+METADATA_COLUMNS = [
+    "table_name",
+    "table_description",
+    "curated_dbt_type",
+    "column_name",
+    "column_description",
+    "source_data_type",
+    "column_type",
+    "column_tests",
+]
+
+# File extensions of each supported input format
+INPUT_FORMATS = {
+    "csv": [".csv"],
+    "parquet": [".parquet", ".pq"],
+    "arrow": [".arrow", ".feather", ".ipc"],
+}
+
+
+def infer_input_format(filepath: str) -> str:
+    """
+    Work out the format of an input file from its extension.
+    :param filepath: str; the path to the input file.
+    :return: str; one of the keys of INPUT_FORMATS. Throws a ValueError for an unknown extension.
+    """
+    lower_filepath = filepath.lower()
+    for input_format, extensions in INPUT_FORMATS.items():
+        if any(lower_filepath.endswith(extension) for extension in extensions):
+            return input_format
+    raise ValueError(
+        f"Can't infer the input format of '{filepath}', expected one of the extensions {INPUT_FORMATS}"
+    )
+
 
 class ColumnTypes(Enum):
     unique_key = "unique_key"
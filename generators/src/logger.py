@@ -1,4 +1,16 @@
+import atexit
+import contextlib
 import logging
+import logging.handlers
+import os
+import queue
+from typing import Iterator, Optional
+
+# Environment variables read by configure_logging when no level or log file is passed in
+LOG_LEVEL_ENV_VAR = "ADP_LOG_LEVEL"
+LOG_FILE_ENV_VAR = "ADP_LOG_FILE"
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+DEFAULT_LOG_LEVEL = "DEBUG"
 
 # Create and export a logger
 formatter = logging.Formatter(
@@ -7,8 +19,131 @@ formatter = logging.Formatter(
 )
 
 log = logging.getLogger()
-# TODO: Would be nicer to have a CLI variable that sets this rather than hardcoding
-log.setLevel(logging.DEBUG)
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
 log.addHandler(console_handler)
+
+
+def _log_level(level: Optional[str]) -> str:
+    # An unknown level, e.g. a typo in ADP_LOG_LEVEL, falls back to the default rather than failing every entry point
+    level = (level or DEFAULT_LOG_LEVEL).upper()
+    if level in LOG_LEVELS:
+        return level
+    log.warning(
+        "Unknown log level '%s', expected one of %s. Logging at %s instead.",
+        level,
+        LOG_LEVELS,
+        DEFAULT_LOG_LEVEL,
+    )
+    return DEFAULT_LOG_LEVEL
+
+
+log.setLevel(_log_level(os.environ.get(LOG_LEVEL_ENV_VAR)))
+
+# The handlers added by configure_logging, and the queue and background thread feeding them
+_handlers: list[logging.Handler] = [console_handler]
+_queue_handler: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        # Writes out every record still queued
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    log_file: Optional[str] = None,
+    quiet: bool = False,
+    use_queue: bool = True,
+) -> None:
+    """
+    Set the log level and handlers, e.g. from the command line. Handlers added by anything else, such as pytest, are
+    left alone.
+    :param level: str; one of LOG_LEVELS. Defaults to the ADP_LOG_LEVEL environment variable, else DEBUG.
+    :param log_file: str; also write the log to this file. Defaults to the ADP_LOG_FILE environment variable.
+    :param quiet: bool; only log warnings and errors, whatever the level. Debug messages, and any work done only to
+    build them, are then skipped entirely.
+    :param use_queue: bool; hand records to a queue that a background thread writes out, so logging never waits on
+    the console or log file. Otherwise they are written as they are logged.
+    """
+    global _handlers, _queue_handler, _listener
+    _stop_listener()
+    for handler in [*_handlers, _queue_handler]:
+        if handler is not None:
+            log.removeHandler(handler)
+            if handler is not console_handler:
+                handler.close()
+
+    level = "WARNING" if quiet else level or os.environ.get(LOG_LEVEL_ENV_VAR)
+    log.setLevel(_log_level(level))
+
+    _handlers = [console_handler]
+    log_file = log_file or os.environ.get(LOG_FILE_ENV_VAR)
+    if log_file:
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(formatter)
+        _handlers.append(file_handler)
+
+    if not use_queue:
+        _queue_handler = None
+        for handler in _handlers:
+            log.addHandler(handler)
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    # QueueHandler formats each message as it is logged, so arguments changed afterwards can't change what's written
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    log.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(
+        log_queue, *_handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+
+@contextlib.contextmanager
+def logging_for_run(
+    level: Optional[str] = None, log_file: Optional[str] = None, quiet: bool = False
+) -> Iterator[None]:
+    """
+    Apply the log level and log file of a single run for as long as it lasts, e.g. a run the generator service does
+    for another invocation, then go back to those of the process. Worker processes started before the run keep
+    logging as the process did.
+    :param level: str; as for configure_logging. The process's level is kept when not given.
+    :param log_file: str; also write the run's log to this file.
+    :param quiet: bool; as for configure_logging.
+    """
+    previous_level = log.level
+    if quiet or level:
+        log.setLevel(_log_level("WARNING" if quiet else level))
+    file_handler = None
+    if log_file:
+        # Written to directly rather than through the queue, so the file is complete once the run is done
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(formatter)
+        log.addHandler(file_handler)
+    try:
+        yield
+    finally:
+        log.setLevel(previous_level)
+        if file_handler is not None:
+            log.removeHandler(file_handler)
+            file_handler.close()
+
+
+def _after_fork_in_child() -> None:
+    # The background thread doesn't survive a fork, e.g. into a worker process, so a forked process writes its
+    # records itself
+    global _queue_handler, _listener
+    if _queue_handler is not None:
+        log.removeHandler(_queue_handler)
+        for handler in _handlers:
+            log.addHandler(handler)
+        _queue_handler = None
+        _listener = None
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(_stop_listener)
@@ -0,0 +1,159 @@
+import functools
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Optional
+
+from src.adapters.filesystems import BaseFilesystem
+from src.logger import log
+from src.model_yaml import RenderedEntryCache
+from templates import ddls, models
+
+# Only imported once there is metadata to fingerprint
+if TYPE_CHECKING:
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+
+MANIFEST_FILENAME = ".adp_generator_manifest.json"
+MANIFEST_VERSION = 1
+
+
+@functools.lru_cache(maxsize=None)
+def template_fingerprint() -> str:
+    """
+    Hash every template string held in templates/ddls.py and templates/models.py, so that any change to a template
+    invalidates all previously generated tables. The templates are constants, so they are only hashed once per
+    process.
+    :return: str; hex digest of the template contents.
+    """
+    digest = hashlib.sha256()
+    for module in (ddls, models):
+        for name in sorted(vars(module)):
+            value = getattr(module, name)
+            if name.isupper() and isinstance(value, str):
+                digest.update(name.encode())
+                digest.update(value.encode())
+    return digest.hexdigest()
+
+
+def table_fingerprints(
+    frame: "pd.DataFrame", offsets: "np.ndarray", context: str, template_hash: str
+) -> list[str]:
+    """
+    Fingerprint the metadata rows of many tables at once, hashing the rows of the whole frame in a single pass. Each
+    row's hash only depends on the row itself, so a table's fingerprint is the same whichever frame it is part of.
+    :param frame: pd.DataFrame; the metadata rows of every table, with each table's rows contiguous.
+    :param offsets: np.ndarray; the row each table starts at, followed by the total number of rows.
+    :param context: str; anything else that changes the rendered output, e.g. database, schema and output folder.
+    :param template_hash: str; the result of template_fingerprint().
+    :return: list[str]; the fingerprint of each table, in frame order, which changes whenever the table would render
+    differently.
+    """
+    import pandas as pd  # type: ignore
+
+    prefix = hashlib.sha256()
+    prefix.update(template_hash.encode())
+    prefix.update(context.encode())
+    prefix.update(",".join(str(column) for column in frame.columns).encode())
+    row_hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    fingerprints = []
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        digest = prefix.copy()
+        digest.update(row_hashes[start:end].tobytes())
+        fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+class GenerationManifest:
+    # Records the fingerprint, generated files and YAML fragments of every table from the previous run, so that an
+    # incremental run can skip tables whose metadata has not changed.
+    def __init__(
+        self,
+        tables: Optional[dict[str, dict[str, Any]]] = None,
+        entry_cache: Optional[RenderedEntryCache] = None,
+    ):
+        self._previous = tables or {}
+        self._current: dict[str, dict[str, Any]] = {}
+        # The rendered YAML of the models, when the manifest is kept in memory between runs
+        self.entry_cache = entry_cache
+
+    @staticmethod
+    def path(output_folder: str) -> str:
+        return f"{output_folder}/{MANIFEST_FILENAME}"
+
+    @classmethod
+    def load(
+        cls, filesystem: BaseFilesystem, output_folder: str
+    ) -> "GenerationManifest":
+        filepath = cls.path(output_folder)
+        if not filesystem.path_exists(filepath):
+            log.info(
+                "No manifest found at '%s'. All tables will be generated.", filepath
+            )
+            return cls()
+        try:
+            content = json.loads(filesystem.read_file(filepath=filepath))
+        except ValueError:
+            log.warning(
+                "Manifest at '%s' is not valid JSON. All tables will be generated.",
+                filepath,
+            )
+            return cls()
+        if content.get("version") != MANIFEST_VERSION:
+            log.info(
+                "Manifest at '%s' is from another version. All tables will be generated.",
+                filepath,
+            )
+            return cls()
+        return cls(tables=content.get("tables", {}))
+
+    def content(self) -> str:
+        # The manifest file of this run, compact as the C encoder is only used without indent
+        return json.dumps(
+            {"version": MANIFEST_VERSION, "tables": self._current},
+            separators=(",", ":"),
+        )
+
+    def save(self, filesystem: BaseFilesystem, output_folder: str) -> None:
+        filesystem.write_file(filepath=self.path(output_folder), content=self.content())
+
+    def next_run(self, completed: bool = True) -> "GenerationManifest":
+        # The manifest that the next run starts from, as load would give after save, without the round trip via disk.
+        # After a run that failed part way, the tables it did generate replace those of the run before.
+        tables = self._current if completed else {**self._previous, **self._current}
+        if self.entry_cache is not None:
+            self.entry_cache.retain(
+                entry[key]
+                for entry in tables.values()
+                for key in ("raw_model", "cur_model")
+            )
+        return GenerationManifest(tables=tables, entry_cache=self.entry_cache)
+
+    def is_unchanged(
+        self, table_name: str, fingerprint: str, filesystem: BaseFilesystem
+    ) -> bool:
+        entry = self._previous.get(table_name)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return False
+        # Regenerate if someone has removed any of the outputs since the last run
+        return all(filesystem.path_exists(filepath) for filepath in entry["files"])
+
+    def carry_forward(self, table_name: str) -> dict[str, Any]:
+        # Keep the previous entry for an unchanged table and return it, so its YAML fragments can be reused
+        entry = self._previous[table_name]
+        self._current[table_name] = entry
+        return entry
+
+    def record(
+        self,
+        table_name: str,
+        fingerprint: str,
+        files: list[str],
+        raw_model: dict[str, Any],
+        cur_model: dict[str, Any],
+    ) -> None:
+        self._current[table_name] = {
+            "fingerprint": fingerprint,
+            "files": files,
+            "raw_model": raw_model,
+            "cur_model": cur_model,
+        }
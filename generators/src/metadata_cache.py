@@ -0,0 +1,195 @@
+import functools
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd  # type: ignore
+
+from src import metadata_input, profiling
+from src.adapters.filesystems import BaseFilesystem, LocalFilesystem
+from src.logger import log
+from src.metadata_input import (
+    _to_pandas,
+    add_ddl_column_def,
+    dictionary_encode,
+    read_metadata,
+)
+
+try:
+    import pyarrow  # type: ignore
+    import pyarrow.ipc  # type: ignore
+except ImportError:  # pragma: no cover - without pyarrow every run parses its input
+    pyarrow = None
+
+# The cache is written next to the input, e.g. 'input.csv.adp_cache.arrow'
+PARSE_CACHE_SUFFIX = ".adp_cache.arrow"
+# Smaller inputs are parsed about as fast as their cache could be checked
+PARSE_CACHE_MIN_BYTES = 1_000_000
+# Bump whenever the cached frame changes in a way generator_version can't see
+PARSE_CACHE_VERSION = 1
+# Key of the schema metadata entry holding the input key the cache was written for
+_KEY_METADATA = b"adp_generator_parse_cache"
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def parse_cache_path(filepath: str) -> str:
+    return filepath + PARSE_CACHE_SUFFIX
+
+
+@functools.lru_cache(maxsize=None)
+def generator_version() -> str:
+    """
+    Hash everything that changes how an input is parsed into the cached frame: the code reading it and the versions of
+    pandas and pyarrow, so that an upgrade of either invalidates every cache. Only hashed once per process.
+    :return: str; hex digest of the generator version.
+    """
+    digest = hashlib.sha256()
+    digest.update(str(PARSE_CACHE_VERSION).encode())
+    digest.update(pd.__version__.encode())
+    digest.update(pyarrow.__version__.encode())
+    digest.update(Path(metadata_input.__file__).read_bytes())
+    return digest.hexdigest()
+
+
+def input_key(filepath: str) -> dict[str, Any]:
+    """
+    Identify the current content of an input file, as the cache of it has to have been written for.
+    :param filepath: str; the path to the input file on the local disk.
+    :return: dict[str, Any]; the absolute path, size, modification time and content hash of the file, and the
+    generator_version.
+    """
+    stat = os.stat(filepath)
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as input_file:
+        for block in iter(lambda: input_file.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return {
+        "path": os.path.abspath(filepath),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest.hexdigest(),
+        "generator": generator_version(),
+    }
+
+
+def _is_cacheable(filesystem: BaseFilesystem, filepath: str, input_format: str) -> bool:
+    # Only CSV is slow enough to parse, and the cache is written next to the input so only works on the local disk
+    if pyarrow is None or input_format != "csv":
+        return False
+    if not isinstance(filesystem, LocalFilesystem):
+        return False
+    try:
+        return os.path.getsize(filepath) >= PARSE_CACHE_MIN_BYTES
+    except OSError:
+        # Left to read_metadata to report
+        return False
+
+
+def load_parse_cache(cache_path: str, key: dict[str, Any]) -> Optional[pd.DataFrame]:
+    """
+    Read a cached frame from the cache file, if it was written for the given input key. The frame is built in memory, as
+    its text columns are converted back to objects anyway.
+    :param cache_path: str; the path to the cache file.
+    :param key: dict[str, Any]; the input_key of the input as it is now.
+    :return: pd.DataFrame; the frame, as read_prepared_metadata would give it. None when there is no cache, or it is
+    out of date or unreadable.
+    """
+    try:
+        with pyarrow.OSFile(cache_path) as source:
+            reader = pyarrow.ipc.open_file(source)
+            cached_key = (reader.schema.metadata or {}).get(_KEY_METADATA)
+            if cached_key is None or json.loads(cached_key) != key:
+                log.info("Parse cache '%s' is out of date.", cache_path)
+                return None
+            df = _to_pandas(reader.read_all())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, pyarrow.ArrowException) as exc:
+        log.warning(
+            "Can't read parse cache '%s', parsing the input instead: %s",
+            cache_path,
+            exc,
+        )
+        return None
+    # Repeated text is stored dictionary encoded, and read back as the text columns it was parsed as
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype(object)
+    return df
+
+
+def save_parse_cache(cache_path: str, key: dict[str, Any], df: pd.DataFrame) -> bool:
+    """
+    Write a frame to a cache file, as Arrow IPC with the input key in its schema metadata. Failing to write it is
+    only logged, as the run can carry on without it.
+    :param cache_path: str; the path to the cache file.
+    :param key: dict[str, Any]; the input_key of the input the frame was parsed from.
+    :param df: pd.DataFrame; the frame.
+    :return: bool; True when the cache was written.
+    """
+    try:
+        table = dictionary_encode(pyarrow.Table.from_pandas(df, preserve_index=False))
+    except (TypeError, ValueError, pyarrow.ArrowException) as exc:
+        # e.g. a column with both numbers and text in it
+        log.info("Input can't be cached as Arrow, so is parsed every run: %s", exc)
+        return False
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), _KEY_METADATA: json.dumps(key).encode()}
+    )
+    # Written alongside and moved into place, so that no run ever reads a half written cache
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with pyarrow.OSFile(temporary_path, "wb") as sink, pyarrow.ipc.new_file(
+            sink, table.schema
+        ) as writer:
+            writer.write_table(table)
+        os.replace(temporary_path, cache_path)
+    except (OSError, pyarrow.ArrowException) as exc:
+        log.warning("Can't write parse cache '%s': %s", cache_path, exc)
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        return False
+    log.info("Wrote parse cache '%s'.", cache_path)
+    return True
+
+
+def read_prepared_metadata(
+    filesystem: BaseFilesystem,
+    filepath: str,
+    input_format: Optional[str] = None,
+    use_cache: bool = True,
+) -> pd.DataFrame:
+    """
+    Read the whole input metadata file into a DataFrame with its ddl_column_def, as the MetadataIndex takes it. A large
+    CSV input on the local disk is read from the parse cache next to it instead, as long as the cache was written for
+    the input as it is now, see input_key. Otherwise the input is parsed and the cache written for the next run.
+    :param filesystem: BaseFilesystem; where the input file is.
+    :param filepath: str; the path to the input file.
+    :param input_format: str; as for read_metadata.
+    :param use_cache: bool; False always parses the input, and leaves any cache as it is.
+    :return: pd.DataFrame; one row per column of every table.
+    """
+    input_format = input_format or metadata_input.infer_input_format(filepath)
+    key = None
+    if use_cache and _is_cacheable(
+        filesystem=filesystem, filepath=filepath, input_format=input_format
+    ):
+        cache_path = parse_cache_path(filepath)
+        with profiling.stage("parse_cache"):
+            key = input_key(filepath)
+            df = load_parse_cache(cache_path=cache_path, key=key)
+        if df is not None:
+            log.debug("Read %s rows from parse cache '%s'.", len(df), cache_path)
+            return df
+
+    df = add_ddl_column_def(
+        read_metadata(
+            filesystem=filesystem, filepath=filepath, input_format=input_format
+        )
+    )
+    if key is not None:
+        with profiling.stage("parse_cache"):
+            save_parse_cache(cache_path=cache_path, key=key, df=df)
+    return df
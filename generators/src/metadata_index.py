@@ -0,0 +1,166 @@
+from typing import Any, Iterator
+
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+from src import profiling
+from src.logger import log
+from src.manifest import table_fingerprints
+from src.metadata_rows import (
+    COLUMN_SPEC_FIELDS,
+    ColumnSpec,
+    TableSpec,
+    classify_columns,
+)
+from src.templating import compile_template, factorize_as_text
+from src.validation import check_required_columns, validate_tables
+from templates.ddls import CURATED_DDL_COLUMN
+from templates.models import CURATED_MODEL_COLUMN
+
+
+def _upper(values: np.ndarray) -> np.ndarray:
+    # Uppercase each distinct value once rather than every row
+    codes, texts = factorize_as_text(values)
+    return np.array([text.upper() for text in texts], dtype=object)[codes]
+
+
+def _group_values(
+    group_codes: np.ndarray, values: np.ndarray, group_count: int
+) -> list[list[Any]]:
+    # Split values into one list per group. group_codes must be sorted and line up with values.
+    boundaries = np.searchsorted(group_codes, np.arange(group_count + 1))
+    value_list = values.tolist()
+    return [value_list[boundaries[i] : boundaries[i + 1]] for i in range(group_count)]
+
+
+class MetadataIndex:
+    """
+    Groups the input metadata by table in a single pass. Rows are stable-sorted by the order in which each table is
+    first seen, so every table is a contiguous block of rows that can be sliced out in O(1), and the per-table
+    attributes (description, curated_dbt_type and the column blocks) are all derived up front.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        log.debug("Building metadata index.")
+        check_required_columns(df)
+        codes, uniques = pd.factorize(df["table_name"], sort=False)
+        order = np.argsort(codes, kind="stable")
+        self._sorted = df.take(order)
+        sorted_codes = codes[order]
+        table_count = len(uniques)
+
+        counts = np.bincount(sorted_codes, minlength=table_count)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.table_names = list(uniques)
+        self._positions = {
+            table_name: position for position, table_name in enumerate(uniques)
+        }
+
+        first_rows = self._offsets[:-1]
+        self._descriptions = (
+            self._sorted["table_description"].to_numpy()[first_rows].tolist()
+        )
+        curated_dbt_types = self._sorted["curated_dbt_type"].to_numpy()
+        self._curated_dbt_types = curated_dbt_types[first_rows].tolist()
+
+        distinct_types = pd.DataFrame(
+            data={"code": sorted_codes, "curated_dbt_type": curated_dbt_types}
+        ).drop_duplicates()
+        self._distinct_curated_dbt_types = _group_values(
+            group_codes=distinct_types["code"].to_numpy(),
+            values=distinct_types["curated_dbt_type"].to_numpy(),
+            group_count=table_count,
+        )
+
+        column_names = self._sorted["column_name"].to_numpy()
+
+        # Every validation rule is run once for the whole input. Nothing is raised here, see validation.raise_for_errors
+        with profiling.stage("validation"):
+            self.validation = validate_tables(
+                table_names=self.table_names,
+                sorted_frame=self._sorted,
+                sorted_codes=sorted_codes,
+                distinct_curated_dbt_types=self._distinct_curated_dbt_types,
+            )
+
+        # The column blocks of every table are rendered for the whole catalog at once and split by table afterwards
+        source_data_types = self._sorted["source_data_type"].to_numpy()
+        with profiling.stage("column_blocks"):
+            self._ddl_columns_blocks = compile_template(
+                CURATED_DDL_COLUMN
+            ).render_grouped_columns(
+                ",\n",
+                self._offsets,
+                column_name=_upper(column_names),
+                source_data_type=_upper(source_data_types),
+            )
+            self._model_columns_blocks = compile_template(
+                CURATED_MODEL_COLUMN
+            ).render_grouped_columns(
+                ",\n",
+                self._offsets,
+                column_name=column_names,
+                source_data_type=source_data_types,
+            )
+        # Every row as a ColumnSpec, built for the whole catalog at once and sliced by table. The text is already shared
+        # between rows by pandas' parser, rather than a copy per row. Optional columns missing from the input are NaN.
+        nan = float("nan")
+        self._columns = list(
+            map(
+                ColumnSpec._make,
+                zip(
+                    *(
+                        self._sorted[column].tolist()
+                        if column in df.columns
+                        else [nan] * len(df)
+                        for column in COLUMN_SPEC_FIELDS
+                    )
+                ),
+            )
+        )
+        log.debug("Indexed %s rows across %s tables.", len(df), table_count)
+
+    def __len__(self) -> int:
+        return len(self.table_names)
+
+    def _bounds(self, table_name: str) -> tuple[int, int]:
+        position = self._positions[table_name]
+        return self._offsets[position], self._offsets[position + 1]
+
+    def table(self, table_name: str) -> TableSpec:
+        position = self._positions[table_name]
+        start, end = self._bounds(table_name)
+        columns = tuple(self._columns[start:end])
+        unique_keys, updated_dates = classify_columns(columns)
+        return TableSpec(
+            table_name=table_name,
+            columns=columns,
+            description=self._descriptions[position],
+            curated_dbt_type=self._curated_dbt_types[position],
+            curated_dbt_types=tuple(self._distinct_curated_dbt_types[position]),
+            unique_keys=unique_keys,
+            updated_dates=updated_dates,
+            ddl_columns_block=self._ddl_columns_blocks[position],
+            model_columns_block=self._model_columns_blocks[position],
+            validation=self.validation.tables[table_name],
+        )
+
+    def table_frame(self, table_name: str) -> pd.DataFrame:
+        # The table's metadata rows, in input order
+        start, end = self._bounds(table_name)
+        return self._sorted.iloc[start:end]
+
+    def fingerprints(self, context: str, template_hash: str) -> dict[str, str]:
+        # The manifest fingerprint of every table, see manifest.table_fingerprints
+        fingerprints = table_fingerprints(
+            frame=self._sorted,
+            offsets=self._offsets,
+            context=context,
+            template_hash=template_hash,
+        )
+        return dict(zip(self.table_names, fingerprints))
+
+    def tables(self) -> Iterator[TableSpec]:
+        # Tables in the order they first appear in the input
+        for table_name in self.table_names:
+            yield self.table(table_name)
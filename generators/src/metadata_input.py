@@ -0,0 +1,166 @@
+import io
+from typing import IO, Any, Iterator, Optional
+
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+from src.adapters.filesystems import BaseFilesystem
+from src.input_data_values import INPUT_FORMATS, METADATA_COLUMNS, infer_input_format
+from src import profiling
+from src.logger import log
+
+try:
+    import pyarrow  # type: ignore
+    import pyarrow.ipc  # type: ignore
+    import pyarrow.parquet  # type: ignore
+except ImportError:  # pragma: no cover - pyarrow is only needed for parquet and Arrow input
+    pyarrow = None
+
+# Columns whose values repeat across many rows, either within a table or across tables. In columnar input they are
+# read dictionary encoded and become pandas categoricals, so each distinct value is held once rather than once per row.
+DICTIONARY_COLUMNS = [
+    "table_name",
+    "table_description",
+    "curated_dbt_type",
+    "column_name",
+    "source_data_type",
+    "column_type",
+    "column_tests",
+]
+
+
+def _require_pyarrow(input_format: str) -> None:
+    if pyarrow is None:
+        raise ImportError(f"pyarrow is required to read {input_format} input")
+
+
+def _projection(names: list[str]) -> list[str]:
+    # Only the columns the generator uses are read, in the order they are present in the file
+    return [name for name in names if name in METADATA_COLUMNS]
+
+
+def _to_pandas(table: Any) -> pd.DataFrame:
+    df = table.to_pandas()
+    # Arrow nulls come back as None in string columns, where the CSV reader gives NaN
+    for name in table.schema.names:
+        if table.column(name).null_count and df[name].dtype == object:
+            df[name] = df[name].fillna(np.nan)
+    return df
+
+
+def _iter_arrow_batches(input_stream: IO) -> Iterator[Any]:
+    # Record batches are read one at a time, so the whole file is never held in memory
+    try:
+        reader = pyarrow.ipc.open_file(input_stream)
+    except pyarrow.ArrowInvalid:
+        # Not the IPC file format, so try the IPC streaming format
+        input_stream.seek(0)
+        yield from pyarrow.ipc.open_stream(input_stream)
+        return
+    for position in range(reader.num_record_batches):
+        yield reader.get_batch(position)
+
+
+def dictionary_encode(table: Any) -> Any:
+    # The text DICTIONARY_COLUMNS of an Arrow table, dictionary encoded
+    for position, name in enumerate(table.column_names):
+        if name in DICTIONARY_COLUMNS and pyarrow.types.is_string(
+            table.schema.field(name).type
+        ):
+            table = table.set_column(
+                position, name, table.column(name).dictionary_encode()
+            )
+    return table
+
+
+def _read_arrow_table(input_stream: IO) -> Any:
+    batches = _iter_arrow_batches(input_stream)
+    first_batch = next(batches)
+    projection = _projection(first_batch.schema.names)
+    return dictionary_encode(
+        pyarrow.Table.from_batches(
+            [batch.select(projection) for batch in [first_batch, *batches]]
+        )
+    )
+
+
+def add_ddl_column_def(df: pd.DataFrame) -> pd.DataFrame:
+    # create Column for DDL ToDo: add function to translate source_data_type to snowflake data type
+    # (as object, as columnar input can have categorical columns)
+    df["ddl_column_def"] = (
+        df["column_name"].astype(object) + " " + df["source_data_type"].astype(object)
+    )
+    return df
+
+
+def read_metadata(
+    filesystem: BaseFilesystem, filepath: str, input_format: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Read the whole input metadata file into a DataFrame.
+    :param filesystem: BaseFilesystem; where the input file is.
+    :param filepath: str; the path to the input file.
+    :param input_format: str; "csv", "parquet" or "arrow" (Arrow IPC / Feather V2). Inferred from the extension by
+    default. Parquet and Arrow input are projected to METADATA_COLUMNS, with DICTIONARY_COLUMNS read as categoricals.
+    :return: pd.DataFrame; one row per column of every table.
+    """
+    input_format = input_format or infer_input_format(filepath)
+    log.debug("Reading %s metadata from '%s'.", input_format, filepath)
+    if input_format == "csv":
+        with profiling.stage("read"):
+            input_csv_content = filesystem.read_file(filepath=filepath)
+        with profiling.stage("parse"):
+            return pd.read_csv(io.StringIO(input_csv_content), sep=",")
+
+    _require_pyarrow(input_format)
+    with profiling.stage("read"), filesystem.open_file(
+        filepath=filepath, mode="rb"
+    ) as input_stream:
+        if input_format == "parquet":
+            parquet_file = pyarrow.parquet.ParquetFile(
+                input_stream, read_dictionary=DICTIONARY_COLUMNS
+            )
+            table = parquet_file.read(
+                columns=_projection(parquet_file.schema_arrow.names)
+            )
+        elif input_format == "arrow":
+            table = _read_arrow_table(input_stream)
+        else:
+            raise ValueError(
+                f"Unknown input format '{input_format}', expected one of {list(INPUT_FORMATS)}"
+            )
+    with profiling.stage("parse"):
+        return _to_pandas(table)
+
+
+def read_metadata_chunks(
+    input_stream: IO, chunksize: int, input_format: str = "csv"
+) -> Iterator[pd.DataFrame]:
+    """
+    Read an open input metadata file a chunk of rows at a time.
+    :param input_stream: IO; the open input file, in binary mode for parquet and Arrow input.
+    :param chunksize: int; number of rows per chunk.
+    :param input_format: str; "csv", "parquet" or "arrow".
+    :return: Iterator[pd.DataFrame]; the chunks, in input order.
+    """
+    if input_format == "csv":
+        # Every column is read as text: dtypes inferred chunk by chunk could otherwise differ between chunks
+        yield from pd.read_csv(input_stream, sep=",", chunksize=chunksize, dtype=str)
+        return
+
+    _require_pyarrow(input_format)
+    if input_format == "parquet":
+        parquet_file = pyarrow.parquet.ParquetFile(input_stream)
+        for batch in parquet_file.iter_batches(
+            batch_size=chunksize, columns=_projection(parquet_file.schema_arrow.names)
+        ):
+            yield _to_pandas(batch)
+    elif input_format == "arrow":
+        for batch in _iter_arrow_batches(input_stream):
+            batch = batch.select(_projection(batch.schema.names))
+            for offset in range(0, batch.num_rows, chunksize):
+                yield _to_pandas(batch.slice(offset, chunksize))
+    else:
+        raise ValueError(
+            f"Unknown input format '{input_format}', expected one of {list(INPUT_FORMATS)}"
+        )
@@ -0,0 +1,281 @@
+import csv
+import io
+import re
+import sys
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+from src import profiling
+from src.adapters.filesystems import BaseFilesystem
+from src.input_data_values import METADATA_COLUMNS, ColumnTypes
+from src.logger import log
+from src.templating import compile_template
+from src.validation import TableValidation, check_columns, validate_grouped_rows
+from templates.ddls import CURATED_DDL_COLUMN
+from templates.models import CURATED_MODEL_COLUMN
+
+# Inputs up to this many characters are read with the csv module rather than pandas, see read_small_csv
+SMALL_INPUT_MAX_CHARS = 1_000_000
+
+# Text that pandas.read_csv reads as NaN by default
+NA_VALUES = frozenset(
+    [
+        "",
+        "#N/A",
+        "#N/A N/A",
+        "#NA",
+        "-1.#IND",
+        "-1.#QNAN",
+        "-NaN",
+        "-nan",
+        "1.#IND",
+        "1.#QNAN",
+        "<NA>",
+        "N/A",
+        "NA",
+        "NULL",
+        "NaN",
+        "None",
+        "n/a",
+        "nan",
+        "null",
+    ]
+)
+# Text that pandas.read_csv reads as a bool, when a whole column is made up of it
+BOOL_VALUES = frozenset(["True", "TRUE", "true", "False", "FALSE", "false"])
+# Columns whose values can be missing, which are read as NaN as pandas would
+OPTIONAL_COLUMNS = [
+    "table_description",
+    "column_description",
+    "column_type",
+    "column_tests",
+]
+# The input columns of each ColumnSpec field, in order
+COLUMN_SPEC_FIELDS = [
+    "column_name",
+    "column_description",
+    "source_data_type",
+    "column_type",
+    "column_tests",
+]
+# The start of anything float() can parse, so that only these values need to be tried
+_NUMBER_START = re.compile(r"\s*[-+]?(\d|\.\d|inf|nan)", re.IGNORECASE)
+
+
+class ColumnSpec(NamedTuple):
+    # A single column of a table, i.e. one metadata row. Missing values are NaN, as pandas reads them.
+    name: Any
+    description: Any
+    source_data_type: Any
+    column_type: Any
+    tests: Any
+
+
+class TableSpec(NamedTuple):
+    """
+    Everything needed to render a single table, as built once by a MetadataIndex or a RowIndex. Immutable, so it can
+    be shared between threads or sent to a worker process as it is.
+    """
+
+    table_name: str
+    # The table's columns, in input order
+    columns: tuple[ColumnSpec, ...]
+    # Table level attributes are taken from the first row of the table
+    description: Any
+    curated_dbt_type: Any
+    # Every distinct curated_dbt_type found for the table, so contradictions can still be detected
+    curated_dbt_types: tuple[Any, ...]
+    unique_keys: tuple[str, ...]
+    updated_dates: tuple[str, ...]
+    # The rendered {columns} blocks of the curated DDL and curated model
+    ddl_columns_block: str
+    model_columns_block: str
+    validation: TableValidation
+
+
+def classify_columns(
+    columns: Iterable[ColumnSpec],
+) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """
+    Pick out the unique key and updated date columns of a table, in a single pass over its columns.
+    :param columns: Iterable[ColumnSpec]; the table's columns.
+    :return: tuple[tuple[str, ...], tuple[str, ...]]; the names of the unique key and the updated date columns, in
+    input order.
+    """
+    unique_key = ColumnTypes.unique_key.value
+    updated_date = ColumnTypes.updated_date.value
+    unique_keys = []
+    updated_dates = []
+    for column in columns:
+        if column.column_type == unique_key:
+            unique_keys.append(column.name)
+        elif column.column_type == updated_date:
+            updated_dates.append(column.name)
+    return tuple(unique_keys), tuple(updated_dates)
+
+
+def interned(values: list[Any]) -> list[Any]:
+    # Text repeated across rows, e.g. data types or tests, as a single shared str rather than a copy per row
+    return [sys.intern(value) if type(value) is str else value for value in values]
+
+
+def _is_number_or_bool(value: str) -> bool:
+    if value in BOOL_VALUES:
+        return True
+    if not _NUMBER_START.match(value):
+        return False
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def read_small_csv(
+    filesystem: BaseFilesystem,
+    filepath: str,
+    max_chars: int = SMALL_INPUT_MAX_CHARS,
+) -> Optional[tuple[list[str], list[list[Any]]]]:
+    """
+    Read a small CSV input with the csv module, into the same values pandas.read_csv would give, so that a small run
+    never has to import pandas. Anything pandas could read differently (numbers or bools where text is expected,
+    missing values where they are not allowed, a malformed header or rows) is left to read_metadata instead.
+    :param filesystem: BaseFilesystem; where the input file is.
+    :param filepath: str; the path to the input file.
+    :param max_chars: int; inputs longer than this are left to read_metadata.
+    :return: tuple[list[str], list[list[Any]]]; the header and the rows, with missing values as NaN. None when the
+    input is too large, or pandas is needed to read it.
+    """
+    with profiling.stage("read"), filesystem.open_file(
+        filepath=filepath, mode="r"
+    ) as input_stream:
+        content = input_stream.read(max_chars + 1)
+    if len(content) > max_chars:
+        log.debug("'%s' is too large to read without pandas.", filepath)
+        return None
+
+    with profiling.stage("parse"):
+        reader = csv.reader(io.StringIO(content, newline=""))
+        header: list[str] = next(reader, [])
+        if (
+            not header
+            or header[0].startswith("\ufeff")
+            or "" in header
+            or len(set(header)) != len(header)
+            or not set(METADATA_COLUMNS).issubset(header)
+        ):
+            return None
+        # pandas skips blank lines, and would take a first column without a header as the index
+        rows: list[list[Any]] = [row for row in reader if row]
+        if any(len(row) != len(header) for row in rows):
+            return None
+
+        nan = float("nan")
+        for position, column in enumerate(header):
+            if column not in METADATA_COLUMNS:
+                continue
+            values = {row[position] for row in rows}
+            missing = values & NA_VALUES
+            if missing and column not in OPTIONAL_COLUMNS:
+                return None
+            # pandas infers a column's type from its values, so any number or bool could end up read as one
+            if any(_is_number_or_bool(value) for value in values - missing):
+                return None
+            if missing:
+                for row in rows:
+                    if row[position] in missing:
+                        row[position] = nan
+    log.debug("Read %s rows from '%s' without pandas.", len(rows), filepath)
+    return header, rows
+
+
+class RowIndex:
+    """
+    The equivalent of a MetadataIndex for the rows given by read_small_csv, grouped by table with plain lists and
+    dicts rather than pandas. Every table comes out exactly as MetadataIndex would give it.
+    """
+
+    def __init__(self, columns: list[str], rows: list[list[Any]]):
+        log.debug("Building metadata index without pandas.")
+        check_columns(columns)
+        positions = {column: position for position, column in enumerate(columns)}
+        groups: dict[Any, list[list[Any]]] = {}
+        for row in rows:
+            groups.setdefault(row[positions["table_name"]], []).append(row)
+        self.table_names = list(groups)
+
+        def values(column: str) -> list[list[Any]]:
+            # The column's value in each row, grouped by table. The csv module reads every value as a str of its own.
+            position = positions[column]
+            return [
+                interned([row[position] for row in group]) for group in groups.values()
+            ]
+
+        column_names = values("column_name")
+        column_types = values("column_type")
+        source_data_types = values("source_data_type")
+        curated_dbt_types = values("curated_dbt_type")
+        column_descriptions = values("column_description")
+        column_tests = values("column_tests")
+        distinct_curated_dbt_types = [
+            list(dict.fromkeys(types)) for types in curated_dbt_types
+        ]
+        with profiling.stage("validation"):
+            self.validation = validate_grouped_rows(
+                table_names=self.table_names,
+                column_names=column_names,
+                column_types=column_types,
+                distinct_curated_dbt_types=distinct_curated_dbt_types,
+            )
+
+        with profiling.stage("column_blocks"):
+            ddl_column = compile_template(CURATED_DDL_COLUMN)
+            model_column = compile_template(CURATED_MODEL_COLUMN)
+            self._tables: dict[str, TableSpec] = {}
+            for position, (table_name, group) in enumerate(groups.items()):
+                names = column_names[position]
+                data_types = source_data_types[position]
+                table_columns = tuple(
+                    map(
+                        ColumnSpec._make,
+                        zip(
+                            names,
+                            column_descriptions[position],
+                            data_types,
+                            column_types[position],
+                            column_tests[position],
+                        ),
+                    )
+                )
+                unique_keys, updated_dates = classify_columns(table_columns)
+                self._tables[table_name] = TableSpec(
+                    table_name=table_name,
+                    columns=table_columns,
+                    description=group[0][positions["table_description"]],
+                    curated_dbt_type=curated_dbt_types[position][0],
+                    curated_dbt_types=tuple(distinct_curated_dbt_types[position]),
+                    unique_keys=unique_keys,
+                    updated_dates=updated_dates,
+                    ddl_columns_block=ddl_column.render_columns(
+                        ",\n",
+                        column_name=[str(name).upper() for name in names],
+                        source_data_type=[
+                            str(data_type).upper() for data_type in data_types
+                        ],
+                    ),
+                    model_columns_block=model_column.render_columns(
+                        ",\n", column_name=names, source_data_type=data_types
+                    ),
+                    validation=self.validation.tables[table_name],
+                )
+        log.debug("Indexed %s rows across %s tables.", len(rows), len(self))
+
+    def __len__(self) -> int:
+        return len(self.table_names)
+
+    def table(self, table_name: str) -> TableSpec:
+        return self._tables[table_name]
+
+    def tables(self) -> Iterator[TableSpec]:
+        # Tables in the order they first appear in the input
+        for table_name in self.table_names:
+            yield self.table(table_name)
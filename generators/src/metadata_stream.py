@@ -0,0 +1,119 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+from typing import IO, Any, Iterator
+
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+from src.logger import log
+from src.metadata_input import read_metadata_chunks
+
+
+def _iter_presorted(chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    # Rows for a table are contiguous, so a table is complete as soon as a row for a different table turns up. The
+    # last table of every chunk is held back until the following chunk shows whether it carries on.
+    pending_parts: list[pd.DataFrame] = []
+    pending_name: Any = None
+    closed_tables: set[Any] = set()
+
+    for chunk in chunks:
+        names = chunk["table_name"].to_numpy()
+        run_starts = np.concatenate([[0], np.flatnonzero(names[1:] != names[:-1]) + 1])
+        run_names = names[run_starts].tolist()
+        continues_pending = bool(pending_parts) and run_names[0] == pending_name
+        new_names = run_names[1:] if continues_pending else run_names
+        if pending_parts and not continues_pending:
+            # Closed before the check, as the held back table must not turn up again later in this chunk
+            closed_tables.add(pending_name)
+        if len(set(new_names)) != len(new_names) or closed_tables.intersection(
+            new_names
+        ):
+            exc = "The input is not sorted by table_name. Stream it with 'presorted=False' to group it on disk."
+            log.warning(exc)
+            raise ValueError(exc)
+
+        if len(run_starts) == 1:
+            # The whole chunk belongs to a single table, which may still carry on into the next chunk
+            if not continues_pending and pending_parts:
+                yield pd.concat(pending_parts)
+                pending_parts = []
+            pending_parts.append(chunk)
+            pending_name = run_names[0]
+            continue
+
+        last_start = run_starts[-1]
+        closed_tables.update(run_names[:-1])
+        yield pd.concat(pending_parts + [chunk.iloc[:last_start]])
+        pending_parts = [chunk.iloc[last_start:]]
+        pending_name = run_names[-1]
+
+    if pending_parts:
+        yield pd.concat(pending_parts)
+
+
+def _iter_spilled(
+    chunks: Iterator[pd.DataFrame], batch_rows: int
+) -> Iterator[pd.DataFrame]:
+    # Unsorted input: each chunk is split by table and spilled to a temporary SQLite database, then the tables are
+    # read back one at a time in the order they were first seen. Only the order of table names is held in memory.
+    with tempfile.TemporaryDirectory(prefix="adp_generator_spill_") as spill_dir:
+        connection = sqlite3.connect(os.path.join(spill_dir, "spill.db"))
+        try:
+            connection.execute(
+                "CREATE TABLE spill (table_position INTEGER, payload BLOB)"
+            )
+            positions: dict[Any, int] = {}
+            for chunk in chunks:
+                for table_name, group in chunk.groupby(
+                    "table_name", sort=False, dropna=False
+                ):
+                    position = positions.setdefault(table_name, len(positions))
+                    connection.execute(
+                        "INSERT INTO spill VALUES (?, ?)",
+                        (position, pickle.dumps(group, pickle.HIGHEST_PROTOCOL)),
+                    )
+            connection.execute("CREATE INDEX spill_position ON spill (table_position)")
+            log.debug("Spilled %s tables to '%s'.", len(positions), spill_dir)
+
+            batch: list[pd.DataFrame] = []
+            rows_in_batch = 0
+            for position in range(len(positions)):
+                for (payload,) in connection.execute(
+                    "SELECT payload FROM spill WHERE table_position = ? ORDER BY rowid",
+                    (position,),
+                ):
+                    part = pickle.loads(payload)
+                    batch.append(part)
+                    rows_in_batch += len(part)
+                if rows_in_batch >= batch_rows:
+                    yield pd.concat(batch)
+                    batch = []
+                    rows_in_batch = 0
+            if batch:
+                yield pd.concat(batch)
+        finally:
+            connection.close()
+
+
+def iter_table_batches(
+    input_stream: IO, chunksize: int, presorted: bool = True, input_format: str = "csv"
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream the input metadata in chunks, yielding DataFrames that only ever contain complete tables, in the order the
+    tables first appear in the input. Peak memory is bounded by the chunksize and the largest table rather than by
+    the size of the whole input.
+    :param input_stream: IO; the open input file, in binary mode for parquet and Arrow input.
+    :param chunksize: int; number of rows to read from the input at a time.
+    :param presorted: bool; True when all rows of a table are contiguous in the input. A ValueError is raised if
+    they turn out not to be. Pass False to group the rows via a temporary on-disk spill instead.
+    :param input_format: str; "csv", "parquet" or "arrow".
+    :return: Iterator[pd.DataFrame]; batches of complete tables.
+    """
+    chunks = read_metadata_chunks(
+        input_stream=input_stream, chunksize=chunksize, input_format=input_format
+    )
+    if presorted:
+        return _iter_presorted(chunks=chunks)
+    return _iter_spilled(chunks=chunks, batch_rows=chunksize)
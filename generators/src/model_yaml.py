@@ -0,0 +1,403 @@
+import os
+from typing import IO, Any, Iterable, Iterator, Optional
+
+import yaml  # type: ignore
+from yaml.resolver import Resolver  # type: ignore
+
+from src.adapters.filesystems import BaseFilesystem
+from src.logger import log
+
+try:
+    from yaml import CDumper as _PieceDumper  # type: ignore
+except ImportError:  # pragma: no cover - pyyaml built without libyaml, the pure Python emitter is used instead
+    from yaml import Dumper as _PieceDumper  # type: ignore
+
+YAML_WIDTH = 80
+# Where each piece of a model entry sits in the models YAML file
+MODEL_INDENT = 2
+MODEL_KEY_INDENT = 4
+COLUMN_INDENT = 6
+# Items of a list within a column, e.g. its tests, short enough that they can never be wrapped onto a second line
+MAX_NESTED_ITEM_LENGTH = 32
+
+STR_TAG = "tag:yaml.org,2002:str"
+_RESOLVER = Resolver()
+
+
+class MyDumper(yaml.Dumper):
+    # Indents block sequences within mappings, which pyyaml doesn't by default, to match the dbt docs
+    def increase_indent(self, flow=False, indentless=False):
+        return super(MyDumper, self).increase_indent(flow, False)
+
+    # https://stackoverflow.com/questions/51272814/python-yaml-dumping-pointer-references
+    def ignore_aliases(self, data):
+        return True
+
+
+def _events(data: Any) -> Iterator[yaml.Event]:
+    # The events yaml.dump would give for the data, without going through pyyaml's representer and serializer
+    if isinstance(data, dict):
+        yield yaml.MappingStartEvent(None, None, True, flow_style=False)
+        for key, value in data.items():
+            yield from _events(key)
+            yield from _events(value)
+        yield yaml.MappingEndEvent()
+    elif isinstance(data, list):
+        yield yaml.SequenceStartEvent(None, None, True, flow_style=False)
+        for item in data:
+            yield from _events(item)
+        yield yaml.SequenceEndEvent()
+    elif data is None:
+        yield yaml.ScalarEvent(None, None, (True, False), "null")
+    else:
+        # Text that would read back as something else, e.g. 'yes' or '1.5', can't be written plain
+        is_plain = _RESOLVER.resolve(yaml.ScalarNode, data, (True, False)) == STR_TAG
+        yield yaml.ScalarEvent(None, None, (is_plain, True), data)
+
+
+def _dump(data: Any, width: int) -> str:
+    return yaml.emit(
+        [
+            yaml.StreamStartEvent(),
+            yaml.DocumentStartEvent(explicit=False),
+            *_events(data),
+            yaml.DocumentEndEvent(explicit=False),
+            yaml.StreamEndEvent(),
+        ],
+        Dumper=_PieceDumper,
+        width=width,
+    )
+
+
+def _indent(text: str, indent: int) -> str:
+    prefix = " " * indent
+    return prefix + text[:-1].replace("\n", "\n" + prefix) + "\n"
+
+
+def _is_plain_scalar(value: Any) -> bool:
+    # libyaml escapes and wraps double quoted text differently to pyyaml, so only printable ASCII text, which never
+    # needs escaping, is left to it. Other types are left to pyyaml's representer.
+    if isinstance(value, str):
+        return value.isascii() and value.isprintable()
+    return value is None
+
+
+def _is_short_text(value: Any) -> bool:
+    # Even when quoted, such a value can't reach the wrapping width from where it is written
+    return (
+        _is_plain_scalar(value)
+        and isinstance(value, str)
+        and len(value) <= MAX_NESTED_ITEM_LENGTH
+        and " " not in value
+    )
+
+
+def _is_column_list(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) > 0
+        and all(isinstance(column, dict) for column in value)
+    )
+
+
+def _is_streamable(model: Any) -> bool:
+    if not isinstance(model, dict) or not model:
+        return False
+    if not _is_plain_scalar(next(iter(model.values()))):
+        return False
+    for key, value in model.items():
+        if not isinstance(key, str) or not key.isidentifier():
+            return False
+        if _is_plain_scalar(value) or value == []:
+            continue
+        if not _is_column_list(value):
+            return False
+        for column in value:
+            for column_key, column_value in column.items():
+                if not isinstance(column_key, str) or not column_key.isidentifier():
+                    return False
+                if isinstance(column_value, list):
+                    if not all(_is_short_text(item) for item in column_value):
+                        return False
+                elif not _is_plain_scalar(column_value):
+                    return False
+    return True
+
+
+def render_model_entry(model: dict[str, Any]) -> str:
+    """
+    Render one model as it appears in the 'models' list of a dbt models YAML file dumped with MyDumper, e.g.
+    '  - name: ...\\n    description: ...\\n    columns:\\n      - name: ...'.
+
+    MyDumper is pure Python, so the entry is instead cut into pieces whose events are emitted by libyaml exactly as
+    MyDumper would emit them, bar their indentation: runs of scalar keys, and each list of columns. libyaml doesn't
+    indent a list within a mapping, so the pieces are always top level lists or mappings, emitted with the wrapping
+    width reduced by the indentation they are then shifted by, so long descriptions wrap at the same points. The only
+    lists left within a piece are those of short texts within a column, e.g. its tests, which are indented afterwards.
+    Anything of another shape is dumped with MyDumper.
+    :param model: dict[str, Any]; the model, e.g. {"name": ..., "description": ..., "columns": [...]}.
+    :return: str; the YAML lines of the model entry.
+    """
+    if not _is_streamable(model):
+        log.debug("Model entry isn't of the usual shape, dumping it with MyDumper")
+        text = yaml.dump(
+            {"models": [model]},
+            Dumper=MyDumper,
+            sort_keys=False,
+            default_flow_style=False,
+        )
+        return text[len("models:\n") :]
+
+    pieces: list[str] = []
+    scalars: dict[str, Any] = {}
+    for key, value in model.items():
+        if _is_plain_scalar(value) or value == []:
+            scalars[key] = value
+            continue
+        if scalars:
+            pieces.append(_render_scalars(scalars=scalars, is_first=not pieces))
+            scalars = {}
+        # The nested lists within columns are indentless, '  - ' at the start of a line only ever begins one of
+        # their items, as anything else within a column is indented by at least 4
+        columns = _dump(value, width=YAML_WIDTH - COLUMN_INDENT).replace(
+            "\n  - ", "\n    - "
+        )
+        pieces.append(f"{' ' * MODEL_KEY_INDENT}{key}:\n")
+        pieces.append(_indent(columns, COLUMN_INDENT))
+    if scalars:
+        pieces.append(_render_scalars(scalars=scalars, is_first=not pieces))
+    return "".join(pieces)
+
+
+def _render_scalars(scalars: dict[str, Any], is_first: bool) -> str:
+    if is_first:
+        # The first keys of the entry are written after the list item's '- '
+        return _indent(_dump([scalars], width=YAML_WIDTH - MODEL_INDENT), MODEL_INDENT)
+    return _indent(
+        _dump(scalars, width=YAML_WIDTH - MODEL_KEY_INDENT), MODEL_KEY_INDENT
+    )
+
+
+class RenderedEntryCache:
+    """
+    Remembers the rendered YAML of model entries, for models that are written again and again unchanged, e.g. those
+    carried forward from the manifest by every run of --watch. Models are looked up by identity, so a model must not be
+    changed once it has been rendered.
+    """
+
+    def __init__(self) -> None:
+        # id of the model: the model, which also keeps the id from being reused, and its rendered entry
+        self._entries: dict[int, tuple[dict[str, Any], str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def render(self, model: dict[str, Any]) -> str:
+        cached = self._entries.get(id(model))
+        if cached is not None and cached[0] is model:
+            return cached[1]
+        entry = render_model_entry(model)
+        self._entries[id(model)] = (model, entry)
+        return entry
+
+    def retain(self, models: Iterable[dict[str, Any]]) -> None:
+        # Forget the entries of every model but these
+        keep = {id(model) for model in models}
+        self._entries = {
+            key: value for key, value in self._entries.items() if key in keep
+        }
+
+
+def _render(model: dict[str, Any], entry_cache: Optional[RenderedEntryCache]) -> str:
+    return (
+        render_model_entry(model) if entry_cache is None else entry_cache.render(model)
+    )
+
+
+class ModelYamlWriter:
+    """
+    Writes a dbt models YAML file ('version: 2' and a list of models) one model at a time, as each table is rendered,
+    so the models of a whole catalog are never held in memory. The output is byte for byte what yaml.dump with
+    MyDumper gives for the complete file.
+
+    The file is streamed through filesystem.open_file to a file alongside, which is only moved over the file on close,
+    unless the filesystem only writes changed files, in which case it is written with write_file on close so it can be
+    compared with what is already there. Without a filesystem, the file is handed out by take_files once closed
+    instead. Used as a context manager, a writer left by an exception is discarded rather than closed, so a failed run
+    leaves any existing file exactly as it was.
+    """
+
+    def __init__(
+        self,
+        filesystem: Optional[BaseFilesystem],
+        filepath: str,
+        entry_cache: Optional[RenderedEntryCache] = None,
+    ):
+        self.filesystem = filesystem
+        self.filepath = filepath
+        self.entry_cache = entry_cache
+        self.model_count = 0
+        self._closed = False
+        self._chunks: list[str] = []
+        self._stream: Optional[IO] = None
+        self._files: list[tuple[str, str]] = []
+        self._temporary_filepath = f"{filepath}.{os.getpid()}.tmp"
+        if filesystem is not None and not filesystem.only_write_changed:
+            self._stream = filesystem.open_file(
+                filepath=self._temporary_filepath, mode="w"
+            )
+
+    def __enter__(self) -> "ModelYamlWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def _write(self, text: str) -> None:
+        if self._stream is None:
+            self._chunks.append(text)
+        else:
+            self._stream.write(text)
+
+    def write(self, model: dict[str, Any]) -> None:
+        """
+        Append a model to the file.
+        :param model: dict[str, Any]; the model, e.g. {"name": ..., "description": ..., "columns": [...]}.
+        """
+        if not self.model_count:
+            self._write("version: 2\nmodels:\n")
+        self._write(_render(model, self.entry_cache))
+        self.model_count += 1
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if not self.model_count:
+            self._write("version: 2\nmodels: []\n")
+        if self.filesystem is None:
+            self._files.append((self.filepath, "".join(self._chunks)))
+        elif self._stream is None:
+            self.filesystem.write_file(
+                filepath=self.filepath, content="".join(self._chunks)
+            )
+        else:
+            self._stream.close()
+            self.filesystem.move_file(
+                source_filepath=self._temporary_filepath, target_filepath=self.filepath
+            )
+        log.info("Wrote %s models to '%s'.", self.model_count, self.filepath)
+
+    def discard(self) -> None:
+        # Drop everything written so far, leaving the file as it was before the writer was opened
+        if self._closed:
+            return
+        self._closed = True
+        self._chunks = []
+        if self.filesystem is not None and self._stream is not None:
+            self._stream.close()
+            self.filesystem.delete_file(filepath=self._temporary_filepath)
+        log.info(
+            "Discarded %s models, leaving '%s' as it was.",
+            self.model_count,
+            self.filepath,
+        )
+
+    def take_files(self) -> list[tuple[str, str]]:
+        # The file, as filepath and content, once closed without a filesystem to write it to
+        files, self._files = self._files, []
+        return files
+
+
+class ShardedModelYamlWriter:
+    """
+    Writes dbt models YAML as one file per shard of shard_size models, in input order, rather than a single file for
+    every model, so that a change to one table only rewrites, and has dbt re-parse, the file its model is in. With a
+    shard_size of 1 each file is named after its model, e.g. so it sits next to the model's .sql, otherwise the shards
+    are numbered. Without a filesystem, each shard is handed out by take_files once full instead. Used as a context
+    manager, a writer left by an exception drops its last, unfinished shard rather than writing it over a full one.
+    """
+
+    def __init__(
+        self,
+        filesystem: Optional[BaseFilesystem],
+        folderpath: str,
+        filename_prefix: str,
+        shard_size: int,
+        entry_cache: Optional[RenderedEntryCache] = None,
+    ):
+        if shard_size < 1:
+            raise ValueError(f"shard_size must be at least 1, got {shard_size}")
+        self.filesystem = filesystem
+        self.folderpath = folderpath
+        self.filename_prefix = filename_prefix
+        self.shard_size = shard_size
+        self.entry_cache = entry_cache
+        self.model_count = 0
+        self.shard_count = 0
+        self._entries: list[str] = []
+        self._first_model_name = ""
+        self._files: list[tuple[str, str]] = []
+
+    def __enter__(self) -> "ShardedModelYamlWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def _shard_filepath(self) -> str:
+        if self.shard_size == 1:
+            return f"{self.folderpath}/{self._first_model_name}.yml"
+        return f"{self.folderpath}/{self.filename_prefix}_{self.shard_count:04d}.yml"
+
+    def _flush(self) -> None:
+        if not self._entries:
+            return
+        content = "version: 2\nmodels:\n" + "".join(self._entries)
+        if self.filesystem is None:
+            self._files.append((self._shard_filepath(), content))
+        else:
+            self.filesystem.write_file(filepath=self._shard_filepath(), content=content)
+        self.shard_count += 1
+        self._entries = []
+
+    def write(self, model: dict[str, Any]) -> None:
+        """
+        Add a model to the current shard, writing the shard once it is full.
+        :param model: dict[str, Any]; the model, e.g. {"name": ..., "description": ..., "columns": [...]}.
+        """
+        if not self._entries:
+            self._first_model_name = model["name"]
+        self._entries.append(_render(model, self.entry_cache))
+        self.model_count += 1
+        if len(self._entries) == self.shard_size:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        log.info(
+            "Wrote %s models to %s YAML files in '%s'.",
+            self.model_count,
+            self.shard_count,
+            self.folderpath,
+        )
+
+    def discard(self) -> None:
+        # Drop the models of the unfinished shard. Shards already written were complete, so are left as they are.
+        log.info(
+            "Discarded the last %s models for '%s'.",
+            len(self._entries),
+            self.folderpath,
+        )
+        self._entries = []
+
+    def take_files(self) -> list[tuple[str, str]]:
+        # The shards filled since the last call, as filepath and content, when there is no filesystem to write them to
+        files, self._files = self._files, []
+        return files
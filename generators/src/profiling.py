@@ -0,0 +1,182 @@
+import contextlib
+import time
+from dataclasses import dataclass
+from typing import Any, ContextManager, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Returned by every disabled timer, so an untimed stage costs a single function call
+_UNTIMED = contextlib.nullcontext()
+
+
+@dataclass
+class StageTiming:
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    calls: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "calls": self.calls,
+        }
+
+
+class StageTimer:
+    """
+    Adds up the wall and CPU time spent in each named stage, e.g. the renderers of a single table. CPU time is that of
+    the process the stage ran in, so the timer of a table rendered in a worker process holds the worker's CPU time.
+    A disabled timer records nothing.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages: dict[str, StageTiming] = {}
+        self._lap_start = (time.perf_counter(), time.process_time())
+
+    def _add(
+        self, name: str, wall_seconds: float, cpu_seconds: float, calls: int = 1
+    ) -> None:
+        timing = self.stages.setdefault(name, StageTiming())
+        timing.wall_seconds += wall_seconds
+        timing.cpu_seconds += cpu_seconds
+        timing.calls += calls
+
+    def lap(self, name: str) -> None:
+        """
+        Record the time since the previous lap, or since the timer was created, as the stage. For code that runs as a
+        sequence of stages, without having to nest each one in a with block.
+        :param name: str; the stage that has just finished.
+        """
+        if not self.enabled:
+            return
+        wall, cpu = time.perf_counter(), time.process_time()
+        self._add(name, wall - self._lap_start[0], cpu - self._lap_start[1])
+        self._lap_start = (wall, cpu)
+
+    def stage(self, name: str) -> ContextManager:
+        if not self.enabled:
+            return _UNTIMED
+        return self._time(name)
+
+    @contextlib.contextmanager
+    def _time(self, name: str) -> Iterator[None]:
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self._add(
+                name,
+                time.perf_counter() - wall_start,
+                time.process_time() - cpu_start,
+            )
+
+    def merge(self, other: "StageTimer") -> None:
+        for name, timing in other.stages.items():
+            self._add(name, timing.wall_seconds, timing.cpu_seconds, timing.calls)
+
+    @property
+    def wall_seconds(self) -> float:
+        return sum(timing.wall_seconds for timing in self.stages.values())
+
+    @property
+    def cpu_seconds(self) -> float:
+        return sum(timing.cpu_seconds for timing in self.stages.values())
+
+    def as_dict(self) -> dict[str, dict[str, Any]]:
+        return {name: timing.as_dict() for name, timing in self.stages.items()}
+
+
+class GenerationProfile(StageTimer):
+    """
+    Timings of a whole generator run: every stage overall, and the stages of each table. Stages timed outside of
+    the tables, e.g. 'read' or 'validation', are only in the overall timings, and a stage may run within another,
+    e.g. 'validation' within 'index'.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(enabled=True)
+        self.tables: dict[str, StageTimer] = {}
+        self.total = StageTiming()
+
+    def add_table(self, table_name: str, timer: StageTimer) -> None:
+        if table_name in self.tables:
+            self.tables[table_name].merge(timer)
+        else:
+            self.tables[table_name] = timer
+        self.merge(timer)
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["GenerationProfile"]:
+        # Makes this the profile that the stage() function records to, and times the run as a whole
+        global _active_profile
+        previous, _active_profile = _active_profile, self
+        try:
+            with self._time("total"):
+                yield self
+        finally:
+            _active_profile = previous
+            self.total = self.stages.pop("total")
+
+    def report(self, top_n: int = 10) -> dict[str, Any]:
+        """
+        Build the JSON serialisable report of the run.
+        :param top_n: int; number of the slowest tables, by wall time, to list with their stages.
+        :return: dict[str, Any]; the report.
+        """
+        slowest = sorted(
+            self.tables.items(), key=lambda item: item[1].wall_seconds, reverse=True
+        )[:top_n]
+        stages = sorted(
+            self.as_dict().items(),
+            key=lambda item: item[1]["wall_seconds"],
+            reverse=True,
+        )
+        return {
+            "wall_seconds": round(self.total.wall_seconds, 6),
+            "cpu_seconds": round(self.total.cpu_seconds, 6),
+            "table_count": len(self.tables),
+            "stages": dict(stages),
+            "slowest_tables": [
+                {
+                    "table_name": table_name,
+                    "wall_seconds": round(timer.wall_seconds, 6),
+                    "cpu_seconds": round(timer.cpu_seconds, 6),
+                    "stages": timer.as_dict(),
+                }
+                for table_name, timer in slowest
+            ],
+        }
+
+
+_active_profile: Optional[GenerationProfile] = None
+
+
+def is_profiling() -> bool:
+    return _active_profile is not None
+
+
+def stage(name: str) -> ContextManager:
+    """
+    Time a stage in the active profile, if there is one. For stages deep within the generator, e.g. reading the
+    input, that have no profile passed to them.
+    :param name: str; the stage name.
+    :return: ContextManager; times the block within it.
+    """
+    if _active_profile is None:
+        return _UNTIMED
+    return _active_profile.stage(name)
+
+
+def timed_iter(iterable: Iterator[T], name: str) -> Iterator[T]:
+    # Times each next() of an iterator as the stage, e.g. reading each chunk of a streamed input
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
@@ -0,0 +1,298 @@
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from src.adapters.filesystems import LocalFilesystem
+from src.logger import log, logging_for_run
+from src.manifest import GenerationManifest
+from src.model_yaml import RenderedEntryCache
+from src.watch import FileSignature, file_signature
+
+# Only imported by a service with a worker pool
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+# Environment variable naming the socket of the generator service, see default_socket_path
+SOCKET_ENV_VAR = "ADP_GENERATOR_SOCKET"
+
+
+def _private_folder(path: str) -> str:
+    # Only the current user may be able to get at the socket, or another user could listen on it in the service's place
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    stat = os.lstat(path)
+    if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+        raise PermissionError(
+            f"'{path}' has to be a folder only the current user has access to, to hold the generator service socket"
+        )
+    return path
+
+
+def default_socket_path() -> str:
+    # One service per user, in a folder only they have access to, unless the environment says otherwise
+    if os.environ.get(SOCKET_ENV_VAR):
+        return os.environ[SOCKET_ENV_VAR]
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        # Per user and only accessible to them already
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], "adp_generator.sock")
+    folder = os.path.join(tempfile.gettempdir(), f"adp_generator_{os.getuid()}")
+    return os.path.join(_private_folder(folder), "service.sock")
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    # Each connection carries a single request and its response, as one line of JSON each
+    server: "GeneratorService"
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError as exc:
+            response: dict[str, Any] = {"ok": False, "error": f"Invalid request: {exc}"}
+        else:
+            response = self.server.respond(request)
+        self.wfile.write((json.dumps(response) + "\n").encode())
+
+
+class GeneratorService(socketserver.UnixStreamServer):
+    """
+    Serves generator runs over a Unix socket from a single long lived process, so that the modules, the compiled
+    templates, the invalid table names and the worker pool are only set up once, rather than by every run. The
+    manifest of each output folder is also kept in memory between incremental runs, as long as nothing else has
+    written it since. Requests are handled one at a time, in the order they connect.
+    """
+
+    def __init__(self, socket_path: str, master: Callable[..., None], workers: int = 1):
+        """
+        :param socket_path: str; the Unix socket to listen on. Throws a FileExistsError if a service is already
+        listening on it.
+        :param master: Callable[..., None]; adp_generator.master.
+        :param workers: int; size of the worker pool kept for every run. 1 renders every table in the service.
+        """
+        self.socket_path = socket_path
+        self.master = master
+        self.workers = workers
+        self.executor: Optional["ProcessPoolExecutor"] = None
+        self._manifests: dict[str, tuple[FileSignature, GenerationManifest]] = {}
+        _remove_stale_socket(socket_path)
+        # Only the user running the service can connect to it, from the moment the socket is bound
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(umask)
+
+        # Imported now, and inherited by the worker pool, rather than by the first run with a large input
+        import src.metadata_index  # noqa: F401
+        import src.metadata_input  # noqa: F401
+        import src.metadata_stream  # noqa: F401
+
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+            # Start the workers now, rather than on the first run
+            self.executor.submit(int).result()
+
+    def respond(self, request: dict[str, Any]) -> dict[str, Any]:
+        command = request.get("command")
+        if command == "ping":
+            return {"ok": True}
+        if command == "shutdown":
+            log.info("Generator service shutting down")
+            # shutdown waits for serve_forever to return, so can't be called from the thread running it
+            threading.Thread(target=self.shutdown).start()
+            return {"ok": True}
+        if command != "master":
+            return {"ok": False, "error": f"Unknown command '{command}'"}
+
+        start = time.perf_counter()
+        previous_cwd = os.getcwd()
+        try:
+            # Paths in the request are relative to where the client was run
+            os.chdir(request["cwd"])
+            self.generate(**request["arguments"])
+        except Exception as exc:
+            log.exception("Generator service run failed")
+            return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            os.chdir(previous_cwd)
+        seconds = time.perf_counter() - start
+        log.info("Generator service run done in %.3fs", seconds)
+        return {"ok": True, "seconds": seconds}
+
+    def generate(
+        self,
+        output_folder: str,
+        only_write_changed: bool = False,
+        log_level: Optional[str] = None,
+        log_file: Optional[str] = None,
+        quiet: bool = False,
+        **master_kwargs: Any,
+    ) -> None:
+        """
+        Run master with the service's worker pool and kept manifests, logging as the client asked for the run.
+        :param output_folder: str; as for master.
+        :param only_write_changed: bool; as for LocalFilesystem.
+        :param log_level: str; the client's --log-level, see logging_for_run.
+        :param log_file: str; the client's --log-file.
+        :param quiet: bool; the client's --quiet.
+        :param master_kwargs: Any; every other argument of master.
+        """
+        with logging_for_run(level=log_level, log_file=log_file, quiet=quiet):
+            self._generate(
+                output_folder=output_folder,
+                only_write_changed=only_write_changed,
+                **master_kwargs,
+            )
+
+    def _generate(
+        self, output_folder: str, only_write_changed: bool, **master_kwargs: Any
+    ) -> None:
+        filesystem = LocalFilesystem(only_write_changed=only_write_changed)
+        if self.executor is not None:
+            # Work is spread over the service's pool, whatever the client asked for
+            master_kwargs["workers"] = self.workers
+        manifest = None
+        if master_kwargs.get("incremental"):
+            manifest = self._manifest(filesystem, output_folder)
+        try:
+            self.master(
+                output_folder=output_folder,
+                local_filesystem=filesystem,
+                manifest=manifest,
+                executor=self.executor,
+                **master_kwargs,
+            )
+        except Exception:
+            if manifest is not None:
+                self._keep_manifest(output_folder, manifest.next_run(completed=False))
+            raise
+        if manifest is not None:
+            self._keep_manifest(output_folder, manifest.next_run())
+
+    def _manifest(
+        self, filesystem: LocalFilesystem, output_folder: str
+    ) -> GenerationManifest:
+        # The kept manifest, unless the one on disk has been written by another run since
+        kept = self._manifests.get(os.path.abspath(output_folder))
+        signature = file_signature(GenerationManifest.path(output_folder))
+        if kept is not None and signature is not None and kept[0] == signature:
+            return kept[1]
+        manifest = GenerationManifest.load(
+            filesystem=filesystem, output_folder=output_folder
+        )
+        manifest.entry_cache = RenderedEntryCache()
+        return manifest
+
+    def _keep_manifest(self, output_folder: str, manifest: GenerationManifest) -> None:
+        self._manifests[os.path.abspath(output_folder)] = (
+            file_signature(GenerationManifest.path(output_folder)),
+            manifest,
+        )
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self.executor is not None:
+            self.executor.shutdown()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    # A service that was killed leaves its socket file behind, which has to go before the socket can be bound again
+    if not os.path.exists(socket_path):
+        return
+    if request({"command": "ping"}, socket_path=socket_path) is not None:
+        raise FileExistsError(
+            f"A generator service is already listening on '{socket_path}'"
+        )
+    log.debug("Removing stale generator service socket '%s'", socket_path)
+    os.unlink(socket_path)
+
+
+def serve(
+    master: Callable[..., None], socket_path: Optional[str] = None, workers: int = 1
+) -> None:
+    """
+    Run the generator service until interrupted with Ctrl+C, or asked to stop with stop_service.
+    :param master: Callable[..., None]; adp_generator.master.
+    :param socket_path: str; the Unix socket to listen on. Defaults to default_socket_path().
+    :param workers: int; size of the worker pool kept for every run.
+    """
+    socket_path = socket_path or default_socket_path()
+    with GeneratorService(
+        socket_path=socket_path, master=master, workers=workers
+    ) as service:
+        log.info("Generator service listening on '%s'", socket_path)
+        try:
+            service.serve_forever()
+        except KeyboardInterrupt:
+            log.info("Generator service interrupted")
+
+
+def request(
+    message: dict[str, Any], socket_path: Optional[str] = None
+) -> Optional[dict[str, Any]]:
+    """
+    Send a request to the generator service and wait for its response.
+    :param message: dict[str, Any]; the request, with the command and its arguments.
+    :param socket_path: str; the service's socket. Defaults to default_socket_path().
+    :return: dict[str, Any]; the response. None when no service is listening on the socket. Throws a PermissionError
+    if the socket belongs to another user.
+    """
+    socket_path = socket_path or default_socket_path()
+    try:
+        owner = os.stat(socket_path).st_uid
+    except FileNotFoundError:
+        return None
+    # Runs, and with them the client's files, are only sent to a service the current user started
+    if owner != os.getuid():
+        raise PermissionError(
+            f"The generator service socket '{socket_path}' belongs to another user"
+        )
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        connection.sendall((json.dumps(message) + "\n").encode())
+        with connection.makefile("rb") as response:
+            line = response.readline()
+    if not line:
+        raise RuntimeError(
+            f"The generator service on '{socket_path}' closed the connection without responding"
+        )
+    return json.loads(line)
+
+
+def forward_master(
+    arguments: dict[str, Any], socket_path: Optional[str] = None
+) -> bool:
+    """
+    Run master in the generator service, when one is running.
+    :param arguments: dict[str, Any]; the arguments of master, other than the filesystem, plus only_write_changed and
+    the logging options of GeneratorService.generate. Relative paths are relative to the current working directory, as
+    for a local run.
+    :param socket_path: str; the service's socket. Defaults to default_socket_path().
+    :return: bool; True when the service ran it, False when no service is running. Throws a RuntimeError if the
+    run failed.
+    """
+    response = request(
+        {"command": "master", "cwd": os.getcwd(), "arguments": arguments},
+        socket_path=socket_path,
+    )
+    if response is None:
+        return False
+    if not response["ok"]:
+        raise RuntimeError(f"The generator service run failed: {response['error']}")
+    log.info("Generated by the generator service in %.3fs", response["seconds"])
+    return True
+
+
+def stop_service(socket_path: Optional[str] = None) -> bool:
+    # True when a service was running and has been asked to stop
+    return request({"command": "shutdown"}, socket_path=socket_path) is not None
@@ -0,0 +1,198 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+from src.adapters.filesystems import BaseFilesystem, LocalFilesystem
+from src.input_data_values import METADATA_COLUMNS, ColumnTypes, CuratedDBTType
+from src.logger import log
+
+try:
+    import pyarrow  # type: ignore
+    import pyarrow.csv  # type: ignore
+except ImportError:  # pragma: no cover - pyarrow is optional, pandas is used instead
+    pyarrow = None
+
+DATA_TYPES = ["NUMBER(38,0)", "VARCHAR(255)", "TIMESTAMP_NTZ(9)", "DATE", "FLOAT"]
+
+WIDTH_DISTRIBUTIONS = ["uniform", "lognormal"]
+OUTPUT_FORMATS = ["csv", "parquet"]
+
+KEY_DATA_TYPE = "NUMBER(38,0)"
+UPDATED_DATE_DATA_TYPE = "TIMESTAMP_NTZ(9)"
+
+
+@dataclass(frozen=True)
+class CatalogSpec:
+    # Shape of a synthetic metadata catalog. Every table gets its unique key column(s) first, then its updated date
+    # column(s), then ordinary columns drawn from the data type mix.
+    table_count: int
+    min_columns: int = 5
+    max_columns: int = 50
+    # 'uniform' spreads widths evenly between min and max, 'lognormal' clusters them near min with a long tail
+    width_distribution: str = "uniform"
+    # Fraction of tables with a composite unique key / several updated date columns
+    multi_key_ratio: float = 0.0
+    multi_updated_date_ratio: float = 0.0
+    # Fraction of tables that are curated as scd2, the rest have no curated_dbt_type. Note the generator itself only
+    # supports scd2 tables so far.
+    scd2_ratio: float = 1.0
+    # Relative weights of the data types of the ordinary columns
+    data_types: dict[str, float] = field(
+        default_factory=lambda: {data_type: 1.0 for data_type in DATA_TYPES}
+    )
+    table_prefix: str = "TABLE"
+    seed: Optional[int] = 0
+
+
+def _table_widths(spec: CatalogSpec, rng: np.random.Generator) -> np.ndarray:
+    if spec.width_distribution == "uniform":
+        return rng.integers(spec.min_columns, spec.max_columns + 1, spec.table_count)
+    if spec.width_distribution == "lognormal":
+        # Median of min_columns * 2, and at least 99% of tables within max_columns before clipping
+        spread = max(
+            np.log(max(spec.max_columns / (spec.min_columns * 2), 1)) / 2.33, 0.1
+        )
+        widths = rng.lognormal(np.log(spec.min_columns * 2), spread, spec.table_count)
+        return np.clip(np.rint(widths), spec.min_columns, spec.max_columns).astype(int)
+    raise ValueError(
+        f"Unknown width distribution '{spec.width_distribution}', expected one of {WIDTH_DISTRIBUTIONS}"
+    )
+
+
+def generate_catalog(spec: CatalogSpec) -> pd.DataFrame:
+    """
+    Generate a synthetic metadata catalog in the input CSV schema. Every column of the output is built with whole
+    array operations, so millions of rows take seconds.
+    :param spec: CatalogSpec; the shape of the catalog.
+    :return: pd.DataFrame; one row per column, in table order.
+    """
+    if spec.min_columns < 4 or spec.max_columns < spec.min_columns:
+        raise ValueError(
+            "min_columns must be at least 4, to fit two key and two updated date columns, and at most max_columns"
+        )
+    rng = np.random.default_rng(spec.seed)
+
+    # Table level attributes
+    widths = _table_widths(spec=spec, rng=rng)
+    key_counts = np.where(rng.random(spec.table_count) < spec.multi_key_ratio, 2, 1)
+    date_counts = np.where(
+        rng.random(spec.table_count) < spec.multi_updated_date_ratio, 2, 1
+    )
+    is_scd2 = rng.random(spec.table_count) < spec.scd2_ratio
+    table_names = np.char.add(
+        f"{spec.table_prefix}_",
+        np.char.zfill(np.arange(spec.table_count).astype(str), 6),
+    ).astype(object)
+
+    # Expand to one row per column: the table of each row and the position of each row within its table
+    row_count = int(widths.sum())
+    table_ids = np.repeat(np.arange(spec.table_count), widths)
+    starts = np.concatenate([[0], np.cumsum(widths)[:-1]])
+    positions = np.arange(row_count) - np.repeat(starts, widths)
+    row_key_counts = key_counts[table_ids]
+    is_key = positions < row_key_counts
+    is_date = ~is_key & (positions < row_key_counts + date_counts[table_ids])
+
+    column_type = np.full(row_count, None, dtype=object)
+    column_type[is_key] = ColumnTypes.unique_key.value
+    column_type[is_date] = ColumnTypes.updated_date.value
+
+    data_types = list(spec.data_types)
+    weights = np.array([spec.data_types[data_type] for data_type in data_types])
+    source_data_type = np.array(data_types, dtype=object)[
+        rng.choice(len(data_types), size=row_count, p=weights / weights.sum())
+    ]
+    source_data_type[is_key] = KEY_DATA_TYPE
+    source_data_type[is_date] = UPDATED_DATE_DATA_TYPE
+
+    # A composite key's columns aren't unique on their own
+    column_tests = np.full(row_count, None, dtype=object)
+    column_tests[is_key & (row_key_counts == 1)] = "unique,not_null"
+    column_tests[is_key & (row_key_counts > 1)] = "not_null"
+
+    # Strings are built once per table or per column position and then gathered, so only the column description
+    # needs a string operation per row
+    column_name_lookup = np.char.add(
+        "column_", np.char.zfill(np.arange(widths.max(initial=0)).astype(str), 4)
+    ).astype(object)
+    row_table_names = table_names[table_ids]
+    description_prefixes = (
+        "Column in " + pd.Series(table_names) + " called "
+    ).to_numpy()
+    curated_dbt_type = np.where(is_scd2, CuratedDBTType.scd2.value, None)[table_ids]
+
+    log.debug(
+        "Generated a synthetic catalog of %s tables, %s rows.",
+        spec.table_count,
+        row_count,
+    )
+    return pd.DataFrame(
+        {
+            "table_name": row_table_names,
+            "table_description": (
+                "Synthetic table called " + pd.Series(table_names)
+            ).to_numpy()[table_ids],
+            "curated_dbt_type": curated_dbt_type,
+            "column_name": column_name_lookup[positions],
+            "column_description": description_prefixes[table_ids]
+            + pd.Series(column_name_lookup).str.upper().to_numpy()[positions],
+            "source_data_type": source_data_type,
+            "column_type": column_type,
+            "column_tests": column_tests,
+        },
+        columns=METADATA_COLUMNS,
+    )
+
+
+def build_catalog(table_count: int, columns_per_table: int) -> pd.DataFrame:
+    """
+    Build a synthetic metadata catalog where every table is the same width, with a single unique key first and a
+    single updated date second.
+    :param table_count: int; number of tables.
+    :param columns_per_table: int; number of columns in every table, at least 4.
+    :return: pd.DataFrame; one row per column, in table order.
+    """
+    return generate_catalog(
+        CatalogSpec(
+            table_count=table_count,
+            min_columns=columns_per_table,
+            max_columns=columns_per_table,
+        )
+    )
+
+
+def write_catalog(
+    catalog: pd.DataFrame,
+    filepath: str,
+    output_format: str = "csv",
+    filesystem: Optional[BaseFilesystem] = None,
+) -> None:
+    """
+    Write a catalog as an input file for the generator.
+    :param catalog: pd.DataFrame; the catalog, e.g. from generate_catalog.
+    :param filepath: str; where to write it.
+    :param output_format: str; "csv" or "parquet". Parquet needs pyarrow or fastparquet installed.
+    :param filesystem: BaseFilesystem; where the file is written. Defaults to the local disk.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}"
+        )
+    filesystem = filesystem or LocalFilesystem()
+    log.info(
+        "Writing %s catalog rows as %s to '%s'.", len(catalog), output_format, filepath
+    )
+    if output_format == "parquet":
+        with filesystem.open_file(filepath=filepath, mode="wb") as output:
+            catalog.to_parquet(output, index=False)
+    elif pyarrow is not None:
+        # pyarrow's CSV writer is many times faster than pandas' on millions of rows. It quotes every string value,
+        # which reads back identically.
+        table = pyarrow.Table.from_pandas(catalog, preserve_index=False)
+        with filesystem.open_file(filepath=filepath, mode="wb") as output:
+            pyarrow.csv.write_csv(table, output)
+    else:
+        with filesystem.open_file(filepath=filepath, mode="w") as output:
+            catalog.to_csv(output, index=False, lineterminator="\n")
@@ -0,0 +1,166 @@
+import functools
+import string
+from typing import TYPE_CHECKING, Any, Sequence
+
+# Only imported when rendering a whole catalog at once
+if TYPE_CHECKING:
+    import numpy as np  # type: ignore
+
+
+def factorize_as_text(values: Sequence[Any]) -> tuple["np.ndarray", list[str]]:
+    """
+    Factorize values into integer codes and the str() of each distinct value, as str.format would render it. Missing
+    values (None, NaN) get codes of their own rather than pandas' -1.
+    :param values: Sequence[Any]; the values.
+    :return: tuple[np.ndarray, list[str]]; the code of each value, and the text of each code.
+    """
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+
+    codes, uniques = pd.factorize(values)
+    texts = [str(value) for value in uniques]
+    missing = np.flatnonzero(codes == -1)
+    if len(missing):
+        values = np.asarray(values, dtype=object)
+        missing_codes: dict[str, int] = {}
+        for position in missing.tolist():
+            text = str(values[position])
+            codes[position] = missing_codes.setdefault(
+                text, len(texts) + len(missing_codes)
+            )
+        texts.extend(missing_codes)
+    return codes, texts
+
+
+class CompiledTemplate:
+    """
+    A str.format template parsed once up front. Templates made up of plain '{name}' fields are compiled to a single
+    %-format string with the field values supplied positionally, so rendering is one C-level formatting call rather
+    than a re-parse of the template. Anything fancier (format specs, conversions, attribute or index lookups) falls
+    back to str.format, so the output is always identical to template.format(**fields).
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self.field_names: list[str] = []
+        # The literal text around the fields, always one more than the number of fields
+        self._literals = [""]
+        self._is_simple = True
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(
+            template
+        ):
+            self._literals[-1] += literal
+            if field_name is None:
+                continue
+            if not field_name.isidentifier() or format_spec or conversion:
+                self._is_simple = False
+            self.field_names.append(field_name)
+            self._literals.append("")
+        self._percent_format = "%s".join(
+            literal.replace("%", "%%") for literal in self._literals
+        )
+
+    def render(self, **fields: Any) -> str:
+        if not self._is_simple:
+            return self.template.format(**fields)
+        return self._percent_format % tuple(fields[name] for name in self.field_names)
+
+    def render_columns(self, join_with: str, **columns: Sequence[Any]) -> str:
+        """
+        Render the template once per position across equal length columns of values and join the results, e.g. one
+        'cast(FILECONTENTS:{column_name} as {source_data_type})' expression per metadata row.
+        :param join_with: str; placed between each rendered row.
+        :param columns: Sequence[Any]; the values of each field, one per row.
+        :return: str; the joined rows.
+        """
+        if not self._is_simple:
+            names = list(columns)
+            return join_with.join(
+                self.template.format(**dict(zip(names, values)))
+                for values in zip(*columns.values())
+            )
+        percent_format = self._percent_format
+        rows = zip(*(columns[name] for name in self.field_names))
+        return join_with.join([percent_format % row for row in rows])
+
+    def render_grouped_columns(
+        self, join_with: str, offsets: Sequence[int], **columns: Sequence[Any]
+    ) -> list[str]:
+        """
+        The equivalent of render_columns for every group of consecutive rows at once, e.g. the column block of every
+        table in a catalog. Only distinct combinations of field values are rendered, found with integer array
+        operations, so catalogs that reuse column names and data types across tables render little more than once.
+        All rows are then joined in one go, and each group's block is sliced out by its character offsets.
+        :param join_with: str; placed between each rendered row of a group.
+        :param offsets: Sequence[int]; the start row of each group followed by the total number of rows.
+        :param columns: Sequence[Any]; the values of each field for every row.
+        :return: list[str]; one joined block per group, "" for an empty group.
+        """
+        import numpy as np  # type: ignore
+        import pandas as pd  # type: ignore
+
+        bounds = np.asarray(offsets)
+        if not self._is_simple:
+            return [
+                self.render_columns(
+                    join_with,
+                    **{name: values[start:end] for name, values in columns.items()}
+                )
+                for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist())
+            ]
+        row_count = int(bounds[-1])
+        # Combine the codes of each distinct field into a single code per distinct combination of field values
+        field_codes: dict[str, np.ndarray] = {}
+        field_texts: dict[str, list[str]] = {}
+        combined = np.zeros(row_count, dtype=np.int64)
+        for name in dict.fromkeys(self.field_names):
+            field_codes[name], field_texts[name] = factorize_as_text(columns[name])
+            combined, _ = pd.factorize(
+                combined * len(field_texts[name]) + field_codes[name]
+            )
+        _, first_rows, row_combinations = np.unique(
+            combined, return_index=True, return_inverse=True
+        )
+
+        # The field values of each distinct combination, taken from the first row it occurs in
+        combination_values = {
+            name: np.array(field_texts[name], dtype=object)[
+                field_codes[name][first_rows]
+            ].tolist()
+            for name in field_codes
+        }
+        percent_format = self._percent_format
+        combination_lines = np.array(
+            [
+                percent_format % values
+                for values in zip(
+                    *(combination_values[name] for name in self.field_names)
+                )
+            ],
+            dtype=object,
+        )
+        lines = combination_lines[row_combinations]
+        text = join_with.join(lines.tolist())
+
+        # Character offset of the start of each row within the joined text, and of the end of the text
+        combination_lengths = np.fromiter(
+            map(len, combination_lines), dtype=np.int64, count=len(combination_lines)
+        )
+        line_starts = np.zeros(row_count + 1, dtype=np.int64)
+        np.cumsum(
+            combination_lengths[row_combinations] + len(join_with),
+            out=line_starts[1:],
+        )
+        starts = line_starts[bounds[:-1]]
+        # A block ends before the separator that follows its last row
+        ends = line_starts[bounds[1:]] - len(join_with)
+        return [
+            text[start:end] if end > start else ""
+            for start, end in zip(starts.tolist(), ends.tolist())
+        ]
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template(template: str) -> CompiledTemplate:
+    # Each distinct template is only ever compiled once per process
+    return CompiledTemplate(template)
@@ -0,0 +1,154 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, ContextManager, Iterator, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Returned by span() when tracing is off, so an untraced span costs a single function call
+_UNTRACED = contextlib.nullcontext()
+
+# Arguments of traced functions that are recorded with their span, when given by keyword
+SPAN_ARGUMENTS = ("filepath", "path", "folderpath", "table_name", "target_filepath")
+
+
+class Tracer:
+    """
+    Records spans as Chrome trace events ('complete' events, with a start and a duration), which can be opened in
+    chrome://tracing, Perfetto or speedscope. Every event carries the process and thread it ran in, so the spans of
+    worker processes and filesystem threads are laid out side by side.
+    """
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []
+        self.pid = os.getpid()
+        # perf_counter is system wide, so spans recorded in worker processes line up with those of the main process
+        self.origin_ns = time.perf_counter_ns()
+        self.is_worker = False
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, args: dict[str, Any]) -> Iterator[None]:
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end_ns = time.perf_counter_ns()
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start_ns - self.origin_ns) / 1000,
+                    "dur": (end_ns - start_ns) / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_native_id(),
+                    "args": args,
+                }
+            )
+
+    def trace(self) -> dict[str, Any]:
+        """
+        Build the trace, with the processes named so the viewer can tell the main process from the workers.
+        :return: dict[str, Any]; JSON serialisable trace in the Chrome trace event format.
+        """
+        pids = sorted({event["pid"] for event in self.events} | {self.pid})
+        process_names = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": "adp_generator" if pid == self.pid else "worker"},
+            }
+            for pid in pids
+        ]
+        return {"traceEvents": process_names + self.events, "displayTimeUnit": "ms"}
+
+    def export(self) -> str:
+        return json.dumps(self.trace())
+
+
+_tracer: Optional[Tracer] = None
+
+
+def start_tracing() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Optional[Tracer]:
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def is_tracing() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, category: str = "generator", **args: Any) -> ContextManager:
+    """
+    Trace a block of code, if tracing has been started.
+    :param name: str; the span name shown in the trace viewer.
+    :param category: str; groups related spans, e.g. 'filesystem'.
+    :param args: Any; shown with the span, e.g. table_name.
+    :return: ContextManager; traces the block within it.
+    """
+    if _tracer is None:
+        return _UNTRACED
+    return _tracer.span(name=name, category=category, args=args)
+
+
+def traced(category: str) -> Callable[[F], F]:
+    """
+    Decorate a function or method so that each call is traced as a span named after it, along with any of
+    SPAN_ARGUMENTS it was given by keyword.
+    :param category: str; the span category.
+    """
+
+    def decorator(function: F) -> F:
+        name = function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _tracer is None:
+                return function(*args, **kwargs)
+            span_args = {
+                key: str(kwargs[key]) for key in SPAN_ARGUMENTS if key in kwargs
+            }
+            with _tracer.span(name=name, category=category, args=span_args):
+                return function(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def take_worker_events() -> list[dict[str, Any]]:
+    """
+    In a worker process, hand over the events recorded since the last call, to be sent back to the main process
+    and added to its trace with add_events. Anywhere else there is nothing to hand over.
+    :return: list[dict[str, Any]]; the events.
+    """
+    if _tracer is None or not _tracer.is_worker:
+        return []
+    events, _tracer.events = _tracer.events, []
+    return events
+
+
+def add_events(events: list[dict[str, Any]]) -> None:
+    if _tracer is not None:
+        _tracer.events.extend(events)
+
+
+def _after_fork_in_child() -> None:
+    # A forked worker process keeps tracing, but only what it records itself is sent back
+    if _tracer is not None:
+        _tracer.events = []
+        _tracer.is_worker = True
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
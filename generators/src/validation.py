@@ -0,0 +1,320 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterable, Sequence
+
+from configuration.invalid_table_names import invalid_table_names  # type: ignore
+from src.input_data_values import METADATA_COLUMNS, ColumnTypes, CuratedDBTType
+from src.logger import log
+
+# Only imported once a large input needs them, see validate_tables
+if TYPE_CHECKING:
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+
+# Columns the generator can't do without
+REQUIRED_COLUMNS = [
+    "table_name",
+    "curated_dbt_type",
+    "column_name",
+    "source_data_type",
+    "column_type",
+]
+
+# The message of each rule, formatted with the duplicate columns of the table
+RULE_MESSAGES = {
+    "invalid_table_name": "The table name is not allowed, see configuration/invalid_table_names.py",
+    "contradicting_curated_dbt_type": "Contradicting values for 'curated_dbt_type'",
+    "missing_unique_key": f"There is not at least one column tagged as '{ColumnTypes.unique_key.value}' in the input \
+data.",
+    "missing_updated_date": f"There is not at least one column tagged as '{ColumnTypes.updated_date.value}' in the \
+input data.",
+    "duplicate_column": "Duplicate rows for column(s) {columns}",
+}
+
+
+@dataclass(frozen=True)
+class ValidationIssue:
+    table_name: str
+    # One of the rule names in ValidationReport.rules
+    rule: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.table_name}: {self.message}"
+
+
+@dataclass(frozen=True)
+class TableValidation:
+    # Per table outcome of validation, reused when rendering the table instead of re-checking its rows
+    is_scd2: bool
+    unique_key_count: int
+    updated_date_count: int
+    duplicate_columns: list[str]
+
+    @property
+    def is_multi_key(self) -> bool:
+        return self.unique_key_count > 1
+
+    @property
+    def is_multi_date(self) -> bool:
+        return self.updated_date_count > 1
+
+
+class ValidationReport:
+    # Every rule, in the order issues are reported for a table
+    rules = [
+        "invalid_table_name",
+        "contradicting_curated_dbt_type",
+        "missing_unique_key",
+        "missing_updated_date",
+        "duplicate_column",
+    ]
+
+    def __init__(
+        self, tables: dict[str, TableValidation], issues: list[ValidationIssue]
+    ):
+        self.tables = tables
+        self.issues = issues
+
+    def __bool__(self) -> bool:
+        # True when there is nothing to report
+        return not self.issues
+
+    def issues_for(self, rule: str) -> list[ValidationIssue]:
+        return [issue for issue in self.issues if issue.rule == rule]
+
+    def summary(self) -> str:
+        counts = {rule: len(self.issues_for(rule)) for rule in self.rules}
+        return ", ".join(f"{count} {rule}" for rule, count in counts.items() if count)
+
+    def raise_for_errors(self) -> None:
+        if not self.issues:
+            return
+        exc = f"The input metadata failed validation ({self.summary()}):\n" + "\n".join(
+            f"  {issue}" for issue in self.issues
+        )
+        log.warning(exc)
+        raise ValueError(exc)
+
+
+def check_required_columns(
+    df: "pd.DataFrame", required_columns: list[str] = REQUIRED_COLUMNS
+) -> None:
+    """
+    Check the whole input has every column the generator needs, once, before it is split by table.
+    :param df: pd.DataFrame; the input metadata.
+    :param required_columns: list[str]; the columns that must be present. Throws a KeyError if any are missing.
+    """
+    check_columns(columns=list(df.columns), required_columns=required_columns)
+
+
+def check_columns(
+    columns: list[str], required_columns: list[str] = REQUIRED_COLUMNS
+) -> None:
+    # As check_required_columns, for the header of input read without pandas
+    missing = [column for column in required_columns if column not in columns]
+    if missing:
+        exc = f"The input metadata does not contain all of the needed columns, missing {missing}. Expected \
+{METADATA_COLUMNS}"
+        log.warning(exc)
+        raise KeyError(exc)
+
+
+def _build_report(
+    table_names: list[Any],
+    failures: dict[str, list[int]],
+    is_scd2: list[bool],
+    unique_key_counts: list[int],
+    updated_date_counts: list[int],
+    duplicate_columns: list[list[str]],
+) -> ValidationReport:
+    # The report from the positions of the tables failing each rule, ordered by table and then rule
+    issues: list[tuple[int, int, ValidationIssue]] = []
+    for rule_position, rule in enumerate(ValidationReport.rules):
+        for position in failures[rule]:
+            issues.append(
+                (
+                    position,
+                    rule_position,
+                    ValidationIssue(
+                        table_name=table_names[position],
+                        rule=rule,
+                        message=RULE_MESSAGES[rule].format(
+                            columns=duplicate_columns[position]
+                        ),
+                    ),
+                )
+            )
+    issues.sort(key=lambda issue: issue[:2])
+
+    tables = {
+        table_name: TableValidation(
+            is_scd2=scd2,
+            unique_key_count=unique_key_count,
+            updated_date_count=updated_date_count,
+            duplicate_columns=duplicates,
+        )
+        for table_name, scd2, unique_key_count, updated_date_count, duplicates in zip(
+            table_names,
+            is_scd2,
+            unique_key_counts,
+            updated_date_counts,
+            duplicate_columns,
+        )
+    }
+    return ValidationReport(tables=tables, issues=[issue for _, _, issue in issues])
+
+
+def validate_tables(
+    table_names: list[Any],
+    sorted_frame: "pd.DataFrame",
+    sorted_codes: "np.ndarray",
+    distinct_curated_dbt_types: list[list[Any]],
+    invalid_names: Iterable[str] = invalid_table_names,
+) -> ValidationReport:
+    """
+    Run every validation rule once over the whole input, grouped by table.
+    :param table_names: list; the tables, in the order they first appear in the input.
+    :param sorted_frame: pd.DataFrame; the input rows, grouped so each table's rows are contiguous.
+    :param sorted_codes: np.ndarray; the position in table_names of each row of sorted_frame.
+    :param distinct_curated_dbt_types: list[list]; the distinct curated_dbt_type values of each table.
+    :param invalid_names: Iterable[str]; table names that are not allowed.
+    :return: ValidationReport; the per table results and every issue found.
+    """
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+
+    table_count = len(table_names)
+    column_types = sorted_frame["column_type"].to_numpy()
+    unique_key_counts = np.bincount(
+        sorted_codes[column_types == ColumnTypes.unique_key.value],
+        minlength=table_count,
+    )
+    updated_date_counts = np.bincount(
+        sorted_codes[column_types == ColumnTypes.updated_date.value],
+        minlength=table_count,
+    )
+    curated_dbt_type_counts = np.fromiter(
+        map(len, distinct_curated_dbt_types), dtype=np.int64, count=table_count
+    )
+    is_scd2 = np.fromiter(
+        (types == [CuratedDBTType.scd2.value] for types in distinct_curated_dbt_types),
+        dtype=bool,
+        count=table_count,
+    )
+    invalid_name_set = frozenset(invalid_names)
+    is_invalid_name = np.fromiter(
+        (table_name in invalid_name_set for table_name in table_names),
+        dtype=bool,
+        count=table_count,
+    )
+
+    # Rows repeating a column name already seen in the same table
+    duplicated = pd.DataFrame(
+        {"code": sorted_codes, "column_name": sorted_frame["column_name"].to_numpy()}
+    ).duplicated()
+    duplicate_columns: list[list[str]] = [[] for _ in range(table_count)]
+    for code, column_name in zip(
+        sorted_codes[duplicated.to_numpy()].tolist(),
+        sorted_frame["column_name"].to_numpy()[duplicated.to_numpy()].tolist(),
+    ):
+        if column_name not in duplicate_columns[code]:
+            duplicate_columns[code].append(column_name)
+
+    failures = {
+        "invalid_table_name": is_invalid_name,
+        "contradicting_curated_dbt_type": curated_dbt_type_counts > 1,
+        "missing_unique_key": is_scd2 & (unique_key_counts < 1),
+        "missing_updated_date": is_scd2 & (updated_date_counts < 1),
+        "duplicate_column": np.fromiter(
+            map(bool, duplicate_columns), dtype=bool, count=table_count
+        ),
+    }
+    report = _build_report(
+        table_names=table_names,
+        failures={
+            rule: np.flatnonzero(failed).tolist() for rule, failed in failures.items()
+        },
+        is_scd2=is_scd2.tolist(),
+        unique_key_counts=unique_key_counts.tolist(),
+        updated_date_counts=updated_date_counts.tolist(),
+        duplicate_columns=duplicate_columns,
+    )
+    log.debug(
+        "Validated %s rows across %s tables, found %s issues.",
+        len(sorted_frame),
+        table_count,
+        len(report.issues),
+    )
+    return report
+
+
+def validate_grouped_rows(
+    table_names: list[Any],
+    column_names: list[list[Any]],
+    column_types: list[list[Any]],
+    distinct_curated_dbt_types: list[list[Any]],
+    invalid_names: Iterable[str] = invalid_table_names,
+) -> ValidationReport:
+    """
+    The equivalent of validate_tables for input read without pandas, with each table's rows held in plain lists.
+    :param table_names: list; the tables, in the order they first appear in the input.
+    :param column_names: list[list]; the column_name of each row of each table.
+    :param column_types: list[list]; the column_type of each row of each table.
+    :param distinct_curated_dbt_types: list[list]; the distinct curated_dbt_type values of each table.
+    :param invalid_names: Iterable[str]; table names that are not allowed.
+    :return: ValidationReport; the same report validate_tables gives for the same rows.
+    """
+    unique_key_counts = [
+        types.count(ColumnTypes.unique_key.value) for types in column_types
+    ]
+    updated_date_counts = [
+        types.count(ColumnTypes.updated_date.value) for types in column_types
+    ]
+    is_scd2 = [
+        types == [CuratedDBTType.scd2.value] for types in distinct_curated_dbt_types
+    ]
+    invalid_name_set = frozenset(invalid_names)
+
+    duplicate_columns: list[list[str]] = []
+    for names in column_names:
+        seen: set[Any] = set()
+        duplicates: dict[Any, None] = {}
+        for column_name in names:
+            if column_name in seen:
+                duplicates[column_name] = None
+            seen.add(column_name)
+        duplicate_columns.append(list(duplicates))
+
+    checks: dict[str, Sequence[bool]] = {
+        "invalid_table_name": [
+            table_name in invalid_name_set for table_name in table_names
+        ],
+        "contradicting_curated_dbt_type": [
+            len(types) > 1 for types in distinct_curated_dbt_types
+        ],
+        "missing_unique_key": [
+            scd2 and count < 1 for scd2, count in zip(is_scd2, unique_key_counts)
+        ],
+        "missing_updated_date": [
+            scd2 and count < 1 for scd2, count in zip(is_scd2, updated_date_counts)
+        ],
+        "duplicate_column": [bool(duplicates) for duplicates in duplicate_columns],
+    }
+    report = _build_report(
+        table_names=table_names,
+        failures={
+            rule: [position for position, failed in enumerate(check) if failed]
+            for rule, check in checks.items()
+        },
+        is_scd2=is_scd2,
+        unique_key_counts=unique_key_counts,
+        updated_date_counts=updated_date_counts,
+        duplicate_columns=duplicate_columns,
+    )
+    log.debug(
+        "Validated %s rows across %s tables, found %s issues.",
+        sum(map(len, column_names)),
+        len(table_names),
+        len(report.issues),
+    )
+    return report
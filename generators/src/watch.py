@@ -0,0 +1,93 @@
+import os
+import time
+from typing import Callable, Optional
+
+from src.logger import log
+
+# A file's modification time and size, or None while it does not exist
+FileSignature = Optional[tuple[int, int]]
+
+
+def file_signature(filepath: str) -> FileSignature:
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class InputWatcher:
+    """
+    Polls files on the local disk for changes. Polling only costs a stat of each file, and works the same on every
+    platform and for files on network shares or mounted into a container, where change notifications often never
+    arrive.
+    """
+
+    def __init__(self, filepaths: list[str], interval: float = 0.2):
+        """
+        :param filepaths: list[str]; the files to watch.
+        :param interval: float; seconds between polls.
+        """
+        self.filepaths = filepaths
+        self.interval = interval
+        self._signatures = self._poll()
+
+    def _poll(self) -> list[FileSignature]:
+        return [file_signature(filepath) for filepath in self.filepaths]
+
+    def wait_for_change(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until any of the files changes, and then until it has stopped changing, so that a file still being saved
+        by an editor is not read half written.
+        :param timeout: float; give up after this many seconds. Waits indefinitely by default.
+        :return: bool; True when a file changed, False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval)
+            signatures = self._poll()
+            if signatures != self._signatures:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        while True:
+            time.sleep(self.interval / 4)
+            settled = self._poll()
+            if settled == signatures:
+                break
+            signatures = settled
+        self._signatures = signatures
+        return True
+
+
+def watch(
+    run: Callable[[], None],
+    watcher: InputWatcher,
+    max_runs: Optional[int] = None,
+) -> int:
+    """
+    Call run now, then again every time the watched files change, until interrupted with Ctrl+C. A failed run, e.g.
+    from invalid metadata saved part way through an edit, is logged and waits for the next change.
+    :param run: Callable[[], None]; the work to repeat.
+    :param watcher: InputWatcher; the files to watch.
+    :param max_runs: int; stop after this many runs. Runs until interrupted by default.
+    :return: int; the number of runs.
+    """
+    runs = 0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                run()
+            except Exception as exc:
+                log.error("Run failed, waiting for the next change: %s", exc)
+            else:
+                log.info("Run done in %.3fs", time.perf_counter() - started)
+            runs += 1
+            if max_runs is not None and runs >= max_runs:
+                return runs
+            log.info("Watching %s for changes", ", ".join(watcher.filepaths))
+            watcher.wait_for_change()
+    except KeyboardInterrupt:
+        log.info("Stopped watching after %s runs", runs)
+    return runs
@@ -0,0 +1,107 @@
+import argparse
+import json
+
+from src.logger import log
+from src.synthetic_catalog import (
+    OUTPUT_FORMATS,
+    WIDTH_DISTRIBUTIONS,
+    CatalogSpec,
+    generate_catalog,
+    write_catalog,
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic metadata catalog to load test the ADP generator."
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        required=True,
+        help="Required. Path of the catalog file to write.",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default="csv",
+        choices=OUTPUT_FORMATS,
+        help="Optional. Format of the catalog file.",
+    )
+    parser.add_argument(
+        "--tables",
+        type=int,
+        required=True,
+        help="Required. Number of tables in the catalog.",
+    )
+    parser.add_argument(
+        "--min-columns",
+        type=int,
+        default=5,
+        help="Optional. Fewest columns in a table. At least 4.",
+    )
+    parser.add_argument(
+        "--max-columns",
+        type=int,
+        default=50,
+        help="Optional. Most columns in a table.",
+    )
+    parser.add_argument(
+        "--width-distribution",
+        type=str,
+        default="uniform",
+        choices=WIDTH_DISTRIBUTIONS,
+        help="""
+            Optional. How table widths are spread between --min-columns and --max-columns. 'lognormal' gives mostly
+            narrow tables with a long tail of wide ones.
+            """,
+    )
+    parser.add_argument(
+        "--multi-key-ratio",
+        type=float,
+        default=0.0,
+        help="Optional. Fraction of tables with a composite unique key.",
+    )
+    parser.add_argument(
+        "--multi-updated-date-ratio",
+        type=float,
+        default=0.0,
+        help="Optional. Fraction of tables with several updated date columns.",
+    )
+    parser.add_argument(
+        "--scd2-ratio",
+        type=float,
+        default=1.0,
+        help="Optional. Fraction of tables curated as scd2.",
+    )
+    parser.add_argument(
+        "--data-types",
+        type=json.loads,
+        default=None,
+        help="""
+            Optional. JSON object of data type to relative weight for the ordinary columns, e.g.
+            '{"VARCHAR(255)": 3, "NUMBER(38,0)": 1}'.
+            """,
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Optional. Random seed, the same seed always gives the same catalog.",
+    )
+    args = parser.parse_args()
+
+    spec = CatalogSpec(
+        table_count=args.tables,
+        min_columns=args.min_columns,
+        max_columns=args.max_columns,
+        width_distribution=args.width_distribution,
+        multi_key_ratio=args.multi_key_ratio,
+        multi_updated_date_ratio=args.multi_updated_date_ratio,
+        scd2_ratio=args.scd2_ratio,
+        seed=args.seed,
+        **({"data_types": args.data_types} if args.data_types else {}),
+    )
+    catalog = generate_catalog(spec)
+    log.info("Generated %s rows for %s tables.", len(catalog), args.tables)
+    write_catalog(catalog=catalog, filepath=args.output, output_format=args.format)
@@ -47,3 +47,6 @@ CREATE TABLE IF NOT EXISTS {curated_database}.{curated_schema}.{table_name}
     TRACKING_HASH VARCHAR,{multi_key}{multi_updated_date}
 {columns}
 ) ;"""
+
+# One line of the {columns} block of CURATED_DDL, rendered per column
+CURATED_DDL_COLUMN = "    {column_name} {source_data_type}"
@@ -88,3 +88,8 @@ SELECT
 FROM
     {{{{stream(ref('{raw_model_name}'),'str_{table_name}')}}}}) a
 """
+
+# One line of the {columns} block of CURATED_MODEL, rendered per column
+CURATED_MODEL_COLUMN = (
+    "    cast(FILECONTENTS:{column_name} as {source_data_type}) as {column_name}"
+)
@@ -1,4 +1,6 @@
-SOURCE_YAML_TABLE = {
+from typing import Any
+
+SOURCE_YAML_TABLE: dict[str, Any] = {
     "name": "",
     "description": "",
     "columns": [
@@ -1,13 +1,78 @@
+from pathlib import Path
+from typing import Any, Iterable
+
 import pytest
-from src.adapters.filesystems import LocalFilesystem
+
+import adp_generator
+from src.adapters.filesystems import InMemoryFilesystem, LocalFilesystem
 from tests.mocks.mock_filesystem import PatchedLocalFilesystem
 
+ASSET_INPUT = "./tests/assets/master/asset_input.csv"
+# Arguments of adp_generator.master for every run over the asset input, or copies of it
+MASTER_ARGUMENTS = dict(
+    action="generate_all_objects",
+    database="ALLIANT_PPL_PROD",
+    schema="DBO",
+    source_short_name="aln",
+    output_folder="./tests/assets/temp_output",
+)
+
+
+class AssetCatalog:
+    # An input file of copies of the asset input's table, each under a name of its own, for master to be run over
+    def __init__(self, input_file: Path):
+        self.input_file = input_file
+        self.header, *self.rows = LocalFilesystem().read_file(ASSET_INPUT).splitlines()
+
+    def table_rows(
+        self, table_names: Iterable[str], interleaved: bool = False
+    ) -> list[str]:
+        # The rows of every table in turn, or interleaved so a table's rows are only contiguous once sorted
+        table_names = list(table_names)
+        if interleaved:
+            return [
+                row.replace("C_STATUS", name)
+                for row in self.rows
+                for name in table_names
+            ]
+        return [
+            row.replace("C_STATUS", name) for name in table_names for row in self.rows
+        ]
+
+    def write(self, rows: list[str]) -> None:
+        self.input_file.write_text("\n".join([self.header, *rows]))
+
+    def arguments(self, **overrides: Any) -> dict[str, Any]:
+        return {
+            **MASTER_ARGUMENTS,
+            "input_file": self.input_file.as_posix(),
+            **overrides,
+        }
+
+    def run(self, **master_kwargs: Any) -> dict[str, str]:
+        # Run master over the input, returning the files written, in the order they were written
+        filesystem = PatchedLocalFilesystem()
+        adp_generator.master(
+            **self.arguments(**master_kwargs), local_filesystem=filesystem
+        )
+        return filesystem._written_files
+
 
 @pytest.fixture()
 def local_filesystem() -> LocalFilesystem:
     return LocalFilesystem()
 
 
+@pytest.fixture()
+def in_memory_filesystem() -> InMemoryFilesystem:
+    return InMemoryFilesystem()
+
+
 @pytest.fixture()
 def patched_local_filesystem() -> PatchedLocalFilesystem:
     return PatchedLocalFilesystem()
+
+
+@pytest.fixture()
+def asset_catalog(tmp_path) -> AssetCatalog:
+    return AssetCatalog(input_file=tmp_path / "input.csv")
@@ -1,10 +1,14 @@
-from src.adapters.filesystems import LocalFilesystem
+import io
+from typing import IO, Union, cast
+
+from src.adapters.filesystems import InMemoryWriteBuffer, LocalFilesystem
 from src.logger import log
 
 
 class PatchedLocalFilesystem(LocalFilesystem):
     # Patched version of the local filesystem that will write to memory rather than disk
     def __init__(self):
+        super().__init__()
         self._written_files = {}
         self.real_local_filesystem = LocalFilesystem()
 
@@ -12,6 +16,50 @@ class PatchedLocalFilesystem(LocalFilesystem):
         log.debug(f"TEST: Writing file '{filepath}' to memory")
         self._written_files[filepath] = content
 
+    def write_files(self, files: dict[str, str]) -> None:
+        # Written one at a time so that the order of _written_files is predictable
+        for filepath, content in files.items():
+            self.write_file(filepath=filepath, content=content)
+
+    def open_file(self, filepath: str, mode: str = "r") -> IO:
+        if "r" in mode:
+            if filepath in self._written_files.keys():
+                return io.StringIO(self._written_files[filepath])
+            return self.real_local_filesystem.open_file(filepath=filepath, mode=mode)
+        # Files streamed out are kept in memory too, once closed
+        log.debug(f"TEST: Streaming file '{filepath}' to memory")
+        return cast(
+            IO,
+            InMemoryWriteBuffer(
+                on_close=lambda content: self._store(
+                    filepath=filepath, content=content
+                ),
+                binary="b" in mode,
+                initial=b"" if "b" in mode else "",
+            ),
+        )
+
+    def _store(self, filepath: str, content: Union[str, bytes]) -> None:
+        self.write_file(
+            filepath=filepath,
+            content=content.decode() if isinstance(content, bytes) else content,
+        )
+
+    def delete_file(self, filepath: str) -> None:
+        if filepath in self._written_files:
+            del self._written_files[filepath]
+            return
+        self.real_local_filesystem.delete_file(filepath)
+
+    def move_file(self, source_filepath: str, target_filepath: str) -> None:
+        if source_filepath in self._written_files:
+            self.write_file(
+                filepath=target_filepath,
+                content=self._written_files.pop(source_filepath),
+            )
+            return
+        self.real_local_filesystem.move_file(source_filepath, target_filepath)
+
     # Note this may fail if the requested path is a different to when it was written
     # (e.g. written as a relative path, then requested back via an absolute path}
     def read_file(self, filepath: str) -> str:
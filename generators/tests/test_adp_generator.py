@@ -1,5 +1,22 @@
 import adp_generator
+import pandas as pd  # type: ignore
 import pytest
+from src.adapters.filesystems import LocalFilesystem
+from src import tracing
+from src.profiling import GenerationProfile
+from templates import source_yamls
+from tests.mocks.mock_filesystem import PatchedLocalFilesystem
+
+
+class RecordingLocalFilesystem(LocalFilesystem):
+    # Local filesystem that remembers which paths were written to
+    def __init__(self):
+        super().__init__()
+        self.written = []
+
+    def write_file(self, filepath: str, content: str) -> None:
+        self.written.append(filepath)
+        super().write_file(filepath=filepath, content=content)
 
 
 class TestADPGenerator:
@@ -104,39 +121,277 @@ class TestADPGenerator:
         assert expected_ddl_raw_aln == generated_ddl_raw_aln
         assert expected_ddl_temp_raw_aln == generated_ddl_temp_raw_aln
 
-    def test_check_for_invalid_table_names(self):
-        input_name_list = ["table_one", "table_two", "bad_name"]
-        invalid_list = ["bad_name"]
-        with pytest.raises(
-            ValueError,
-            match=r"Input table list contains invalid table names: \['bad_name'\]",
-        ):
-            adp_generator.check_for_invalid_table_names(
-                table_names=input_name_list, invalid_names=invalid_list
+    def test_master_incremental(self, tmp_path, asset_catalog):
+        rows = asset_catalog.table_rows(["C_STATUS", "C_OTHER"])
+        asset_catalog.write(rows)
+        output_folder = (tmp_path / "output").as_posix()
+
+        def run():
+            filesystem = RecordingLocalFilesystem()
+            adp_generator.master(
+                **asset_catalog.arguments(
+                    output_folder=output_folder, incremental=True
+                ),
+                local_filesystem=filesystem,
+            )
+            return filesystem.written
+
+        first_run = run()
+        assert f"{output_folder}/output_ddl/curated/c_status.sql" in first_run
+        assert f"{output_folder}/output_ddl/curated/c_other.sql" in first_run
+        cur_yaml = tmp_path / "output/output_dbt/cur_model_yaml/cur_aln_dbo.yml"
+        expected_cur_yaml = cur_yaml.read_text()
+
+        # Nothing changed, so only the combined YAML files and the manifest are written
+        second_run = run()
+        assert not any(filepath.endswith(".sql") for filepath in second_run)
+        assert cur_yaml.read_text() == expected_cur_yaml
+
+        # Only the table whose metadata changed is regenerated
+        asset_catalog.write(
+            [
+                row.replace("C_OTHER called DESCR", "C_OTHER called DESCRIPTION")
+                for row in rows
+            ]
+        )
+        third_run = run()
+        assert f"{output_folder}/output_ddl/curated/c_other.sql" in third_run
+        assert f"{output_folder}/output_ddl/curated/c_status.sql" not in third_run
+        assert "C_OTHER called DESCRIPTION" in cur_yaml.read_text()
+
+    @pytest.mark.parametrize("chunksize", [None, 4])
+    def test_failed_run_keeps_model_yaml(self, tmp_path, asset_catalog, chunksize):
+        tables = asset_catalog.table_rows(f"C_STATUS_{index}" for index in range(3))
+        output_folder = tmp_path / "output"
+
+        def run():
+            adp_generator.master(
+                **asset_catalog.arguments(
+                    output_folder=output_folder.as_posix(), chunksize=chunksize
+                ),
+                local_filesystem=LocalFilesystem(),
+            )
+
+        asset_catalog.write(tables)
+        run()
+        yaml_files = sorted(output_folder.rglob("*.yml"))
+        assert len(yaml_files) == 2
+        expected = [path.read_bytes() for path in yaml_files]
+
+        # The last table contradicts itself, so the run fails, with --chunksize after the first tables are rendered
+        tables[-1] = tables[-1].replace(",scd2,", ",other,")
+        asset_catalog.write(tables)
+        with pytest.raises(ValueError):
+            run()
+        assert sorted(output_folder.rglob("*.yml")) == yaml_files
+        assert [path.read_bytes() for path in yaml_files] == expected
+        assert not list(output_folder.rglob("*.tmp"))
+
+    def test_master_workers_match_serial_run(self, asset_catalog):
+        asset_catalog.write(
+            asset_catalog.table_rows(f"C_STATUS_{index}" for index in range(5))
+        )
+        serial = asset_catalog.run(workers=1)
+        parallel = asset_catalog.run(workers=2)
+        assert list(parallel) == list(serial)
+        assert parallel == serial
+        # Rendering leaves the shared templates as they were
+        assert source_yamls.SOURCE_YAML_TABLE["name"] == ""
+
+    def test_master_small_csv_matches_pandas_read(self, asset_catalog, monkeypatch):
+        asset_catalog.write(
+            asset_catalog.table_rows(f"C_STATUS_{index}" for index in range(3))
+        )
+        assert adp_generator.read_small_csv(
+            filesystem=LocalFilesystem(), filepath=asset_catalog.input_file.as_posix()
+        )
+
+        small_csv = asset_catalog.run()
+        monkeypatch.setattr(adp_generator, "read_small_csv", lambda **kwargs: None)
+        pandas_read = asset_catalog.run()
+        assert list(small_csv) == list(pandas_read)
+        assert small_csv == pandas_read
+
+    @pytest.mark.parametrize("presorted", [True, False])
+    def test_master_streamed_input_matches_full_read(self, asset_catalog, presorted):
+        # interleave the rows of three tables, so that they're only contiguous once sorted
+        tables = asset_catalog.table_rows(
+            (f"C_STATUS_{index}" for index in range(3)), interleaved=True
+        )
+        if presorted:
+            tables.sort(key=lambda row: row.split(",")[0])
+        asset_catalog.write(tables)
+
+        full_read = asset_catalog.run(chunksize=None, presorted=presorted)
+        streamed = asset_catalog.run(chunksize=4, presorted=presorted)
+        assert list(streamed) == list(full_read)
+        assert streamed == full_read
+
+    @pytest.mark.parametrize("input_format", ["parquet", "arrow"])
+    @pytest.mark.parametrize("chunksize", [None, 4])
+    def test_master_columnar_input_matches_csv(self, tmp_path, input_format, chunksize):
+        asset_csv = "./tests/assets/master/asset_input.csv"
+        csv = pd.read_csv(asset_csv)
+        input_file = tmp_path / f"input.{input_format}"
+        if input_format == "parquet":
+            csv.to_parquet(input_file)
+        else:
+            csv.to_feather(input_file)
+
+        def run(input_file, chunksize) -> dict[str, str]:
+            filesystem = PatchedLocalFilesystem()
+            adp_generator.master(
+                action="generate_all_objects",
+                database="ALLIANT_PPL_PROD",
+                schema="DBO",
+                source_short_name="aln",
+                input_file=input_file,
+                output_folder="./tests/assets/temp_output",
+                local_filesystem=filesystem,
+                chunksize=chunksize,
             )
+            return filesystem._written_files
 
-        input_name_list = [
-            "table_one",
-            "bad_one",
-            "table_two",
-            "bad_two",
-            "table_three",
-        ]
-        invalid_list = ["bad_one", "bad_two"]
-        with pytest.raises(
-            ValueError,
-            match=r"Input table list contains invalid table names: \['bad_one', 'bad_two'\]",
-        ):
-            adp_generator.check_for_invalid_table_names(
-                table_names=input_name_list, invalid_names=invalid_list
+        assert run(input_file.as_posix(), chunksize) == run(asset_csv, None)
+
+    @pytest.mark.parametrize("yaml_shard_size", [1, 2])
+    def test_master_sharded_yaml(self, asset_catalog, yaml_shard_size):
+        asset_catalog.write(
+            asset_catalog.table_rows(f"C_STATUS_{index}" for index in range(3))
+        )
+        output_folder = "./tests/assets/temp_output"
+
+        single = asset_catalog.run(yaml_shard_size=None)
+        sharded = asset_catalog.run(yaml_shard_size=yaml_shard_size)
+        for kind, model_folder in [("cur", "cur_models"), ("raw", "raw_models")]:
+            single_yaml = single[
+                f"{output_folder}/output_dbt/{kind}_model_yaml/{kind}_aln_dbo.yml"
+            ]
+            shards = [
+                content
+                for filepath, content in sharded.items()
+                if filepath.startswith(f"{output_folder}/output_dbt/{model_folder}/")
+                and filepath.endswith(".yml")
+            ]
+            if yaml_shard_size == 1:
+                assert (
+                    f"{output_folder}/output_dbt/{model_folder}/{kind}_aln_dbo_c_status_0.yml"
+                    in sharded
+                )
+            assert len(shards) == (3 if yaml_shard_size == 1 else 2)
+            # the shards hold the same models, in the same order, as the single file
+            header = "version: 2\nmodels:\n"
+            assert all(shard.startswith(header) for shard in shards)
+            assert (
+                header + "".join(shard[len(header) :] for shard in shards)
+                == single_yaml
             )
+        # and there is no single file
+        assert not any("_model_yaml/" in filepath for filepath in sharded)
+
+    @pytest.mark.parametrize("yaml_shard_size", [None, 2])
+    def test_generate_artefacts_matches_master(self, asset_catalog, yaml_shard_size):
+        asset_catalog.write(
+            asset_catalog.table_rows(f"C_STATUS_{index}" for index in range(3))
+        )
+        arguments = asset_catalog.arguments(yaml_shard_size=yaml_shard_size)
+        written = asset_catalog.run(yaml_shard_size=yaml_shard_size)
+
+        filesystem = PatchedLocalFilesystem()
+        artefacts = adp_generator.generate_artefacts(
+            **arguments, local_filesystem=filesystem
+        )
+        # Lazily, table by table
+        first = next(artefacts)
+        assert first.path.endswith("/temp_c_status_0.sql")
+        streamed = [first, *artefacts]
+        assert dict(streamed) == written
+        assert len(streamed) == len(written)
+        # Nothing is written by the stream itself
+        assert filesystem._written_files == {}
+        if yaml_shard_size is None:
+            assert [path for path, _ in streamed[-2:]] == [
+                "./tests/assets/temp_output/output_dbt/raw_model_yaml/raw_aln_dbo.yml",
+                "./tests/assets/temp_output/output_dbt/cur_model_yaml/cur_aln_dbo.yml",
+            ]
 
-        input_name_list = [
-            "table_one",
-            "table_two",
-            "table_three",
-        ]
-        invalid_list = ["bad_one", "bad_two"]
-        adp_generator.check_for_invalid_table_names(
-            table_names=input_name_list, invalid_names=invalid_list
+    def test_master_profile(self, tmp_path):
+        profile = GenerationProfile()
+        adp_generator.master(
+            action="generate_all_objects",
+            database="ALLIANT_PPL_PROD",
+            schema="DBO",
+            source_short_name="aln",
+            input_file="./tests/assets/master/asset_input.csv",
+            output_folder="./tests/assets/temp_output",
+            local_filesystem=PatchedLocalFilesystem(),
+            profile=profile,
         )
+        report = profile.report(top_n=5)
+        assert report["table_count"] == 1
+        assert set(report["stages"]) == {
+            "read",
+            "parse",
+            "index",
+            "validation",
+            "column_blocks",
+            "temp_raw_ddl",
+            "raw_ddl",
+            "raw_model",
+            "curated_model",
+            "curated_ddl",
+            "yaml_entries",
+            "write_files",
+            "yaml",
+        }
+        assert report["slowest_tables"][0]["table_name"] == "C_STATUS"
+        assert report["wall_seconds"] >= report["slowest_tables"][0]["wall_seconds"]
+
+    def test_master_reports_every_validation_error(self, tmp_path):
+        input_file = tmp_path / "input.csv"
+        input_file.write_text(
+            "table_name,table_description,curated_dbt_type,column_name,column_description,source_data_type,"
+            "column_type,column_tests\n"
+            "TABLES,d,scd2,id,d,VARCHAR,unique_key,\n"
+            "TABLES,d,scd2,updated,d,DATE,updated_date,\n"
+            "NO_KEY,d,scd2,updated,d,DATE,updated_date,\n"
+        )
+        with pytest.raises(ValueError) as exc_info:
+            adp_generator.master(
+                action="generate_all_objects",
+                database="ALLIANT_PPL_PROD",
+                schema="DBO",
+                source_short_name="aln",
+                input_file=input_file.as_posix(),
+                output_folder=(tmp_path / "output").as_posix(),
+                local_filesystem=PatchedLocalFilesystem(),
+            )
+        assert "TABLES: The table name is not allowed" in str(exc_info.value)
+        assert "NO_KEY: There is not at least one column tagged as 'unique_key'" in str(
+            exc_info.value
+        )
+
+    def test_master_trace(self):
+        tracer = tracing.start_tracing()
+        try:
+            adp_generator.master(
+                action="generate_all_objects",
+                database="ALLIANT_PPL_PROD",
+                schema="DBO",
+                source_short_name="aln",
+                input_file="./tests/assets/master/asset_input.csv",
+                output_folder="./tests/assets/temp_output",
+                local_filesystem=PatchedLocalFilesystem(),
+            )
+        finally:
+            tracing.stop_tracing()
+        names = [event["name"] for event in tracer.events]
+        assert names.count("table") == 1
+        for name in [
+            "render_table",
+            "TempRawDDLGenerator.run",
+            "RawDDLGenerator.run",
+            "CuratedDDLGenerator.run",
+            "PatchedLocalFilesystem.write_file",
+        ]:
+            assert name in names
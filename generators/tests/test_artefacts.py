@@ -0,0 +1,49 @@
+import io
+import json
+
+import pytest
+
+from src.artefacts import Artefact, write_artefacts, write_ndjson
+from tests.mocks.mock_filesystem import PatchedLocalFilesystem
+
+ARTEFACTS = [
+    Artefact(path=f"out/{index}.sql", content=str(index)) for index in range(5)
+]
+
+
+class BatchRecordingFilesystem(PatchedLocalFilesystem):
+    # Remembers the size of each batch handed to write_files
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def write_files(self, files: dict[str, str]) -> None:
+        self.batches.append(len(files))
+        super().write_files(files=files)
+
+
+class TestArtefacts:
+    def test_write_artefacts(self):
+        filesystem = BatchRecordingFilesystem()
+        assert (
+            write_artefacts(iter(ARTEFACTS), filesystem=filesystem, batch_size=2) == 5
+        )
+        assert filesystem.batches == [2, 2, 1]
+        assert filesystem._written_files == dict(ARTEFACTS)
+
+    def test_write_artefacts_failed_stream(self):
+        def artefacts():
+            yield from ARTEFACTS[:3]
+            raise ValueError("Invalid metadata")
+
+        filesystem = BatchRecordingFilesystem()
+        with pytest.raises(ValueError):
+            write_artefacts(artefacts(), filesystem=filesystem, batch_size=2)
+        # The artefacts taken before the failure are still written
+        assert filesystem._written_files == dict(ARTEFACTS[:3])
+
+    def test_write_ndjson(self):
+        stream = io.StringIO()
+        assert write_ndjson(iter(ARTEFACTS), stream=stream) == 5
+        lines = stream.getvalue().splitlines()
+        assert [Artefact(**json.loads(line)) for line in lines] == ARTEFACTS
@@ -0,0 +1,48 @@
+import json
+
+from benchmarks.run_benchmarks import measure_start_up, run_benchmarks
+from src.synthetic_catalog import METADATA_COLUMNS, build_catalog
+
+
+class TestBenchmarks:
+    def test_build_catalog(self):
+        catalog = build_catalog(table_count=3, columns_per_table=4)
+        assert list(catalog.columns) == METADATA_COLUMNS
+        assert len(catalog) == 12
+        assert catalog["table_name"].unique().tolist() == [
+            "TABLE_000000",
+            "TABLE_000001",
+            "TABLE_000002",
+        ]
+        assert catalog["column_type"].tolist()[:4] == [
+            "unique_key",
+            "updated_date",
+            None,
+            None,
+        ]
+
+    def test_run_benchmarks(self):
+        report = run_benchmarks(sizes=[(3, 4)], repeat=1)
+        # The report must be plain JSON
+        report = json.loads(json.dumps(report))
+        (scenario,) = report["scenarios"]
+        assert scenario["rows"] == 12
+        assert set(scenario["stages"]) == {
+            "read_csv",
+            "metadata_index",
+            "temp_raw_ddl",
+            "raw_ddl",
+            "curated_ddl",
+            "master",
+        }
+        for stage in scenario["stages"].values():
+            assert stage["seconds"] >= 0
+            assert stage["peak_memory_bytes"] > 0
+        assert report["start_up"]["heavy_modules"] == []
+
+    def test_measure_start_up(self):
+        start_up = measure_start_up(table_count=3, columns_per_table=4)
+        # A small run reads its input with the csv module, so must never import pandas or numpy
+        assert start_up["heavy_modules"] == []
+        assert 0 < start_up["import_seconds"] < start_up["process_seconds"]
+        assert start_up["run_seconds"] > 0
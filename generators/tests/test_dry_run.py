@@ -0,0 +1,54 @@
+import adp_generator
+from src.adapters.filesystems import InMemoryFilesystem, LocalFilesystem
+from src.dry_run import compare_output
+
+
+def _render(output_folder: str) -> InMemoryFilesystem:
+    filesystem = InMemoryFilesystem()
+    input_file = "./tests/assets/master/asset_input.csv"
+    filesystem.write_file(
+        filepath=input_file, content=LocalFilesystem().read_file(filepath=input_file)
+    )
+    adp_generator.master(
+        action="generate_all_objects",
+        database="ALLIANT_PPL_PROD",
+        schema="DBO",
+        source_short_name="aln",
+        input_file=input_file,
+        output_folder=output_folder,
+        local_filesystem=filesystem,
+    )
+    return filesystem
+
+
+class TestDryRun:
+    def test_compare_output(self, tmp_path, local_filesystem: LocalFilesystem):
+        output_folder = tmp_path.as_posix()
+        rendered = _render(output_folder=output_folder)
+
+        # nothing exists yet, so every file would be created
+        report = compare_output(
+            rendered=rendered, target=local_filesystem, output_folder=output_folder
+        )
+        assert report.has_changes
+        assert report.changed == [] and report.unchanged == []
+        assert f"{output_folder}/output_ddl/raw/c_status.sql" in report.created
+        assert list(tmp_path.iterdir()) == []
+
+        for filepath in report.created:
+            local_filesystem.write_file(
+                filepath=filepath, content=rendered.read_file(filepath=filepath)
+            )
+        report = compare_output(
+            rendered=rendered, target=local_filesystem, output_folder=output_folder
+        )
+        assert not report.has_changes
+        assert len(report.unchanged) == len(list(rendered.walk_files(output_folder)))
+
+        changed_filepath = f"{output_folder}/output_ddl/curated/c_status.sql"
+        local_filesystem.write_file(filepath=changed_filepath, content="drop table")
+        report = compare_output(
+            rendered=rendered, target=local_filesystem, output_folder=output_folder
+        )
+        assert report.changed == [changed_filepath]
+        assert f"changed: {changed_filepath}" in list(report.lines())
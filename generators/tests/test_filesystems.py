@@ -83,6 +83,25 @@ class TestLocalFilesystem:
                 f"{self.asset_location}/some_path_that_doesnt_exist/"
             )
 
+    def test_open_file(self, local_filesystem: LocalFilesystem):
+        with local_filesystem.open_file(f"{self.asset_location}/test.sql") as file:
+            assert file.readline() == "SELECT * FROM SOME_TABLE;\n"
+
+        with pytest.raises(TypeError):
+            local_filesystem.open_file(f"{self.asset_location}/dir_b/")
+
+        with pytest.raises(KeyError):
+            local_filesystem.open_file(
+                f"{self.asset_location}/some_path_that_doesnt_exist/"
+            )
+
+        full_path = f"{self.make_asset_location}/streamed/delete.me"
+        with local_filesystem.open_file(filepath=full_path, mode="w") as file:
+            file.write("test information")
+        assert local_filesystem.read_file(filepath=full_path) == "test information"
+        local_filesystem.delete_file(filepath=full_path)
+        os.rmdir(f"{self.make_asset_location}/streamed")
+
     def test_is_directory(self, local_filesystem: LocalFilesystem):
         assert local_filesystem.is_directory(f"{self.asset_location}/") is True
         assert local_filesystem.is_directory(f"{self.asset_location}/test.sql") is False
@@ -200,6 +219,68 @@ class TestLocalFilesystem:
                 "Failed to properly clean up test. Delete the file at '{full_path}'."
             )
 
+    def test_write_file_only_write_changed(self, tmp_path):
+        filesystem = LocalFilesystem(only_write_changed=True)
+        full_path = (tmp_path / "nested" / "write.me").as_posix()
+
+        filesystem.write_file(filepath=full_path, content="test information")
+        assert filesystem.skipped_writes == 0
+        os.utime(full_path, (0, 0))
+
+        # identical content leaves the file, and its modification time, alone
+        filesystem.write_file(filepath=full_path, content="test information")
+        assert filesystem.skipped_writes == 1
+        assert os.stat(full_path).st_mtime == 0
+
+        # same size but different content is still written
+        filesystem.write_file(filepath=full_path, content="test informatioN")
+        assert filesystem.skipped_writes == 1
+        assert filesystem.read_file(filepath=full_path) == "test informatioN"
+
+        filesystem.write_file(filepath=full_path, content="different length")
+        assert filesystem.skipped_writes == 1
+        assert filesystem.read_file(filepath=full_path) == "different length"
+
+    def test_file_matches(self, tmp_path, local_filesystem: LocalFilesystem):
+        full_path = (tmp_path / "match.me").as_posix()
+        assert not local_filesystem.file_matches(filepath=full_path, content="")
+        local_filesystem.write_file(filepath=full_path, content="line\nline\n")
+        assert local_filesystem.file_matches(filepath=full_path, content="line\nline\n")
+        assert not local_filesystem.file_matches(
+            filepath=full_path, content="line\nlinE\n"
+        )
+        assert not local_filesystem.file_matches(filepath=full_path, content="line\n")
+
+    def test_write_files(self, tmp_path, local_filesystem: LocalFilesystem):
+        files = {
+            (tmp_path / f"dir_{index % 3}" / f"file_{index}.sql").as_posix(): str(index)
+            for index in range(20)
+        }
+        local_filesystem.write_files(files=files)
+        for filepath, content in files.items():
+            assert local_filesystem.read_file(filepath=filepath) == content
+
+        # a directory removed after it was first created is created again
+        for filepath in local_filesystem.list_files((tmp_path / "dir_0").as_posix()):
+            local_filesystem.delete_file((tmp_path / "dir_0" / filepath).as_posix())
+        os.rmdir(tmp_path / "dir_0")
+        local_filesystem.write_files(files=files)
+        assert local_filesystem.read_file(filepath=next(iter(files))) == "0"
+
+        with pytest.raises(TypeError):
+            local_filesystem.write_files(
+                files={**files, (tmp_path / "dir_0").as_posix() + "/": ""}
+            )
+
+    def test_move_file(self, local_filesystem, tmp_path):
+        source = (tmp_path / "models.yml.tmp").as_posix()
+        target = (tmp_path / "models.yml").as_posix()
+        local_filesystem.write_file(filepath=target, content="old")
+        local_filesystem.write_file(filepath=source, content="new")
+        local_filesystem.move_file(source_filepath=source, target_filepath=target)
+        assert local_filesystem.read_file(filepath=target) == "new"
+        assert local_filesystem.path_exists(path=source) is False
+
     def test_delete_file(self, local_filesystem):
         full_path = f"{self.make_asset_location}/make.me"
         if not local_filesystem.path_exists(path=full_path):
@@ -0,0 +1,156 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from src.adapters.filesystems import InMemoryFilesystem
+
+
+class TestInMemoryFilesystem:
+    @pytest.fixture()
+    def populated_filesystem(
+        self, in_memory_filesystem: InMemoryFilesystem
+    ) -> InMemoryFilesystem:
+        in_memory_filesystem.write_file("output/test.sql", "select 1")
+        in_memory_filesystem.write_file("output/dir_a/foo.bar", "foo")
+        in_memory_filesystem.write_file("output/dir_a/bar.foo", "bar")
+        in_memory_filesystem.write_file("output/dir_b/.dotfile", "")
+        in_memory_filesystem.write_file("output/dir_b/file.with.complex.type", "x")
+        return in_memory_filesystem
+
+    def test_listing(self, populated_filesystem: InMemoryFilesystem):
+        assert populated_filesystem.list_files("output/") == ["test.sql"]
+        assert populated_filesystem.list_files("output/dir_a/") == [
+            "bar.foo",
+            "foo.bar",
+        ]
+        assert populated_filesystem.list_folders("output/") == ["dir_a/", "dir_b/"]
+        assert populated_filesystem.list_contents("output") == [
+            "dir_a/",
+            "dir_b/",
+            "test.sql",
+        ]
+
+        with pytest.raises(TypeError):
+            populated_filesystem.list_files("output/test.sql")
+
+        with pytest.raises(KeyError):
+            populated_filesystem.list_folders("output/some_path_that_doesnt_exist/")
+
+    def test_paths(self, populated_filesystem: InMemoryFilesystem):
+        assert populated_filesystem.path_exists("output/dir_a")
+        assert populated_filesystem.path_exists("/output/dir_a/../test.sql")
+        assert not populated_filesystem.path_exists("output/missing.sql")
+        assert populated_filesystem.is_directory("output/dir_b/")
+        assert not populated_filesystem.is_directory("output/test.sql")
+        assert populated_filesystem.absolute_path("output/./dir_a") == "/output/dir_a"
+        assert populated_filesystem.path_parent("output/dir_a/foo.bar") == (
+            "/output/dir_a"
+        )
+        assert populated_filesystem.filename_stem("output/dir_b/.dotfile") == (
+            ".dotfile"
+        )
+        assert populated_filesystem.filename_stem("a/file.with.complex.type") == "file"
+        assert populated_filesystem.filename_extension("a/file.tar.gz") == ".tar.gz"
+
+        with pytest.raises(TypeError):
+            populated_filesystem.filename("output/dir_a/")
+
+        with pytest.raises(KeyError):
+            populated_filesystem.is_directory("output/missing/")
+
+    def test_read_write_delete(self, in_memory_filesystem: InMemoryFilesystem):
+        in_memory_filesystem.write_file("a/b.sql", "first")
+        in_memory_filesystem.write_file("/a/b.sql", "second")
+        assert in_memory_filesystem.read_file("a/b.sql") == "second"
+
+        with in_memory_filesystem.open_file("a/c.sql", mode="w") as file:
+            file.write("written via open_file")
+        assert in_memory_filesystem.open_file("a/c.sql").read() == (
+            "written via open_file"
+        )
+
+        in_memory_filesystem.delete_file("a/b.sql")
+        assert not in_memory_filesystem.path_exists("a/b.sql")
+
+        with pytest.raises(KeyError):
+            in_memory_filesystem.read_file("a/b.sql")
+
+        with pytest.raises(TypeError):
+            in_memory_filesystem.read_file("a")
+
+        with pytest.raises(TypeError):
+            in_memory_filesystem.write_file("a", "a folder")
+
+        with pytest.raises(TypeError):
+            in_memory_filesystem.write_file("a/d.sql", b"not a string")  # type: ignore
+
+    def test_move_file(self, in_memory_filesystem: InMemoryFilesystem):
+        in_memory_filesystem.write_file("a/b.sql", "old")
+        with in_memory_filesystem.open_file("a/b.sql.tmp", mode="w") as file:
+            file.write("new")
+        in_memory_filesystem.move_file("a/b.sql.tmp", "a/b.sql")
+        assert in_memory_filesystem.read_file("a/b.sql") == "new"
+        assert in_memory_filesystem.list_files("a") == ["b.sql"]
+
+        in_memory_filesystem.move_file("a/b.sql", "c/d.sql")
+        assert in_memory_filesystem.list_folders("/") == ["a/", "c/"]
+        with pytest.raises(KeyError):
+            in_memory_filesystem.move_file("a/b.sql", "c/d.sql")
+
+    def test_only_write_changed(self):
+        in_memory_filesystem = InMemoryFilesystem(only_write_changed=True)
+        in_memory_filesystem.write_files({"a.sql": "a", "b.sql": "b"})
+        in_memory_filesystem.write_files({"a.sql": "a", "b.sql": "changed"})
+        assert in_memory_filesystem.skipped_writes == 1
+        assert in_memory_filesystem.read_file("b.sql") == "changed"
+
+    @pytest.mark.parametrize("archive_format", ["tar", "tar.gz", "zip", "bundle"])
+    def test_export_archive(
+        self, populated_filesystem: InMemoryFilesystem, archive_format: str
+    ):
+        target = InMemoryFilesystem()
+        size = populated_filesystem.export_archive(
+            target_filepath="snapshot",
+            folderpath="output",
+            archive_format=archive_format,
+            target_filesystem=target,
+        )
+        content = target.open_file("snapshot", mode="rb").read()
+        assert len(content) == size
+
+        expected = dict(populated_filesystem.walk_files("output"))
+        assert sorted(expected) == [
+            "dir_a/bar.foo",
+            "dir_a/foo.bar",
+            "dir_b/.dotfile",
+            "dir_b/file.with.complex.type",
+            "test.sql",
+        ]
+        if archive_format == "zip":
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                exported = {
+                    name: archive.read(name).decode() for name in archive.namelist()
+                }
+        elif archive_format == "bundle":
+            exported = {}
+            remaining = content
+            while remaining:
+                header, remaining = remaining.split(b"\n", 1)
+                _, path, length = header.decode().split(" ")
+                exported[path] = remaining[: int(length)].decode()
+                remaining = remaining[int(length) :]
+        else:
+            with tarfile.open(fileobj=io.BytesIO(content)) as archive:
+                exported = {
+                    member.name: archive.extractfile(member).read().decode()  # type: ignore
+                    for member in archive.getmembers()
+                }
+        assert exported == expected
+
+    def test_export_archive_unknown_format(
+        self, populated_filesystem: InMemoryFilesystem
+    ):
+        with pytest.raises(ValueError):
+            populated_filesystem.export_archive("snapshot", archive_format="rar")
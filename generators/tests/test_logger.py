@@ -0,0 +1,68 @@
+import logging
+
+import pytest
+
+from src import logger
+from src.logger import configure_logging, log
+
+
+@pytest.fixture()
+def restore_logging():
+    yield
+    configure_logging(level="DEBUG", use_queue=False)
+
+
+class TestLogger:
+    def test_configure_logging_writes_through_the_queue(
+        self, tmp_path, restore_logging
+    ):
+        log_file = tmp_path / "generator.log"
+        configure_logging(level="info", log_file=log_file.as_posix())
+        assert log.level == logging.INFO
+        assert logger._listener is not None
+
+        log.debug("not written %s", "at info")
+        log.info("written %s", "lazily")
+        # stopping the background thread writes out whatever is still queued
+        logger._stop_listener()
+        content = log_file.read_text()
+        assert "written lazily" in content
+        assert "not written" not in content
+
+    def test_configure_logging_quiet(self, restore_logging):
+        configure_logging(level="DEBUG", quiet=True)
+        assert log.level == logging.WARNING
+        assert not log.isEnabledFor(logging.DEBUG)
+
+    def test_configure_logging_from_environment(self, monkeypatch, restore_logging):
+        monkeypatch.setenv(logger.LOG_LEVEL_ENV_VAR, "ERROR")
+        configure_logging(use_queue=False)
+        assert log.level == logging.ERROR
+        assert logger.console_handler in log.handlers
+        assert logger._listener is None
+
+    def test_configure_logging_unknown_level(self, monkeypatch, restore_logging):
+        monkeypatch.setenv(logger.LOG_LEVEL_ENV_VAR, "VERBOSE")
+        configure_logging(use_queue=False)
+        assert log.level == logging.DEBUG
+
+    def test_queued_message_formatted_when_logged(self, tmp_path, restore_logging):
+        log_file = tmp_path / "generator.log"
+        configure_logging(level="INFO", log_file=log_file.as_posix())
+        tables = ["TABLE_A"]
+        log.info("Rendering %s", tables)
+        # changed before the background thread gets to the record
+        tables.append("TABLE_B")
+        logger._stop_listener()
+        assert "Rendering ['TABLE_A']\n" in log_file.read_text()
+
+    def test_configure_logging_keeps_other_handlers(self, restore_logging):
+        other_handler = logging.NullHandler()
+        log.addHandler(other_handler)
+        try:
+            configure_logging(level="INFO")
+            configure_logging(level="INFO", use_queue=False)
+            assert other_handler in log.handlers
+            assert log.handlers.count(logger.console_handler) == 1
+        finally:
+            log.removeHandler(other_handler)
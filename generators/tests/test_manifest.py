@@ -0,0 +1,147 @@
+from src.adapters.filesystems import LocalFilesystem
+from src.manifest import (
+    GenerationManifest,
+    MANIFEST_FILENAME,
+    table_fingerprints,
+    template_fingerprint,
+)
+from src.model_yaml import RenderedEntryCache
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+
+def _fingerprint(df: pd.DataFrame, context: str, template_hash: str) -> str:
+    # The fingerprint of a frame holding a single table
+    (fingerprint,) = table_fingerprints(
+        frame=df,
+        offsets=np.array([0, len(df)]),
+        context=context,
+        template_hash=template_hash,
+    )
+    return fingerprint
+
+
+class TestTableFingerprints:
+    def test_fingerprint_only_changes_with_content(self):
+        template_hash = template_fingerprint()
+        df = pd.DataFrame(
+            data={"column_name": ["column_a", "column_b"], "column_type": ["", ""]}
+        )
+        same = df.copy()
+        different = df.copy()
+        different.loc[1, "column_type"] = "unique_key"
+
+        fingerprint = _fingerprint(df, context="ctx", template_hash=template_hash)
+        assert fingerprint == _fingerprint(
+            same, context="ctx", template_hash=template_hash
+        )
+        assert fingerprint != _fingerprint(
+            different, context="ctx", template_hash=template_hash
+        )
+        assert fingerprint != _fingerprint(
+            df, context="other_ctx", template_hash=template_hash
+        )
+        assert fingerprint != _fingerprint(
+            df, context="ctx", template_hash="other_templates"
+        )
+
+
+class TestGenerationManifest:
+    def test_round_trip(self, tmp_path, local_filesystem: LocalFilesystem):
+        output_folder = tmp_path.as_posix()
+        generated_file = f"{output_folder}/table_a.sql"
+        local_filesystem.write_file(filepath=generated_file, content="SELECT 1;")
+
+        manifest = GenerationManifest.load(
+            filesystem=local_filesystem, output_folder=output_folder
+        )
+        assert not manifest.is_unchanged(
+            table_name="TABLE_A", fingerprint="abc", filesystem=local_filesystem
+        )
+        manifest.record(
+            table_name="TABLE_A",
+            fingerprint="abc",
+            files=[generated_file],
+            raw_model={"name": "raw_table_a"},
+            cur_model={"name": "cur_table_a"},
+        )
+        manifest.save(filesystem=local_filesystem, output_folder=output_folder)
+        assert (tmp_path / MANIFEST_FILENAME).exists()
+
+        reloaded = GenerationManifest.load(
+            filesystem=local_filesystem, output_folder=output_folder
+        )
+        assert reloaded.is_unchanged(
+            table_name="TABLE_A", fingerprint="abc", filesystem=local_filesystem
+        )
+        assert not reloaded.is_unchanged(
+            table_name="TABLE_A", fingerprint="def", filesystem=local_filesystem
+        )
+        assert reloaded.carry_forward(table_name="TABLE_A")["cur_model"] == {
+            "name": "cur_table_a"
+        }
+
+        # A removed output means the table has to be generated again
+        local_filesystem.delete_file(filepath=generated_file)
+        assert not reloaded.is_unchanged(
+            table_name="TABLE_A", fingerprint="abc", filesystem=local_filesystem
+        )
+
+    def test_next_run(self, tmp_path, local_filesystem: LocalFilesystem):
+        generated_file = (tmp_path / "table_a.sql").as_posix()
+        local_filesystem.write_file(filepath=generated_file, content="SELECT 1;")
+        entry_cache = RenderedEntryCache()
+        manifest = GenerationManifest(
+            tables={
+                "TABLE_A": {
+                    "fingerprint": "abc",
+                    "files": [generated_file],
+                    "raw_model": {"name": "raw_table_a"},
+                    "cur_model": {"name": "cur_table_a"},
+                }
+            },
+            entry_cache=entry_cache,
+        )
+        entry_cache.render(manifest.carry_forward(table_name="TABLE_A")["raw_model"])
+        entry_cache.render({"name": "raw_table_b"})
+        manifest.record(
+            table_name="TABLE_B",
+            fingerprint="def",
+            files=[],
+            raw_model={"name": "raw_table_b"},
+            cur_model={"name": "cur_table_b"},
+        )
+
+        # as if saved and loaded again, keeping the rendered YAML of the models still in the manifest
+        next_run = manifest.next_run()
+        assert next_run.entry_cache is entry_cache
+        assert len(entry_cache) == 1
+        for table_name, fingerprint in [("TABLE_A", "abc"), ("TABLE_B", "def")]:
+            assert next_run.is_unchanged(
+                table_name=table_name,
+                fingerprint=fingerprint,
+                filesystem=local_filesystem,
+            )
+
+        # after a failed run, the tables of the run before are kept
+        failed = GenerationManifest(tables={"TABLE_A": {"fingerprint": "abc"}})
+        failed.record(
+            table_name="TABLE_B",
+            fingerprint="def",
+            files=[],
+            raw_model={},
+            cur_model={},
+        )
+        assert failed.next_run().carry_forward(table_name="TABLE_B")["files"] == []
+        assert failed.next_run(completed=False).carry_forward(table_name="TABLE_A")
+
+    def test_invalid_manifest_is_ignored(
+        self, tmp_path, local_filesystem: LocalFilesystem
+    ):
+        (tmp_path / MANIFEST_FILENAME).write_text("not json")
+        manifest = GenerationManifest.load(
+            filesystem=local_filesystem, output_folder=tmp_path.as_posix()
+        )
+        assert not manifest.is_unchanged(
+            table_name="TABLE_A", fingerprint="abc", filesystem=local_filesystem
+        )
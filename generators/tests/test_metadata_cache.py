@@ -0,0 +1,89 @@
+import os
+import shutil
+
+import pandas as pd  # type: ignore
+import pytest
+
+from src import metadata_cache
+from src.metadata_cache import parse_cache_path, read_prepared_metadata
+from src.metadata_input import add_ddl_column_def, read_metadata
+
+ASSET_INPUT = "./tests/assets/master/asset_input.csv"
+
+
+@pytest.fixture()
+def input_file(tmp_path, monkeypatch) -> str:
+    # The asset input is far smaller than an input worth caching
+    monkeypatch.setattr(metadata_cache, "PARSE_CACHE_MIN_BYTES", 0)
+    filepath = str(tmp_path / "input.csv")
+    shutil.copy(ASSET_INPUT, filepath)
+    return filepath
+
+
+def _fail_to_parse(monkeypatch) -> None:
+    def read_metadata(**kwargs):
+        raise AssertionError("Parsed the input rather than reading the cache")
+
+    monkeypatch.setattr(metadata_cache, "read_metadata", read_metadata)
+
+
+class TestParseCache:
+    def test_round_trip(self, local_filesystem, input_file, monkeypatch):
+        df = read_prepared_metadata(filesystem=local_filesystem, filepath=input_file)
+        assert os.path.exists(parse_cache_path(input_file))
+        expected = add_ddl_column_def(
+            read_metadata(filesystem=local_filesystem, filepath=input_file)
+        )
+        pd.testing.assert_frame_equal(df, expected)
+
+        _fail_to_parse(monkeypatch)
+        cached = read_prepared_metadata(
+            filesystem=local_filesystem, filepath=input_file
+        )
+        pd.testing.assert_frame_equal(cached, expected)
+
+    def test_changed_input(self, local_filesystem, input_file):
+        read_prepared_metadata(filesystem=local_filesystem, filepath=input_file)
+        # Same size and modification time, different content
+        stat = os.stat(input_file)
+        with open(input_file, encoding="utf-8") as file:
+            content = file.read()
+        with open(input_file, "w", encoding="utf-8") as file:
+            file.write(content.replace("C_STATUS", "X_STATUS", 1))
+        os.utime(input_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        df = read_prepared_metadata(filesystem=local_filesystem, filepath=input_file)
+        assert "X_STATUS" in set(df["table_name"])
+
+    def test_changed_generator(self, local_filesystem, input_file, monkeypatch):
+        read_prepared_metadata(filesystem=local_filesystem, filepath=input_file)
+        monkeypatch.setattr(metadata_cache, "generator_version", lambda: "other")
+        parsed = []
+        monkeypatch.setattr(
+            metadata_cache,
+            "read_metadata",
+            lambda **kwargs: parsed.append(kwargs) or read_metadata(**kwargs),
+        )
+        read_prepared_metadata(filesystem=local_filesystem, filepath=input_file)
+        assert len(parsed) == 1
+
+    def test_corrupt_cache(self, local_filesystem, input_file):
+        with open(parse_cache_path(input_file), "wb") as file:
+            file.write(b"not arrow")
+        df = read_prepared_metadata(filesystem=local_filesystem, filepath=input_file)
+        assert len(df)
+        # Replaced with a cache that can be read
+        key = metadata_cache.input_key(input_file)
+        cached = metadata_cache.load_parse_cache(parse_cache_path(input_file), key)
+        pd.testing.assert_frame_equal(cached, df)
+
+    def test_not_cached(self, local_filesystem, in_memory_filesystem, input_file):
+        read_prepared_metadata(
+            filesystem=local_filesystem, filepath=input_file, use_cache=False
+        )
+        assert not os.path.exists(parse_cache_path(input_file))
+
+        with open(input_file, encoding="utf-8") as file:
+            in_memory_filesystem.write_file(filepath="input.csv", content=file.read())
+        read_prepared_metadata(filesystem=in_memory_filesystem, filepath="input.csv")
+        assert in_memory_filesystem.list_files(".") == ["input.csv"]
@@ -0,0 +1,122 @@
+from src.ddl_generators import CuratedDDLGenerator
+from src.manifest import table_fingerprints
+from src.metadata_index import MetadataIndex
+from src.metadata_rows import ColumnSpec
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+import pytest
+
+
+def _metadata_df() -> pd.DataFrame:
+    # TABLE_B is deliberately split in two to check that the index groups rows that aren't contiguous
+    return pd.DataFrame(
+        data={
+            "table_name": ["TABLE_B", "TABLE_A", "TABLE_B", "TABLE_A", "TABLE_B"],
+            "table_description": ["desc b", "desc a", "desc b", "desc a", "desc b"],
+            "curated_dbt_type": ["scd2", "scd2", "scd2", "other", "scd2"],
+            "column_name": ["b_1", "a_1", "b_2", "a_2", "b_3"],
+            "source_data_type": ["VARCHAR(1)"] * 5,
+            "column_type": [
+                "unique_key",
+                "unique_key",
+                "unique_key",
+                "updated_date",
+                "updated_date",
+            ],
+        }
+    )
+
+
+class TestMetadataIndex:
+    def test_tables_keep_first_seen_order(self):
+        index = MetadataIndex(_metadata_df())
+        assert index.table_names == ["TABLE_B", "TABLE_A"]
+        assert len(index) == 2
+        assert [table.table_name for table in index.tables()] == [
+            "TABLE_B",
+            "TABLE_A",
+        ]
+
+    def test_table_matches_filtered_frame(self):
+        df = _metadata_df()
+        index = MetadataIndex(df)
+        for table_name in ["TABLE_A", "TABLE_B"]:
+            expected = df[df["table_name"] == table_name]
+            pd.testing.assert_frame_equal(index.table_frame(table_name), expected)
+
+    def test_fingerprints_only_depend_on_own_rows(self):
+        index = MetadataIndex(_metadata_df())
+        fingerprints = index.fingerprints(context="ctx", template_hash="templates")
+        for table in index.tables():
+            table_frame = index.table_frame(table.table_name)
+            assert [fingerprints[table.table_name]] == table_fingerprints(
+                frame=table_frame,
+                offsets=np.array([0, len(table_frame)]),
+                context="ctx",
+                template_hash="templates",
+            )
+
+    def test_table_attributes(self):
+        index = MetadataIndex(_metadata_df())
+
+        table_b = index.table("TABLE_B")
+        assert table_b.description == "desc b"
+        assert table_b.curated_dbt_type == "scd2"
+        assert table_b.curated_dbt_types == ("scd2",)
+        assert table_b.unique_keys == ("b_1", "b_2")
+        assert table_b.updated_dates == ("b_3",)
+        assert [column.name for column in table_b.columns] == ["b_1", "b_2", "b_3"]
+        # Optional columns missing from the input are NaN
+        assert table_b.columns[0].tests != table_b.columns[0].tests
+
+        table_a = index.table("TABLE_A")
+        assert table_a.curated_dbt_types == ("scd2", "other")
+        assert table_a.unique_keys == ("a_1",)
+        assert table_a.updated_dates == ("a_2",)
+        column = table_a.columns[1]
+        assert isinstance(column, ColumnSpec)
+        assert (column.name, column.source_data_type, column.column_type) == (
+            "a_2",
+            "VARCHAR(1)",
+            "updated_date",
+        )
+        with pytest.raises(AttributeError):
+            table_a.unique_keys = ("a_2",)
+
+    def test_column_blocks(self):
+        index = MetadataIndex(_metadata_df())
+        table_a = index.table("TABLE_A")
+        assert table_a.ddl_columns_block == "    A_1 VARCHAR(1),\n    A_2 VARCHAR(1)"
+        assert table_a.model_columns_block == (
+            "    cast(FILECONTENTS:a_1 as VARCHAR(1)) as a_1,\n"
+            "    cast(FILECONTENTS:a_2 as VARCHAR(1)) as a_2"
+        )
+        assert index.table("TABLE_B").ddl_columns_block == (
+            "    B_1 VARCHAR(1),\n    B_2 VARCHAR(1),\n    B_3 VARCHAR(1)"
+        )
+
+    def test_curated_ddl_from_index_matches_dataframe(self):
+        df = _metadata_df()
+        index = MetadataIndex(df)
+        table_b = index.table("TABLE_B")
+        assert CuratedDDLGenerator.run(
+            curated_database="db",
+            curated_schema="schema",
+            table_name="TABLE_B",
+            table_metadata=table_b,
+        ) == CuratedDDLGenerator.run(
+            curated_database="db",
+            curated_schema="schema",
+            table_name="TABLE_B",
+            column_df=df[df["table_name"] == "TABLE_B"],
+        )
+
+        with pytest.raises(
+            ValueError, match=r"Contradicting values for 'curated_dbt_type'"
+        ):
+            CuratedDDLGenerator.run(
+                curated_database="db",
+                curated_schema="schema",
+                table_name="TABLE_A",
+                table_metadata=index.table("TABLE_A"),
+            )
@@ -0,0 +1,93 @@
+import io
+
+import pandas as pd  # type: ignore
+import pyarrow  # type: ignore
+import pyarrow.ipc  # type: ignore
+import pyarrow.parquet  # type: ignore
+import pytest
+
+from src.adapters.filesystems import InMemoryFilesystem
+from src.input_data_values import METADATA_COLUMNS
+from src.metadata_input import (
+    DICTIONARY_COLUMNS,
+    infer_input_format,
+    read_metadata,
+    read_metadata_chunks,
+)
+
+
+class TestMetadataInput:
+    csv = (
+        "table_name,table_description,curated_dbt_type,column_name,column_description,source_data_type,"
+        "column_type,column_tests,unused\n"
+        'T1,table one,scd2,id,the id,"NUMBER(38,0)",unique_key,"unique,not_null",x\n'
+        "T1,table one,scd2,updated,the date,DATE,updated_date,,x\n"
+        "T2,table two,scd2,id,the id,VARCHAR(10),unique_key,unique,x\n"
+    )
+
+    @pytest.fixture()
+    def filesystem(self) -> InMemoryFilesystem:
+        filesystem = InMemoryFilesystem()
+        filesystem.write_file("input/metadata.csv", self.csv)
+        table = pyarrow.Table.from_pandas(
+            pd.read_csv(io.StringIO(self.csv), dtype=str), preserve_index=False
+        )
+        with filesystem.open_file("input/metadata.parquet", mode="wb") as output:
+            pyarrow.parquet.write_table(table, output)
+        with filesystem.open_file("input/metadata.arrow", mode="wb") as output:
+            with pyarrow.ipc.new_file(output, table.schema) as writer:
+                writer.write_table(table, max_chunksize=2)
+        with filesystem.open_file("input/metadata.ipc", mode="wb") as output:
+            with pyarrow.ipc.new_stream(output, table.schema) as writer:
+                writer.write_table(table)
+        return filesystem
+
+    @pytest.mark.parametrize(
+        "filepath, expected",
+        [
+            ("a/b.csv", "csv"),
+            ("a/b.PARQUET", "parquet"),
+            ("b.pq", "parquet"),
+            ("b.feather", "arrow"),
+            ("b.arrow", "arrow"),
+        ],
+    )
+    def test_infer_input_format(self, filepath, expected):
+        assert infer_input_format(filepath) == expected
+
+    def test_infer_input_format_unknown(self):
+        with pytest.raises(ValueError):
+            infer_input_format("metadata.xlsx")
+
+    @pytest.mark.parametrize(
+        "filepath",
+        ["input/metadata.parquet", "input/metadata.arrow", "input/metadata.ipc"],
+    )
+    def test_read_metadata(self, filesystem, filepath):
+        df = read_metadata(filesystem=filesystem, filepath=filepath)
+        # Projected down to the columns the generator uses
+        assert list(df.columns) == METADATA_COLUMNS
+        for name in DICTIONARY_COLUMNS:
+            assert df[name].dtype == "category"
+
+        csv = read_metadata(filesystem=filesystem, filepath="input/metadata.csv")
+        pd.testing.assert_frame_equal(
+            df.astype(object), csv[METADATA_COLUMNS].astype(object)
+        )
+
+    @pytest.mark.parametrize("input_format", ["csv", "parquet", "arrow"])
+    def test_read_metadata_chunks(self, filesystem, input_format):
+        filepath = f"input/metadata.{input_format}"
+        mode = "r" if input_format == "csv" else "rb"
+        with filesystem.open_file(filepath, mode=mode) as input_stream:
+            chunks = list(
+                read_metadata_chunks(
+                    input_stream=input_stream, chunksize=2, input_format=input_format
+                )
+            )
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert pd.concat(chunks)["column_tests"].isna().tolist() == [
+            False,
+            True,
+            False,
+        ]
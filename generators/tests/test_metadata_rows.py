@@ -0,0 +1,138 @@
+import io
+import math
+
+import pandas as pd  # type: ignore
+import pytest
+
+from src.metadata_index import MetadataIndex
+from src.metadata_rows import ColumnSpec, RowIndex, classify_columns, read_small_csv
+
+HEADER = (
+    "table_name,table_description,curated_dbt_type,column_name,column_description,source_data_type,column_type,"
+    "column_tests"
+)
+ROWS = [
+    'TABLE_B,desc b,scd2,b_1,"b, first",VARCHAR(1),unique_key,"unique,not_null"',
+    "TABLE_A,,scd2,a_1,NA,VARCHAR(1),unique_key,",
+    "TABLE_B,desc b,scd2,b_2,b second,VARCHAR(1),unique_key,",
+    "TABLE_A,desc a,other,a_2,a second,date,updated_date,NULL",
+    "TABLE_B,desc b,scd2,b_2,b again,VARCHAR(1),updated_date,",
+    "TABLES,d,scd2,id,d,VARCHAR,,",
+]
+
+
+def _write_csv(filesystem, rows=ROWS) -> str:
+    filesystem.write_file(filepath="input.csv", content="\n".join([HEADER, *rows]))
+    return "input.csv"
+
+
+def _same(left, right) -> bool:
+    # NaN never equals itself
+    return left == right or (
+        isinstance(left, float)
+        and isinstance(right, float)
+        and math.isnan(left)
+        and math.isnan(right)
+    )
+
+
+class TestReadSmallCsv:
+    def test_values_match_pandas(self, in_memory_filesystem):
+        filepath = _write_csv(in_memory_filesystem)
+        header, rows = read_small_csv(
+            filesystem=in_memory_filesystem, filepath=filepath
+        )
+        df = pd.read_csv(io.StringIO(in_memory_filesystem.read_file(filepath)))
+        assert header == list(df.columns)
+        assert len(rows) == len(df)
+        for row, expected in zip(rows, df.itertuples(index=False)):
+            assert all(_same(value, other) for value, other in zip(row, expected))
+
+    @pytest.mark.parametrize(
+        "rows",
+        [
+            # numbers or bools, which pandas could read as such
+            [ROWS[0].replace("desc b", "1")],
+            [ROWS[0].replace("b_1", "true")],
+            # a missing value where it isn't allowed
+            [ROWS[0].replace("VARCHAR(1)", "")],
+            # a row of a different length
+            [ROWS[0] + ","],
+        ],
+    )
+    def test_left_to_pandas(self, in_memory_filesystem, rows):
+        filepath = _write_csv(in_memory_filesystem, rows=rows)
+        assert (
+            read_small_csv(filesystem=in_memory_filesystem, filepath=filepath) is None
+        )
+
+    def test_too_large(self, in_memory_filesystem):
+        filepath = _write_csv(in_memory_filesystem)
+        assert (
+            read_small_csv(
+                filesystem=in_memory_filesystem, filepath=filepath, max_chars=100
+            )
+            is None
+        )
+
+
+class TestRowIndex:
+    def test_matches_metadata_index(self, in_memory_filesystem):
+        filepath = _write_csv(in_memory_filesystem)
+        row_index = RowIndex(
+            *read_small_csv(filesystem=in_memory_filesystem, filepath=filepath)
+        )
+        index = MetadataIndex(
+            pd.read_csv(io.StringIO(in_memory_filesystem.read_file(filepath)))
+        )
+        assert (
+            row_index.table_names
+            == index.table_names
+            == ["TABLE_B", "TABLE_A", "TABLES"]
+        )
+        assert len(row_index) == 3
+        # Every rule fails for at least one table
+        assert len(index.validation.issues) == 5
+        assert row_index.validation.issues == index.validation.issues
+        for table, expected in zip(row_index.tables(), index.tables()):
+            for attribute in [
+                "table_name",
+                "curated_dbt_type",
+                "curated_dbt_types",
+                "unique_keys",
+                "updated_dates",
+                "ddl_columns_block",
+                "model_columns_block",
+                "validation",
+            ]:
+                assert getattr(table, attribute) == getattr(expected, attribute)
+            assert _same(table.description, expected.description)
+            for row, expected_row in zip(table.columns, expected.columns):
+                assert all(
+                    _same(value, other) for value, other in zip(row, expected_row)
+                )
+
+    def test_repeated_text_is_shared(self, in_memory_filesystem):
+        filepath = _write_csv(in_memory_filesystem)
+        row_index = RowIndex(
+            *read_small_csv(filesystem=in_memory_filesystem, filepath=filepath)
+        )
+        table_a, table_b = row_index.table("TABLE_A"), row_index.table("TABLE_B")
+        assert table_a.columns[0].source_data_type == "VARCHAR(1)"
+        assert (
+            table_a.columns[0].source_data_type is table_b.columns[0].source_data_type
+        )
+        assert table_a.columns[0].column_type is table_b.columns[0].column_type
+
+    def test_classify_columns(self):
+        columns = [
+            ColumnSpec("a", "", "DATE", "updated_date", ""),
+            ColumnSpec("b", "", "VARCHAR", "unique_key", ""),
+            ColumnSpec("c", "", "VARCHAR", float("nan"), ""),
+            ColumnSpec("d", "", "VARCHAR", "unique_key", ""),
+        ]
+        assert classify_columns(columns) == (("b", "d"), ("a",))
+
+    def test_missing_columns(self):
+        with pytest.raises(KeyError):
+            RowIndex(columns=["table_name"], rows=[["TABLE_A"]])
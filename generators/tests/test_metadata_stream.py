@@ -0,0 +1,54 @@
+from src.metadata_stream import iter_table_batches
+import io
+import pytest
+
+HEADER = "table_name,column_name\n"
+
+
+def _batches(csv: str, chunksize: int, presorted: bool = True):
+    return list(
+        iter_table_batches(
+            input_stream=io.StringIO(HEADER + csv),
+            chunksize=chunksize,
+            presorted=presorted,
+        )
+    )
+
+
+def _tables_per_batch(batches) -> list[list[str]]:
+    return [batch["table_name"].unique().tolist() for batch in batches]
+
+
+class TestIterTableBatches:
+    sorted_csv = "A,a1\nA,a2\nA,a3\nB,b1\nC,c1\nC,c2\nC,c3\nC,c4\n"
+
+    @pytest.mark.parametrize("chunksize", [1, 2, 3, 5, 100])
+    def test_presorted_batches_only_hold_complete_tables(self, chunksize):
+        batches = _batches(self.sorted_csv, chunksize=chunksize)
+        tables = [name for names in _tables_per_batch(batches) for name in names]
+        assert tables == ["A", "B", "C"]
+        rows = [row for batch in batches for row in batch["column_name"].tolist()]
+        assert rows == ["a1", "a2", "a3", "b1", "c1", "c2", "c3", "c4"]
+
+    def test_presorted_rejects_unsorted_input(self):
+        with pytest.raises(ValueError, match=r"The input is not sorted by table_name"):
+            _batches("A,a1\nB,b1\nA,a2\n", chunksize=2)
+        with pytest.raises(ValueError, match=r"The input is not sorted by table_name"):
+            _batches("A,a1\nB,b1\nA,a2\n", chunksize=10)
+        # The table held back at the end of a chunk comes back after another at the start of the next
+        with pytest.raises(ValueError, match=r"The input is not sorted by table_name"):
+            _batches("A,a1\nA,a2\nB,b1\nA,a3\n", chunksize=2)
+
+    @pytest.mark.parametrize("chunksize", [1, 2, 100])
+    def test_unsorted_input_is_grouped_on_disk(self, chunksize):
+        batches = _batches(
+            "B,b1\nA,a1\nB,b2\nC,c1\nA,a2\n", chunksize=chunksize, presorted=False
+        )
+        tables = [name for names in _tables_per_batch(batches) for name in names]
+        assert tables == ["B", "A", "C"]
+        rows = [row for batch in batches for row in batch["column_name"].tolist()]
+        assert rows == ["b1", "b2", "a1", "a2", "c1"]
+
+    def test_missing_values_are_kept(self):
+        batch = _batches("A,\nA,a2\n", chunksize=1)[0]
+        assert batch["column_name"].isna().tolist() == [True, False]
@@ -0,0 +1,170 @@
+import pytest
+import yaml  # type: ignore
+
+from src.adapters.filesystems import InMemoryFilesystem
+from src.model_yaml import (
+    MyDumper,
+    ModelYamlWriter,
+    RenderedEntryCache,
+    ShardedModelYamlWriter,
+    render_model_entry,
+)
+
+
+def _dump_with_my_dumper(models: list) -> str:
+    return yaml.dump(
+        {"version": 2, "models": models},
+        Dumper=MyDumper,
+        sort_keys=False,
+        default_flow_style=False,
+    )
+
+
+LONG_DESCRIPTION = " ".join(["a fairly long description of a column"] * 6)
+
+MODELS = [
+    {
+        "name": "cur_aln_dbo_c_status",
+        "description": "Alliant source table called C_STATUS",
+        "columns": [
+            {"name": "status_sid", "description": "Column called STATUS_SID"},
+            {
+                "name": "unique_identity",
+                "description": LONG_DESCRIPTION,
+                "tests": ["unique", "not_null"],
+            },
+            {"name": "ROW_IS_CURRENT", "description": "SCD2 standard column"},
+        ],
+    },
+    {
+        "name": "quoted",
+        "description": "key: value # with 'quotes' and \"double quotes\"",
+        "columns": [
+            {"name": "null", "description": None, "tests": ["yes", "a:b"]},
+            {"name": " leading space", "description": "- dash", "tests": []},
+            {"name": "1.5", "description": "trailing space "},
+        ],
+    },
+    # keys after the columns, no columns at all
+    {"name": "no_columns", "description": "", "columns": [], "owner": "x"},
+    {"name": "after", "columns": [{"name": "a"}], "description": LONG_DESCRIPTION},
+    # not of the usual shape, so dumped with MyDumper
+    {"name": "unicode", "description": "café\nline\tbreak", "columns": []},
+    {"name": "nested", "columns": [{"name": "a", "meta": {"pii": True}}]},
+    {"name": "long_test", "columns": [{"name": "a", "tests": [LONG_DESCRIPTION]}]},
+]
+
+
+class TestModelYaml:
+    @pytest.mark.parametrize("model", MODELS)
+    def test_render_model_entry_matches_my_dumper(self, model):
+        expected = _dump_with_my_dumper([model])
+        assert "version: 2\nmodels:\n" + render_model_entry(model) == expected
+
+    @pytest.mark.parametrize("only_write_changed", [False, True])
+    def test_writer(self, only_write_changed):
+        filesystem = InMemoryFilesystem(only_write_changed=only_write_changed)
+        with ModelYamlWriter(
+            filesystem=filesystem, filepath="out/models.yml"
+        ) as writer:
+            for model in MODELS:
+                writer.write(model)
+        assert writer.model_count == len(MODELS)
+        assert filesystem.read_file("out/models.yml") == _dump_with_my_dumper(MODELS)
+
+    @pytest.mark.parametrize("only_write_changed", [False, True])
+    def test_writer_failure_keeps_file(self, only_write_changed):
+        filesystem = InMemoryFilesystem(only_write_changed=only_write_changed)
+        filesystem.write_file(filepath="out/models.yml", content="previous run")
+        with pytest.raises(ValueError):
+            with ModelYamlWriter(
+                filesystem=filesystem, filepath="out/models.yml"
+            ) as writer:
+                writer.write(MODELS[0])
+                raise ValueError("failed part way")
+        assert filesystem.read_file("out/models.yml") == "previous run"
+        # Nothing is left of the file streamed out alongside
+        assert filesystem.list_files("out") == ["models.yml"]
+
+        with pytest.raises(ValueError):
+            with ShardedModelYamlWriter(
+                filesystem=filesystem,
+                folderpath="out",
+                filename_prefix="cur",
+                shard_size=2,
+            ) as sharded:
+                for model in MODELS[:3]:
+                    sharded.write(model)
+                raise ValueError("failed part way")
+        # Only the full shard is written
+        assert filesystem.list_files("out") == ["cur_0000.yml", "models.yml"]
+
+    def test_writer_without_models(self, in_memory_filesystem):
+        with ModelYamlWriter(filesystem=in_memory_filesystem, filepath="models.yml"):
+            pass
+        assert in_memory_filesystem.read_file("models.yml") == _dump_with_my_dumper([])
+
+    def test_writers_without_filesystem(self):
+        with ModelYamlWriter(filesystem=None, filepath="models.yml") as writer:
+            writer.write(MODELS[0])
+            assert writer.take_files() == []
+        assert writer.take_files() == [("models.yml", _dump_with_my_dumper(MODELS[:1]))]
+
+        with ShardedModelYamlWriter(
+            filesystem=None, folderpath="models", filename_prefix="cur", shard_size=2
+        ) as sharded:
+            for model in MODELS[:3]:
+                sharded.write(model)
+            # Each shard is handed out once full, and only once
+            assert [filepath for filepath, _ in sharded.take_files()] == [
+                "models/cur_0000.yml"
+            ]
+            assert sharded.take_files() == []
+        assert sharded.take_files() == [
+            ("models/cur_0001.yml", _dump_with_my_dumper(MODELS[2:3]))
+        ]
+
+    @pytest.mark.parametrize(
+        "shard_size, filenames",
+        [
+            (1, ["cur_aln_dbo_c_status", "quoted", "no_columns", "after", "unicode"]),
+            (2, ["cur_0000", "cur_0001", "cur_0002"]),
+        ],
+    )
+    def test_sharded_writer(self, in_memory_filesystem, shard_size, filenames):
+        with ShardedModelYamlWriter(
+            filesystem=in_memory_filesystem,
+            folderpath="models",
+            filename_prefix="cur",
+            shard_size=shard_size,
+        ) as writer:
+            for model in MODELS[:5]:
+                writer.write(model)
+        assert writer.shard_count == len(filenames)
+        assert in_memory_filesystem.list_files("models") == sorted(
+            f"{filename}.yml" for filename in filenames
+        )
+        # the first shard holds the first shard_size models
+        assert in_memory_filesystem.read_file(
+            f"models/{filenames[0]}.yml"
+        ) == _dump_with_my_dumper(MODELS[:shard_size])
+
+    def test_rendered_entry_cache(self):
+        cache = RenderedEntryCache()
+        model = MODELS[0]
+        assert cache.render(model) == render_model_entry(model)
+        # looked up by identity, not by value
+        assert cache.render(dict(model)) == render_model_entry(model)
+        assert len(cache) == 2
+        cache.retain([model])
+        assert len(cache) == 1
+        assert cache.render(model) == render_model_entry(model)
+
+    def test_sharded_writer_shard_size(self, in_memory_filesystem):
+        with pytest.raises(ValueError):
+            ShardedModelYamlWriter(
+                filesystem=in_memory_filesystem,
+                folderpath="models",
+                filename_prefix="cur",
+                shard_size=0,
+            )
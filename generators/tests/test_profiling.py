@@ -0,0 +1,56 @@
+import time
+
+from src import profiling
+from src.profiling import GenerationProfile, StageTimer
+
+
+class TestProfiling:
+    def test_stage_timer(self):
+        timer = StageTimer()
+        with timer.stage("sleep"):
+            time.sleep(0.01)
+        with timer.stage("sleep"):
+            pass
+        timer.lap("lap")
+        assert timer.stages["sleep"].calls == 2
+        assert timer.stages["sleep"].wall_seconds >= 0.01
+        # the first lap is timed from when the timer was created
+        assert timer.stages["lap"].wall_seconds >= timer.stages["sleep"].wall_seconds
+        assert timer.wall_seconds == sum(
+            timing.wall_seconds for timing in timer.stages.values()
+        )
+
+    def test_disabled_stage_timer(self):
+        timer = StageTimer(enabled=False)
+        with timer.stage("stage"):
+            pass
+        timer.lap("lap")
+        assert timer.stages == {}
+
+    def test_generation_profile(self):
+        profile = GenerationProfile()
+        assert not profiling.is_profiling()
+        with profile.activate():
+            assert profiling.is_profiling()
+            with profiling.stage("read"):
+                pass
+            assert list(profiling.timed_iter(iter([1, 2]), "parse")) == [1, 2]
+            for table_name, seconds in [("A", 0.0), ("B", 0.01), ("A", 0.0)]:
+                timer = StageTimer()
+                with timer.stage("render"):
+                    time.sleep(seconds)
+                profile.add_table(table_name=table_name, timer=timer)
+        assert not profiling.is_profiling()
+        # stages timed outside of a profile aren't recorded anywhere
+        with profiling.stage("ignored"):
+            pass
+
+        report = profile.report(top_n=1)
+        assert report["table_count"] == 2
+        assert report["wall_seconds"] >= 0.01
+        assert report["stages"]["read"]["calls"] == 1
+        # each next() is timed, including the last that finds the iterator exhausted
+        assert report["stages"]["parse"]["calls"] == 3
+        assert report["stages"]["render"]["calls"] == 3
+        assert "ignored" not in report["stages"]
+        assert [table["table_name"] for table in report["slowest_tables"]] == ["B"]
@@ -0,0 +1,150 @@
+import os
+import tempfile
+import threading
+
+import pytest
+
+import adp_generator
+from src.adapters.filesystems import LocalFilesystem
+from src.logger import log
+from src.manifest import GenerationManifest
+from src.service import (
+    SOCKET_ENV_VAR,
+    GeneratorService,
+    default_socket_path,
+    forward_master,
+    request,
+    stop_service,
+)
+
+ARGUMENTS = dict(
+    action="generate_all_objects",
+    database="ALLIANT_PPL_PROD",
+    schema="DBO",
+    source_short_name="aln",
+    input_file="./tests/assets/master/asset_input.csv",
+)
+
+
+@pytest.fixture()
+def service():
+    # Unix socket paths are limited to around 100 characters, so the socket goes in the shortest temp folder
+    socket_path = os.path.join("/tmp", f"adp_test_{os.getpid()}.sock")
+    service = GeneratorService(socket_path=socket_path, master=adp_generator.master)
+    thread = threading.Thread(target=service.serve_forever)
+    thread.start()
+    yield service
+    stop_service(socket_path=socket_path)
+    thread.join()
+    service.server_close()
+
+
+def _read_output(output_folder) -> dict[str, str]:
+    return {
+        path.relative_to(output_folder).as_posix(): path.read_text()
+        for path in output_folder.rglob("*")
+        if path.is_file()
+    }
+
+
+class TestGeneratorService:
+    def test_forward_matches_local_run(self, service, tmp_path):
+        assert forward_master(
+            arguments={**ARGUMENTS, "output_folder": str(tmp_path / "service")},
+            socket_path=service.socket_path,
+        )
+        adp_generator.master(
+            **ARGUMENTS,
+            output_folder=str(tmp_path / "local"),
+            local_filesystem=LocalFilesystem(),
+        )
+        assert _read_output(tmp_path / "service") == _read_output(tmp_path / "local")
+
+    def test_failed_run(self, service, tmp_path):
+        with pytest.raises(RuntimeError, match="KeyError"):
+            forward_master(
+                arguments={
+                    **ARGUMENTS,
+                    "input_file": str(tmp_path / "missing.csv"),
+                    "output_folder": str(tmp_path),
+                },
+                socket_path=service.socket_path,
+            )
+        # The service carries on after a failed run
+        assert request({"command": "ping"}, socket_path=service.socket_path) == {
+            "ok": True
+        }
+
+    def test_forwarded_logging(self, service, tmp_path):
+        level, handlers = log.level, list(log.handlers)
+        log_file = tmp_path / "run.log"
+        arguments = {**ARGUMENTS, "output_folder": str(tmp_path / "output")}
+        forward_master(
+            arguments={**arguments, "log_level": "INFO", "log_file": str(log_file)},
+            socket_path=service.socket_path,
+        )
+        assert "INFO" in log_file.read_text()
+        # The service goes back to its own level and log once the run is done
+        assert log.level == level
+        assert log.handlers == handlers
+
+        quiet_log_file = tmp_path / "quiet.log"
+        forward_master(
+            arguments={**arguments, "quiet": True, "log_file": str(quiet_log_file)},
+            socket_path=service.socket_path,
+        )
+        assert "INFO" not in quiet_log_file.read_text()
+
+    def test_incremental_keeps_manifest(self, service, tmp_path):
+        manifests = []
+
+        def master(**kwargs):
+            manifests.append(kwargs["manifest"])
+            adp_generator.master(**kwargs)
+
+        service.master = master
+        arguments = {**ARGUMENTS, "output_folder": str(tmp_path), "incremental": True}
+        forward_master(arguments=arguments, socket_path=service.socket_path)
+        ((_, kept),) = service._manifests.values()
+        forward_master(arguments=arguments, socket_path=service.socket_path)
+        # The second run starts from the manifest kept from the first, rather than loading it again
+        assert manifests[1] is kept
+        assert len(kept.entry_cache) == 2
+
+        # A manifest written by another run since is loaded instead
+        LocalFilesystem().write_file(
+            filepath=GenerationManifest.path(str(tmp_path)),
+            content='{"version": 0}',
+        )
+        forward_master(arguments=arguments, socket_path=service.socket_path)
+        assert manifests[2]._previous == {}
+
+    def test_no_service(self, tmp_path):
+        socket_path = str(tmp_path / "none.sock")
+        assert not forward_master(arguments=ARGUMENTS, socket_path=socket_path)
+        assert not stop_service(socket_path=socket_path)
+
+    def test_socket_only_for_current_user(self, service, tmp_path, monkeypatch):
+        assert os.stat(service.socket_path).st_mode & 0o777 == 0o600
+
+        monkeypatch.delenv(SOCKET_ENV_VAR, raising=False)
+        monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        socket_path = default_socket_path()
+        assert os.stat(os.path.dirname(socket_path)).st_mode & 0o777 == 0o700
+        # A folder another user could have put there is refused
+        os.chmod(os.path.dirname(socket_path), 0o777)
+        with pytest.raises(PermissionError):
+            default_socket_path()
+
+        monkeypatch.setattr(
+            os, "getuid", lambda: os.stat(service.socket_path).st_uid + 1
+        )
+        with pytest.raises(PermissionError, match="belongs to another user"):
+            forward_master(arguments=ARGUMENTS, socket_path=service.socket_path)
+
+    def test_one_service_per_socket(self, service, tmp_path):
+        with pytest.raises(FileExistsError):
+            GeneratorService(
+                socket_path=service.socket_path, master=adp_generator.master
+            )
@@ -0,0 +1,111 @@
+import dataclasses
+import io
+
+import pandas as pd  # type: ignore
+import pytest
+
+import adp_generator
+from src.adapters.filesystems import InMemoryFilesystem
+from src.synthetic_catalog import (
+    METADATA_COLUMNS,
+    CatalogSpec,
+    generate_catalog,
+    write_catalog,
+)
+
+
+class TestSyntheticCatalog:
+    spec = CatalogSpec(
+        table_count=200,
+        min_columns=4,
+        max_columns=30,
+        multi_key_ratio=0.5,
+        multi_updated_date_ratio=0.25,
+        scd2_ratio=0.8,
+        data_types={"VARCHAR(10)": 1.0, "DATE": 3.0},
+        seed=7,
+    )
+
+    def test_generate_catalog(self):
+        catalog = generate_catalog(self.spec)
+        assert list(catalog.columns) == METADATA_COLUMNS
+
+        tables = catalog.groupby("table_name", sort=False)
+        assert tables.ngroups == 200
+        assert tables.size().between(4, 30).all()
+
+        key_counts = tables["column_type"].agg(
+            lambda types: (types == "unique_key").sum()
+        )
+        date_counts = tables["column_type"].agg(
+            lambda types: (types == "updated_date").sum()
+        )
+        assert set(key_counts) == {1, 2}
+        assert set(date_counts) == {1, 2}
+        assert 0.3 < (key_counts == 2).mean() < 0.7
+        assert 0.1 < (date_counts == 2).mean() < 0.4
+        assert 0.65 < tables["curated_dbt_type"].first().notna().mean() < 0.95
+
+        ordinary = catalog[catalog["column_type"].isna()]
+        assert set(ordinary["source_data_type"]) == {"VARCHAR(10)", "DATE"}
+
+    def test_generate_catalog_is_reproducible(self):
+        pd.testing.assert_frame_equal(
+            generate_catalog(self.spec), generate_catalog(self.spec)
+        )
+
+    def test_generate_catalog_validates_spec(self):
+        with pytest.raises(ValueError):
+            generate_catalog(CatalogSpec(table_count=1, min_columns=3))
+        with pytest.raises(ValueError):
+            generate_catalog(CatalogSpec(table_count=1, width_distribution="normal"))
+
+    def test_lognormal_widths(self):
+        catalog = generate_catalog(
+            CatalogSpec(
+                table_count=500,
+                min_columns=5,
+                max_columns=500,
+                width_distribution="lognormal",
+            )
+        )
+        widths = catalog.groupby("table_name").size()
+        assert widths.between(5, 500).all()
+        assert widths.median() < widths.mean()
+
+    @pytest.mark.parametrize("output_format", ["csv", "parquet"])
+    def test_write_catalog(self, output_format: str):
+        catalog = generate_catalog(self.spec)
+        filesystem = InMemoryFilesystem()
+        write_catalog(
+            catalog=catalog,
+            filepath=f"catalog.{output_format}",
+            output_format=output_format,
+            filesystem=filesystem,
+        )
+        content = filesystem.open_file(f"catalog.{output_format}", mode="rb").read()
+        if output_format == "csv":
+            written = pd.read_csv(io.BytesIO(content), dtype=str)
+        else:
+            written = pd.read_parquet(io.BytesIO(content))
+        pd.testing.assert_frame_equal(written.fillna(""), catalog.fillna(""))
+
+    def test_generated_catalog_can_be_generated(self):
+        # Only scd2 curated tables can be generated so far
+        spec = dataclasses.replace(self.spec, scd2_ratio=1.0)
+        filesystem = InMemoryFilesystem()
+        write_catalog(
+            catalog=generate_catalog(spec),
+            filepath="input/catalog.csv",
+            filesystem=filesystem,
+        )
+        adp_generator.master(
+            action="generate_all_objects",
+            database="SYNTHETIC",
+            schema="DBO",
+            input_file="input/catalog.csv",
+            output_folder="output",
+            source_short_name="syn",
+            local_filesystem=filesystem,
+        )
+        assert len(filesystem.list_files("output/output_ddl/curated/")) == 200
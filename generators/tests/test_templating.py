@@ -0,0 +1,77 @@
+import pytest
+
+from src.templating import CompiledTemplate, compile_template
+from templates import ddls, models
+
+
+class TestCompiledTemplate:
+    @pytest.mark.parametrize(
+        "template",
+        [
+            ddls.RAW_TEMP_DDL,
+            ddls.RAW_DDL,
+            ddls.CURATED_DDL,
+            models.RAW_MODEL,
+            models.CURATED_MODEL,
+        ],
+    )
+    def test_render_matches_str_format(self, template: str):
+        fields = {
+            name: f"value_of_{name}" for name in CompiledTemplate(template).field_names
+        }
+        assert compile_template(template).render(**fields) == template.format(**fields)
+
+    def test_literal_percent_and_braces(self):
+        template = "{{literal}} 100% {a} %s {b}"
+        assert CompiledTemplate(template).render(a=1, b=None) == template.format(
+            a=1, b=None
+        )
+
+    def test_falls_back_for_format_specs(self):
+        template = "{a:>5}|{b!r}|{c[0]}"
+        assert CompiledTemplate(template).render(a="x", b="y", c=["z"]) == (
+            "    x|'y'|z"
+        )
+
+    def test_missing_field(self):
+        with pytest.raises(KeyError):
+            CompiledTemplate("{a} {b}").render(a=1)
+
+    @pytest.mark.parametrize(
+        "template",
+        [
+            "    cast(FILECONTENTS:{column_name} as {source_data_type}) as {column_name}",
+            "{column_name:<10}{source_data_type}",
+        ],
+    )
+    def test_render_columns(self, template: str):
+        column_name = ["ID", "NAME"]
+        source_data_type = ["NUMBER", "VARCHAR"]
+        expected = ",\n".join(
+            template.format(column_name=name, source_data_type=data_type)
+            for name, data_type in zip(column_name, source_data_type)
+        )
+        assert (
+            CompiledTemplate(template).render_columns(
+                ",\n", column_name=column_name, source_data_type=source_data_type
+            )
+            == expected
+        )
+
+    @pytest.mark.parametrize("template", ["<{a}|{b}>", "<{a!r}|{b}>"])
+    def test_render_grouped_columns(self, template: str):
+        a = ["1", "2", "3", "4"]
+        b = ["w", None, "y", "z"]
+        offsets = [0, 2, 2, 3, 4]
+        compiled = CompiledTemplate(template)
+        assert compiled.render_grouped_columns(", ", offsets, a=a, b=b) == [
+            compiled.render_columns(", ", a=a[start:end], b=b[start:end])
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+        assert compiled.render_grouped_columns(", ", [0, 2, 2, 3, 4], a=a, b=b)[:2] == [
+            template.format(a="1", b="w") + ", " + template.format(a="2", b=None),
+            "",
+        ]
+
+    def test_compile_template_is_cached(self):
+        assert compile_template(ddls.RAW_DDL) is compile_template(ddls.RAW_DDL)
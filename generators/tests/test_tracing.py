@@ -0,0 +1,66 @@
+import json
+import os
+
+from src import tracing
+from src.ddl_generators import RawDDLGenerator
+from src.adapters.filesystems import InMemoryFilesystem
+
+
+class TestTracing:
+    def test_disabled_span_records_nothing(self):
+        assert not tracing.is_tracing()
+        assert tracing.span("table", table_name="A") is tracing._UNTRACED
+        assert tracing.take_worker_events() == []
+
+    def test_spans_are_chrome_trace_events(self):
+        tracer = tracing.start_tracing()
+        try:
+            with tracing.span("table", table_name="A"):
+                RawDDLGenerator.run(
+                    raw_database="RAW", raw_schema="DBO", table_name="A"
+                )
+            filesystem = InMemoryFilesystem()
+            filesystem.write_file(filepath="/out/a.sql", content="select 1")
+        finally:
+            assert tracing.stop_tracing() is tracer
+
+        events = {event["name"]: event for event in tracer.events}
+        assert set(events) == {
+            "table",
+            "RawDDLGenerator.run",
+            "InMemoryFilesystem.write_file",
+        }
+        table, ddl = events["table"], events["RawDDLGenerator.run"]
+        assert table["ph"] == "X" and table["args"] == {"table_name": "A"}
+        assert ddl["cat"] == "ddl" and ddl["args"] == {"table_name": "A"}
+        # the DDL span is nested within the table span
+        assert table["ts"] <= ddl["ts"]
+        assert ddl["ts"] + ddl["dur"] <= table["ts"] + table["dur"]
+        assert events["InMemoryFilesystem.write_file"]["args"] == {
+            "filepath": "/out/a.sql"
+        }
+
+        trace = json.loads(tracer.export())
+        assert trace["traceEvents"][0] == {
+            "name": "process_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "args": {"name": "adp_generator"},
+        }
+        assert len(trace["traceEvents"]) == 4
+
+    def test_worker_events_are_handed_over_once(self):
+        tracer = tracing.start_tracing()
+        try:
+            with tracing.span("before_fork"):
+                pass
+            # as in a forked worker process
+            tracing._after_fork_in_child()
+            with tracing.span("render_table"):
+                pass
+            events = tracing.take_worker_events()
+            assert [event["name"] for event in events] == ["render_table"]
+            assert tracing.take_worker_events() == []
+        finally:
+            tracing.stop_tracing()
+        assert tracer.events == []
@@ -0,0 +1,85 @@
+import pandas as pd  # type: ignore
+import pytest
+
+from configuration.invalid_table_names import invalid_table_names  # type: ignore
+from src.metadata_index import MetadataIndex
+from src.validation import check_required_columns
+
+
+def _metadata_df() -> pd.DataFrame:
+    rows = [
+        # table_name, curated_dbt_type, column_name, column_type
+        ("GOOD", "scd2", "id", "unique_key"),
+        ("GOOD", "scd2", "id_2", "unique_key"),
+        ("GOOD", "scd2", "updated", "updated_date"),
+        ("TABLES", "scd2", "id", "unique_key"),
+        ("TABLES", "scd2", "updated", "updated_date"),
+        ("MIXED", "scd2", "id", "unique_key"),
+        ("MIXED", "other", "updated", "updated_date"),
+        ("NO_KEYS", "scd2", "value", None),
+        ("DUPLICATED", "scd2", "id", "unique_key"),
+        ("DUPLICATED", "scd2", "updated", "updated_date"),
+        ("DUPLICATED", "scd2", "id", None),
+        ("DUPLICATED", "scd2", "id", None),
+        ("NOT_SCD2", "other", "value", None),
+    ]
+    df = pd.DataFrame(
+        rows, columns=["table_name", "curated_dbt_type", "column_name", "column_type"]
+    )
+    df["table_description"] = "description"
+    df["source_data_type"] = "VARCHAR"
+    return df
+
+
+class TestValidation:
+    def test_table_validation(self):
+        tables = MetadataIndex(_metadata_df()).validation.tables
+        assert tables["GOOD"].is_scd2
+        assert tables["GOOD"].is_multi_key
+        assert not tables["GOOD"].is_multi_date
+        assert tables["GOOD"].duplicate_columns == []
+        assert tables["DUPLICATED"].duplicate_columns == ["id"]
+        assert not tables["MIXED"].is_scd2
+        assert not tables["NOT_SCD2"].is_scd2
+        assert tables["NO_KEYS"].unique_key_count == 0
+
+    def test_issues(self):
+        report = MetadataIndex(_metadata_df()).validation
+        assert not report
+        assert [(issue.table_name, issue.rule) for issue in report.issues] == [
+            ("TABLES", "invalid_table_name"),
+            ("MIXED", "contradicting_curated_dbt_type"),
+            ("NO_KEYS", "missing_unique_key"),
+            ("NO_KEYS", "missing_updated_date"),
+            ("DUPLICATED", "duplicate_column"),
+        ]
+        assert str(report.issues_for("duplicate_column")[0]) == (
+            "DUPLICATED: Duplicate rows for column(s) ['id']"
+        )
+        assert report.summary() == (
+            "1 invalid_table_name, 1 contradicting_curated_dbt_type, 1 missing_unique_key, 1 missing_updated_date, "
+            "1 duplicate_column"
+        )
+
+        with pytest.raises(
+            ValueError, match=r"failed validation \(1 invalid_table_name"
+        ):
+            report.raise_for_errors()
+
+    def test_valid_input(self):
+        df = _metadata_df()
+        report = MetadataIndex(
+            df[(df["table_name"] == "GOOD") | (df["table_name"] == "NOT_SCD2")]
+        ).validation
+        assert report
+        assert report.issues == []
+        report.raise_for_errors()
+
+    def test_check_required_columns(self):
+        df = _metadata_df()
+        check_required_columns(df)
+        with pytest.raises(KeyError, match="missing \\['column_type'\\]"):
+            MetadataIndex(df.drop(columns=["column_type"]))
+
+    def test_invalid_table_names_are_unique(self):
+        assert len(set(invalid_table_names)) == len(invalid_table_names)
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import adp_generator
+from src.watch import InputWatcher, watch
+
+
+class TestWatch:
+    def test_input_watcher(self, tmp_path):
+        input_file = tmp_path / "input.csv"
+        input_file.write_text("a")
+        watcher = InputWatcher(filepaths=[input_file.as_posix()], interval=0.01)
+        assert not watcher.wait_for_change(timeout=0.05)
+
+        input_file.write_text("ab")
+        assert watcher.wait_for_change(timeout=1)
+        # the change has been seen, so it isn't reported again
+        assert not watcher.wait_for_change(timeout=0.05)
+
+        input_file.unlink()
+        assert watcher.wait_for_change(timeout=1)
+
+    def test_watch_carries_on_after_a_failed_run(self, tmp_path):
+        input_file = tmp_path / "input.csv"
+        input_file.write_text("a")
+        watcher = InputWatcher(filepaths=[input_file.as_posix()], interval=0.01)
+        runs = []
+
+        def run():
+            runs.append(input_file.read_text())
+            if len(runs) == 1:
+                raise ValueError("invalid metadata")
+
+        def edit():
+            time.sleep(0.1)
+            input_file.write_text("b")
+
+        threading.Thread(target=edit).start()
+        assert watch(run=run, watcher=watcher, max_runs=2) == 2
+        assert runs == ["a", "b"]
+
+    def test_watch_master_only_renders_changed_tables(self, tmp_path, monkeypatch):
+        input_file = tmp_path / "input.csv"
+        input_file.write_text(open("./tests/assets/master/asset_input.csv").read())
+        output_folder = (tmp_path / "output").as_posix()
+        rendered_tables = []
+        render_table = adp_generator._render_table
+
+        def recording_render_table(table, context, timed=False):
+            rendered_tables.append(table.table_name)
+            return render_table(table=table, context=context, timed=timed)
+
+        monkeypatch.setattr(adp_generator, "_render_table", recording_render_table)
+
+        def edit():
+            time.sleep(0.3)
+            input_file.write_text(input_file.read_text() + "\n")
+
+        threading.Thread(target=edit).start()
+        runs = adp_generator.watch_master(
+            input_file=input_file.as_posix(),
+            output_folder=output_folder,
+            action="generate_all_objects",
+            database="ALLIANT_PPL_PROD",
+            schema="DBO",
+            source_short_name="aln",
+            interval=0.02,
+            max_runs=2,
+        )
+        assert runs == 2
+        # the file changed, but not the table's rows
+        assert rendered_tables == ["C_STATUS"]
+        assert (tmp_path / "output" / "output_ddl" / "raw" / "c_status.sql").exists()
+
+    def test_watch_master_keeps_worker_pool(self, tmp_path, monkeypatch):
+        input_file = tmp_path / "input.csv"
+        input_file.write_text(open("./tests/assets/master/asset_input.csv").read())
+        executors = []
+        master = adp_generator.master
+
+        def recording_master(**kwargs):
+            executors.append(kwargs["executor"])
+            master(**kwargs)
+
+        monkeypatch.setattr(adp_generator, "master", recording_master)
+
+        def edit():
+            time.sleep(0.3)
+            input_file.write_text(input_file.read_text() + "\n")
+
+        threading.Thread(target=edit).start()
+        runs = adp_generator.watch_master(
+            input_file=input_file.as_posix(),
+            output_folder=(tmp_path / "output").as_posix(),
+            action="generate_all_objects",
+            database="ALLIANT_PPL_PROD",
+            schema="DBO",
+            source_short_name="aln",
+            workers=2,
+            interval=0.02,
+            max_runs=2,
+        )
+        assert runs == 2
+        # Both runs used the one pool started for the watch
+        assert executors[0] is not None and executors[1] is executors[0]
+
+    def test_watch_master_invalid_save_keeps_output(self, tmp_path):
+        input_file = tmp_path / "input.csv"
+        content = open("./tests/assets/master/asset_input.csv").read()
+        input_file.write_text(content)
+        output = tmp_path / "output"
+        yaml_files = []
+
+        def edit():
+            # Once the first run has written the YAML, save metadata that contradicts itself
+            while len(yaml_files) < 2:
+                time.sleep(0.02)
+                yaml_files[:] = sorted(output.rglob("*.yml"))
+            expected.extend(path.read_bytes() for path in yaml_files)
+            input_file.write_text(content.replace(",scd2,", ",other,", 1))
+
+        expected: list[bytes] = []
+        threading.Thread(target=edit).start()
+        runs = adp_generator.watch_master(
+            input_file=input_file.as_posix(),
+            output_folder=output.as_posix(),
+            action="generate_all_objects",
+            database="ALLIANT_PPL_PROD",
+            schema="DBO",
+            source_short_name="aln",
+            interval=0.02,
+            max_runs=2,
+        )
+        assert runs == 2
+        assert [path.read_bytes() for path in yaml_files] == expected
+        assert sorted(output.rglob("*.yml")) == yaml_files